@@ -0,0 +1,91 @@
+"""Бенчмарк подсветки синтаксиса PyCode.
+
+Сравнивает время применения тегов в зависимости от числа совпадений:
+старый способ (отдельный tag_add с индексом "1.0 + Nc" на каждое
+совпадение) и пакетный (один tag add на тег с индексами "строка.столбец").
+
+Запуск: python bench_highlight.py [число_строк ...]
+"""
+import re
+import sys
+import time
+import tkinter as tk
+
+from pycode11 import IncrementalHighlighter, RegexLexer, TokenizeLexer
+
+SAMPLE = '''class Worker(object):
+    """Пример класса для подсветки"""
+
+    def __init__(self, name, count=10):
+        self.name = name  # имя
+        self.items = [str(i) for i in range(count)]
+
+    def run(self, value=3.14):
+        if isinstance(value, float) and len(self.items) > 0:
+            print("value: %s" % value)
+        return dict(name=self.name, total=sum(range(100)))
+
+'''
+
+
+def make_code(line_count):
+    """Собирает код из повторяющегося образца нужной длины"""
+    sample_lines = SAMPLE.split("\n")
+    lines = [sample_lines[i % len(sample_lines)] for i in range(line_count)]
+    return "\n".join(lines)
+
+
+def bench_per_match(text, code):
+    """Старый способ: регулярные выражения по всему тексту и tag_add на каждое совпадение"""
+    matches = []
+    for tag_name, pattern in RegexLexer.patterns:
+        for match in re.finditer(pattern.pattern, code, re.MULTILINE | re.DOTALL):
+            matches.append((tag_name, match.start(), match.end()))
+
+    started = time.perf_counter()
+    for tag_name, start, end in matches:
+        text.tag_add(tag_name, f"1.0 + {start}c", f"1.0 + {end}c")
+    text.update_idletasks()
+    return len(matches), time.perf_counter() - started
+
+
+def bench_batched(text, lexer):
+    """Пакетный способ: разбор по строкам и один tag add на тег"""
+    highlighter = IncrementalHighlighter(text, lexer)
+    results = []
+    state = None
+    for line_no, line in enumerate(text.get("1.0", "end-1c").split("\n"), start=1):
+        spans, state = lexer.lex_line(line, state)
+        results.append((line_no, spans))
+
+    started = time.perf_counter()
+    highlighter._paint(results)
+    text.update_idletasks()
+    return sum(len(spans) for _, spans in results), time.perf_counter() - started
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1000, 5000, 10000]
+    root = tk.Tk()
+    root.withdraw()
+    text = tk.Text(root)
+
+    print(f"{'строк':>8} {'способ':>18} {'совпадений':>12} {'теги, с':>10} {'мкс/совп.':>10}")
+    for size in sizes:
+        code = make_code(size)
+        for name, run in (
+            ("по совпадению", lambda: bench_per_match(text, code)),
+            ("пакетно, regex", lambda: bench_batched(text, RegexLexer())),
+            ("пакетно, tokenize", lambda: bench_batched(text, TokenizeLexer())),
+        ):
+            text.delete("1.0", "end")
+            text.insert("1.0", code)
+            count, elapsed = run()
+            per_match = elapsed / count * 1e6 if count else 0.0
+            print(f"{size:>8} {name:>18} {count:>12} {elapsed:>10.3f} {per_match:>10.2f}")
+
+    root.destroy()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,3050 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext, simpledialog
 import os
+import bisect
 import sys
 import subprocess
 import platform
 import json
 import webbrowser
 import re
+import io
+import keyword
+import tokenize
+import builtins
+import threading
+import queue
+import codecs
+import locale
+import signal
+import shutil
+import tempfile
+import fnmatch
+import select
+import struct
+import ctypes
+import mmap
+import stat
+import time
+import hashlib
+import socket
+import secrets
+import textwrap
+import ast
+import sqlite3
+import concurrent.futures
+import multiprocessing
+from array import array
+from collections import OrderedDict
 from tkinter.font import Font
 
+# Теги подсветки синтаксиса (совпадают с категориями colors.json)
+HIGHLIGHT_TAGS = ("keywords", "strings", "comments", "numbers", "functions", "builtins")
+
+# Пауза (мс) перед фоновой подсветкой строк вне видимой области
+IDLE_HIGHLIGHT_DELAY = 50
+# Интервал (мс) опроса результатов фонового лексирования
+HIGHLIGHT_POLL_INTERVAL = 10
+# Интервал (мс) переноса вывода выполняемой программы в панель вывода (~30 кадров/с)
+OUTPUT_FLUSH_INTERVAL = 33
+# Интервал (мс) вывода накопленного вывода команд консоли
+CONSOLE_FLUSH_INTERVAL = 50
+# Через сколько мс после Ctrl+C команда консоли завершается принудительно
+CONSOLE_KILL_TIMEOUT = 2000
+# Интервал (мс) применения изменений файлов проекта к дереву файлов
+TREE_WATCH_INTERVAL = 500
+# Сколько байт большого файла вставляется в редактор за один шаг загрузки
+FILE_LOAD_CHUNK = 1 << 20
+# Интервал (мс) обновления хода индексации в постраничном просмотре
+PAGED_VIEW_POLL_INTERVAL = 200
+# Интервал (мс) опроса результатов фонового сохранения
+SAVE_POLL_INTERVAL = 20
+# Интервал (мс) опроса хода индексации символов проекта
+SYMBOL_INDEX_POLL_INTERVAL = 500
+# Интервал (мс) и размер пакета переноса результатов поиска по файлам
+SEARCH_POLL_INTERVAL = 50
+SEARCH_BATCH_SIZE = 500
+# Интервал (мс) опроса результатов поиска символов по подстроке
+SYMBOL_SEARCH_POLL_INTERVAL = 50
+# Задержка (мс) поиска по буферу при наборе запроса
+FIND_DEBOUNCE_MS = 80
+# Пауза (мс) в наборе текста, после которой поиск по буферу повторяется
+FIND_EDIT_DEBOUNCE_MS = 1000
+# Задержка (мс) проверки кода после правки, интервал (мс) опроса её результатов и размер кэша
+LINT_DEBOUNCE_MS = 500
+LINT_POLL_INTERVAL = 100
+LINT_CACHE_SIZE = 256
+# Сколько вариантов показывает список автодополнения
+COMPLETION_LIMIT = 50
+# Сколько символов имени нужно набрать, чтобы список открылся сам
+COMPLETION_MIN_CHARS = 2
+
+# Маска прав новых файлов (os.umask можно только установить, поэтому читаем один раз)
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+# Состояние строки, которая ещё ни разу не лексировалась
+_UNKNOWN_STATE = object()
+
+_QUOTE_RE = re.compile(r"#|\"\"\"|'''|\"|'")
+
+
+def find_string_end(line, pos, quote):
+    """Возвращает позицию после закрывающей кавычки quote (с учётом экранирования) или -1"""
+    while True:
+        end = line.find(quote, pos)
+        if end < 0:
+            return -1
+        start = end
+        while start > 0 and line[start - 1] == "\\":
+            start -= 1
+        if (end - start) % 2 == 0:
+            return end + len(quote)
+        pos = end + 1
+
+
+def find_open_triple_quote(line, pos=0):
+    """Ищет незакрытую в строке тройную кавычку; возвращает (позиция, кавычка) или None"""
+    while True:
+        match = _QUOTE_RE.search(line, pos)
+        if not match or match.group() == "#":
+            return None
+        quote = match.group()
+        end = find_string_end(line, match.end(), quote)
+        if end < 0:
+            return (match.start(), quote) if len(quote) == 3 else None
+        pos = end
+
+
+class RegexLexer:
+    """Построчный лексер на регулярных выражениях подсветки"""
+
+    patterns = [
+        ("keywords", re.compile(r"\b(and|as|assert|break|class|continue|def|del|elif|else|except|finally|for|from|global|if|import|in|is|lambda|nonlocal|not|or|pass|raise|return|try|while|with|yield)\b")),
+        ("strings", re.compile(r"(\"\"\".*?\"\"\"|\'\'\'.*?\'\'\'|\".*?\"|\'.*?\')")),
+        ("comments", re.compile(r"#.*?$")),
+        ("numbers", re.compile(r"\b\d+\.?\d*\b")),
+        ("functions", re.compile(r"\bdef\s+(\w+)\s*\(")),
+        ("builtins", re.compile(r"\b(print|len|range|str|int|float|list|dict|set|tuple|bool|type|isinstance|super|__init__)\b")),
+    ]
+
+    def lex_line(self, line, state):
+        """Возвращает список (тег, начало, конец) и состояние лексера на конец строки.
+
+        Состояние - кавычка незакрытой многострочной строки или None.
+        """
+        spans = []
+        pos = 0
+        if state:
+            end = find_string_end(line, 0, state)
+            if end < 0:
+                return [("strings", 0, len(line))], state
+            spans.append(("strings", 0, end))
+            pos = end
+
+        for tag_name, pattern in self.patterns:
+            for match in pattern.finditer(line, pos):
+                spans.append((tag_name, match.start(), match.end()))
+
+        open_quote = find_open_triple_quote(line, pos)
+        if open_quote:
+            spans.append(("strings", open_quote[0], len(line)))
+            return spans, open_quote[1]
+        return spans, None
+
+
+class TokenizeLexer:
+    """Построчный лексер на стандартном модуле tokenize.
+
+    Один проход по строке вместо шести регулярных выражений; корректно
+    разбирает кавычки в комментариях, "#" в строках, f-строки, async/await
+    и мягкие ключевые слова match/case.
+    """
+
+    builtin_names = frozenset(name for name in dir(builtins) if not name.startswith("_")) | {"__init__"}
+    soft_keywords = frozenset(getattr(keyword, "softkwlist", ()))
+    string_tokens = frozenset(
+        getattr(tokenize, name) for name in ("STRING", "FSTRING_START", "FSTRING_MIDDLE", "FSTRING_END")
+        if hasattr(tokenize, name)
+    )
+
+    def lex_line(self, line, state):
+        """Возвращает список (тег, начало, конец) и состояние лексера на конец строки"""
+        spans = []
+        pos = 0
+        if state:
+            end = find_string_end(line, 0, state)
+            if end < 0:
+                return [("strings", 0, len(line))], state
+            spans.append(("strings", 0, end))
+            pos = end
+
+        while pos < len(line):
+            pos, state = self._lex_segment(line, pos, spans)
+            if state:
+                return spans, state
+        return spans, None
+
+    def _lex_segment(self, line, pos, spans):
+        """Разбирает line начиная с pos; при ошибке токенизации возвращает позицию, с которой продолжать"""
+        last_end = pos
+        tokens = []
+        try:
+            for token in tokenize.generate_tokens(io.StringIO(line[pos:]).readline):
+                if token.start[0] > 1:
+                    break
+                if token.type == tokenize.ERRORTOKEN and token.string in ("'", '"'):
+                    # Незакрытая однострочная строка - до конца строки
+                    self._classify(tokens, line, spans)
+                    spans.append(("strings", pos + token.start[1], len(line)))
+                    return len(line), None
+                tokens.append((token.type, token.string, pos + token.start[1], pos + token.end[1]))
+                last_end = pos + token.end[1]
+            self._classify(tokens, line, spans)
+            return len(line), None
+        except (tokenize.TokenError, SyntaxError):
+            self._classify(tokens, line, spans)
+
+        open_quote = find_open_triple_quote(line, last_end)
+        if open_quote:
+            spans.append(("strings", open_quote[0], len(line)))
+            return len(line), open_quote[1]
+        match = _QUOTE_RE.search(line, last_end)
+        if match and match.group() != "#" and find_string_end(line, match.end(), match.group()) < 0:
+            spans.append(("strings", match.start(), len(line)))
+            return len(line), None
+        # Пропускаем символ, на котором споткнулся токенизатор
+        return max(last_end, pos) + 1, None
+
+    def _classify(self, tokens, line, spans):
+        """Переводит токены в теги colors.json"""
+        significant = [token for token in tokens if token[0] not in (tokenize.INDENT, tokenize.DEDENT)]
+        for index, (token_type, string, start, end) in enumerate(significant):
+            if token_type == tokenize.COMMENT:
+                spans.append(("comments", start, end))
+            elif token_type in self.string_tokens:
+                spans.append(("strings", start, end))
+            elif token_type == tokenize.NUMBER:
+                spans.append(("numbers", start, end))
+            elif token_type == tokenize.NAME:
+                previous = significant[index - 1][1] if index else None
+                if previous == ".":
+                    continue
+                if previous == "def":
+                    spans.append(("functions", start, end))
+                elif keyword.iskeyword(string):
+                    spans.append(("keywords", start, end))
+                elif index == 0 and string in self.soft_keywords and self._is_soft_keyword(significant, line):
+                    spans.append(("keywords", start, end))
+                elif string in self.builtin_names:
+                    spans.append(("builtins", start, end))
+
+    def _is_soft_keyword(self, tokens, line):
+        """match/case/type в начале строки - ключевые слова, если за ними идёт выражение"""
+        if len(tokens) < 2:
+            return False
+        following = tokens[1]
+        if following[0] == tokenize.NAME or following[0] in self.string_tokens or following[0] == tokenize.NUMBER:
+            return True
+        code = line.split("#", 1)[0].rstrip()
+        return code.endswith(":") and following[1] not in ("=", ".", ":")
+
+
+# Доступные лексеры подсветки (настройка "highlighter" в settings.json)
+LEXERS = {
+    "tokenize": TokenizeLexer,
+    "regex": RegexLexer,
+}
+
+
+def add_line_range(ranges, first, last):
+    """Добавляет интервал строк first..last в отсортированный список интервалов"""
+    before = []
+    after = []
+    for start, end in ranges:
+        if end < first - 1:
+            before.append([start, end])
+        elif start > last + 1:
+            after.append([start, end])
+        else:
+            first, last = min(start, first), max(end, last)
+    return before + [[first, last]] + after
+
+
+def remove_line_range(ranges, first, last):
+    """Убирает интервал строк first..last из отсортированного списка интервалов"""
+    result = []
+    for start, end in ranges:
+        if end < first or start > last:
+            result.append([start, end])
+            continue
+        if start < first:
+            result.append([start, first - 1])
+        if end > last:
+            result.append([last + 1, end])
+    return result
+
+
+def shift_line_ranges(ranges, first, delta):
+    """Сдвигает интервалы после правки, изменившей число строк после строки first на delta"""
+    if not delta:
+        return ranges
+    removed_end = first - delta
+
+    def shift(line):
+        if line <= first:
+            return line
+        if delta < 0 and line <= removed_end:
+            return first
+        return line + delta
+
+    shifted = []
+    for start, end in ranges:
+        start, end = shift(start), shift(end)
+        if shifted and start <= shifted[-1][1] + 1:
+            shifted[-1][1] = max(shifted[-1][1], end)
+        else:
+            shifted.append([start, end])
+    return shifted
+
+
+def scan_line_state(line, state):
+    """Быстро вычисляет состояние лексера на конец строки без разбора токенов"""
+    pos = 0
+    if state:
+        pos = find_string_end(line, 0, state)
+        if pos < 0:
+            return state
+    open_quote = find_open_triple_quote(line, pos)
+    return open_quote[1] if open_quote else None
+
+
+class IncrementalHighlighter:
+    """Инкрементальная подсветка синтаксиса для виджета Text.
+
+    Хранит состояние лексера и результат разбора для каждой строки, а также
+    списки интервалов строк: dirty - нужно перелексировать, unknown -
+    состояние на конец строки неизвестно, unpainted - разобраны, но теги
+    не применены. Перелексируются только изменённые строки и те следующие
+    за ними, у которых изменилось входное состояние.
+
+    В режиме видимой области (большие файлы) теги ставятся только на
+    видимые строки с запасом viewport_margin; остальные строки
+    раскрашиваются при прокрутке.
+    """
+
+    # Сколько строк после грязных снимать с виджета для распространения состояния
+    SPILL_BATCH = 500
+    # Максимальное число строк в кэше результатов лексера
+    CACHE_SIZE = 50000
+
+    def __init__(self, text_widget, lexer, tags=HIGHLIGHT_TAGS, viewport_threshold=0, viewport_margin=100):
+        self.text = text_widget
+        self.lexer = lexer
+        self.tags = tuple(tags)
+        self.viewport_threshold = viewport_threshold
+        self.viewport_margin = viewport_margin
+        self.viewport_mode = False
+        # Кэшем пользуются и главный поток, и фоновый лексер
+        self.cache = OrderedDict()
+        self.cache_lock = threading.Lock()
+        self.version = 0
+        self.states = []
+        self.spans = []
+        self.dirty = []
+        self.unknown = []
+        self.unpainted = []
+        self.invalidate()
+
+    def set_lexer(self, lexer):
+        """Меняет лексер и перекрашивает весь текст при следующем flush"""
+        with self.cache_lock:
+            self.lexer = lexer
+            self.cache.clear()
+        self.invalidate()
+
+    def lex_line(self, line, state):
+        """Лексирует строку через кэш: неизменённые строки повторно не разбираются"""
+        key = (state, line)
+        with self.cache_lock:
+            result = self.cache.get(key)
+            if result is not None:
+                self.cache.move_to_end(key)
+                return result
+            lexer = self.lexer
+        # Разбор идёт без блокировки, чтобы потоки не ждали друг друга
+        result = lexer.lex_line(line, state)
+        with self.cache_lock:
+            # Результат прежнего лексера (его сменили во время разбора) в кэш не попадает
+            if lexer is self.lexer:
+                self.cache[key] = result
+                if len(self.cache) > self.CACHE_SIZE:
+                    self.cache.popitem(last=False)
+        return result
+
+    def line_count(self):
+        """Количество строк в виджете"""
+        return int(self.text.index("end-1c").split(".")[0])
+
+    def visible_lines(self, total):
+        """Первая и последняя строки видимой области с учётом запаса"""
+        first = int(self.text.index("@0,0").split(".")[0])
+        last = int(self.text.index(f"@0,{self.text.winfo_height()}").split(".")[0])
+        return max(1, first - self.viewport_margin), min(total, last + self.viewport_margin)
+
+    def invalidate(self):
+        """Помечает весь текст для повторной подсветки"""
+        total = self.line_count()
+        self.version += 1
+        self.states = [_UNKNOWN_STATE] * total
+        self.spans = [()] * total
+        self.dirty = [[1, total]]
+        self.unknown = [[1, total]]
+        self.unpainted = []
+
+    def snapshot(self):
+        """Копия разобранного состояния для неактивного буфера редактора"""
+        return {
+            "states": list(self.states),
+            "spans": list(self.spans),
+            "dirty": [list(item) for item in self.dirty],
+            "unknown": [list(item) for item in self.unknown]
+        }
+
+    def restore(self, snapshot):
+        """Возвращает состояние из snapshot() после вставки в виджет того же текста.
+
+        Списки снимка переходят подсветке без копирования. Строки не
+        перелексируются: сохранённые разборы только заново раскрашиваются
+        (в режиме видимой области - по мере прокрутки).
+        """
+        if len(snapshot["states"]) != self.line_count():
+            self.invalidate()
+            return
+        self.version += 1
+        self.states = snapshot["states"]
+        self.spans = snapshot["spans"]
+        self.dirty = snapshot["dirty"]
+        self.unknown = snapshot["unknown"]
+        self.unpainted = [[1, len(self.states)]] if self.states else []
+
+    def mark_dirty(self, first, last):
+        """Добавляет интервал строк first..last в список грязных"""
+        self.dirty = add_line_range(self.dirty, first, last)
+
+    def on_change(self, first, last, delta):
+        """Учитывает правку: строки first..last заменены, число строк изменилось на delta"""
+        # Последней из затронутых строк остаётся старое состояние её последней
+        # строки: по нему проверяется, сошлось ли состояние после перелексирования
+        self.version += 1
+        if delta > 0:
+            self.states[first - 1:first - 1] = [_UNKNOWN_STATE] * delta
+            self.spans[first - 1:first - 1] = [()] * delta
+        elif delta < 0:
+            del self.states[first - 1:first - 1 - delta]
+            del self.spans[first - 1:first - 1 - delta]
+
+        self.dirty = shift_line_ranges(self.dirty, first, delta)
+        self.unknown = shift_line_ranges(self.unknown, first, delta)
+        self.unpainted = shift_line_ranges(self.unpainted, first, delta)
+        last = max(first, last + delta)
+        self.mark_dirty(first, last)
+        self.unknown = add_line_range(self.unknown, first, last)
+
+    def flush(self, max_lines=None):
+        """Синхронно перелексирует и перекрашивает грязные строки.
+
+        В режиме видимой области обрабатываются только видимые строки.
+        max_lines ограничивает число строк за вызов. Возвращает True, если
+        в обрабатываемой области ещё остались грязные строки.
+        """
+        while True:
+            job = self.prepare_job(max_lines)
+            if job:
+                self.commit(self.run_job(job))
+            if not job or max_lines is not None or not self.has_dirty():
+                break
+        self.paint_visible()
+        return self.has_dirty()
+
+    def lex_ahead(self, max_lines):
+        """Синхронная фоновая подсветка: лексирует следующие грязные строки, раскрашивая только видимые"""
+        job = self.prepare_job(max_lines, ahead=True)
+        if job:
+            self.commit(self.run_job(job))
+        return bool(self.dirty)
+
+    def has_dirty(self):
+        """Есть ли грязные строки в области, которая подсвечивается сразу"""
+        if not self.viewport_mode:
+            return bool(self.dirty)
+        view = self.visible_lines(len(self.states))
+        return any(end >= view[0] and start <= view[1] for start, end in self.dirty)
+
+    def paint_visible(self):
+        """Раскрашивает уже разобранные, но ещё не раскрашенные видимые строки"""
+        if not self.unpainted:
+            return
+        total = len(self.states)
+        self._paint_stored(self.visible_lines(total) if self.viewport_mode else (1, total))
+
+    def _get_lines(self, first, last):
+        """Читает строки first..last из виджета одним вызовом"""
+        return self.text.get(f"{first}.0", f"{last}.end").split("\n")
+
+    def _state_before(self, line_no):
+        """Состояние лексера на начало строки line_no"""
+        state = self.states[line_no - 2] if line_no > 1 else None
+        return None if state is _UNKNOWN_STATE else state
+
+    def prepare_job(self, max_lines=None, ahead=False):
+        """Снимает с виджета текст грязных строк для лексирования.
+
+        Выполняется в главном потоке. Возвращает задание для run_job или
+        None, если делать нечего. ahead - фоновое задание по всему файлу,
+        иначе обрабатывается только видимая область (в режиме видимой области).
+        """
+        total = self.line_count()
+        if total != len(self.states):
+            self.invalidate()
+        self.viewport_mode = 0 < self.viewport_threshold < total
+        view = self.visible_lines(total) if self.viewport_mode else None
+        first, last = (1, total) if ahead or view is None else view
+
+        # Неизвестные состояния выше видимой области вычисляются быстрым сканированием
+        scan = None
+        if view and not ahead and self.unknown and self.unknown[0][0] < view[0]:
+            start = self.unknown[0][0]
+            scan = (start, self._get_lines(start, view[0] - 1), self._state_before(start))
+
+        # Грязные интервалы области объединяются в отрезки с запасом строк для распространения состояния
+        ranges = []
+        budget = max_lines
+        for start, end in self.dirty:
+            if end < first or start > last:
+                continue
+            if budget is not None and budget <= 0:
+                break
+            start, end = max(start, first), min(end, last)
+            if budget is not None:
+                end = min(end, start + budget - 1)
+                budget -= end - start + 1
+            if ranges and start <= ranges[-1][1] + 1:
+                ranges[-1][1] = min(last, max(ranges[-1][1], end + self.SPILL_BATCH))
+            else:
+                ranges.append([start, min(last, end + self.SPILL_BATCH)])
+
+        if not scan and not ranges:
+            return None
+
+        segments = []
+        for start, end in ranges:
+            mask = [False] * (end - start + 1)
+            for dirty_start, dirty_end in self.dirty:
+                for line_no in range(max(dirty_start, start), min(dirty_end, end) + 1):
+                    mask[line_no - start] = True
+            segments.append((start, self._get_lines(start, end), mask,
+                             self.states[start - 1:end], self._state_before(start)))
+        return {"version": self.version, "view": view, "scan": scan, "segments": segments}
+
+    def run_job(self, job):
+        """Лексирует снимок текста из задания.
+
+        Не обращается к виджету, поэтому может выполняться в фоновом потоке.
+        """
+        scanned = {}
+        scan_states = None
+        if job["scan"]:
+            start, lines, state = job["scan"]
+            scan_states = []
+            for line in lines:
+                state = scan_line_state(line, state)
+                scan_states.append(state)
+            scanned[start + len(lines) - 1] = state
+
+        segments = []
+        for start, lines, mask, old_states, start_state in job["segments"]:
+            start_state = scanned.get(start - 1, start_state)
+            state = start_state
+            processed = {}
+            changed = False
+            for offset, line in enumerate(lines):
+                if not (mask[offset] or changed):
+                    # Чистая строка с прежним входным состоянием не перелексируется
+                    state = old_states[offset]
+                    continue
+                spans, new_state = self.lex_line(line, state)
+                processed[offset] = (spans, new_state)
+                changed = new_state != old_states[offset]
+                state = new_state
+            segments.append((start, start_state, processed, changed))
+
+        scan = (job["scan"][0], scan_states) if job["scan"] else None
+        return {"version": job["version"], "view": job["view"], "scan": scan, "segments": segments}
+
+    def commit(self, result):
+        """Применяет результат run_job в главном потоке.
+
+        Если текст изменился после снятия снимка, результат отбрасывается.
+        Возвращает True, если результат применён.
+        """
+        if result is None or result["version"] != self.version:
+            return False
+
+        total = len(self.states)
+        if result["scan"]:
+            start, scan_states = result["scan"]
+            for offset, state in enumerate(scan_states):
+                line_no = start + offset
+                if self.states[line_no - 1] != state and line_no < total:
+                    # У следующей строки изменилось входное состояние
+                    self.mark_dirty(line_no + 1, line_no + 1)
+                self.states[line_no - 1] = state
+            self.unknown = remove_line_range(self.unknown, start, start + len(scan_states) - 1)
+
+        for start, start_state, processed, changed in result["segments"]:
+            if not processed:
+                continue
+            if start_state != self._state_before(start):
+                # Предыдущий отрезок изменил входное состояние - строки остаются грязными
+                continue
+            results = []
+            for offset in sorted(processed):
+                line_no = start + offset
+                spans, state = processed[offset]
+                self.states[line_no - 1] = state
+                self.spans[line_no - 1] = spans
+                if results and results[-1][0] != line_no - 1:
+                    self._commit_lines(results, result["view"])
+                    results = []
+                results.append((line_no, spans))
+            self._commit_lines(results, result["view"])
+
+            next_line = start + max(processed) + 1
+            if changed and next_line <= total:
+                self.mark_dirty(next_line, next_line)
+                self.unknown = add_line_range(self.unknown, next_line, next_line)
+        return True
+
+    def _commit_lines(self, results, view):
+        """Снимает грязность с непрерывной группы перелексированных строк и раскрашивает её"""
+        first, last = results[0][0], results[-1][0]
+        self.dirty = remove_line_range(self.dirty, first, last)
+        self.unknown = remove_line_range(self.unknown, first, last)
+        self._apply(results, view)
+
+    def _apply(self, results, view):
+        """Раскрашивает видимые строки из results, остальные откладывает до прокрутки"""
+        first, last = results[0][0], results[-1][0]
+        if view is None:
+            visible = results
+        else:
+            visible = [result for result in results if view[0] <= result[0] <= view[1]]
+            if first < view[0]:
+                self.unpainted = add_line_range(self.unpainted, first, min(last, view[0] - 1))
+            if last > view[1]:
+                self.unpainted = add_line_range(self.unpainted, max(first, view[1] + 1), last)
+        if visible:
+            self.unpainted = remove_line_range(self.unpainted, visible[0][0], visible[-1][0])
+            self._paint(visible)
+
+    def _paint_stored(self, view):
+        """Раскрашивает ранее разобранные строки, попавшие в видимую область"""
+        for start, end in list(self.unpainted):
+            start, end = max(start, view[0]), min(end, view[1])
+            if start > end:
+                continue
+            self._paint([(line_no, self.spans[line_no - 1]) for line_no in range(start, end + 1)])
+            self.unpainted = remove_line_range(self.unpainted, start, end)
+
+    def _paint(self, results):
+        """Снимает старые теги с перекрашиваемых строк и ставит новые.
+
+        Диапазоны собираются по тегам и применяются одним вызовом tag add
+        на тег с индексами вида "строка.столбец".
+        """
+        if not results:
+            return
+        first, last = results[0][0], results[-1][0]
+        ranges = {tag_name: [] for tag_name in self.tags}
+        for line_no, spans in results:
+            for tag_name, start, end in spans:
+                ranges.setdefault(tag_name, []).extend((f"{line_no}.{start}", f"{line_no}.{end}"))
+        for tag_name in self.tags:
+            self.text.tag_remove(tag_name, f"{first}.0", f"{last}.end")
+        for tag_name, indices in ranges.items():
+            if indices:
+                self.text.tag_add(tag_name, *indices)
+
+
+class HighlightWorker:
+    """Фоновый поток лексирования.
+
+    Получает задания IncrementalHighlighter.prepare_job (снимок текста и
+    номер версии) через очередь и складывает результаты в очередь, которую
+    главный поток разбирает через after(). Устаревшие задания пропускаются.
+    """
+
+    def __init__(self, highlighter):
+        self.highlighter = highlighter
+        self.jobs = queue.Queue()
+        self.results = queue.Queue()
+        self.pending = 0
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def submit(self, job):
+        """Ставит задание в очередь (вызывается в главном потоке)"""
+        self.pending += 1
+        self.jobs.put(job)
+
+    def drain(self):
+        """Забирает готовые результаты (вызывается в главном потоке)"""
+        results = []
+        while True:
+            try:
+                results.append(self.results.get_nowait())
+            except queue.Empty:
+                break
+        self.pending -= len(results)
+        return results
+
+    def stop(self):
+        """Останавливает поток"""
+        self.jobs.put(None)
+
+    def _run(self):
+        """Цикл фонового потока"""
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            result = None
+            if job["version"] == self.highlighter.version:
+                try:
+                    result = self.highlighter.run_job(job)
+                except Exception as e:
+                    print(f"Error in highlight worker: {str(e)}")
+            self.results.put(result)
+
+
+class ProcessOutputReader:
+    """Читает stdout и stderr процесса в фоновых потоках.
+
+    Куски вывода кладутся в общую очередь в виде (ключ, тег, текст) по мере
+    поступления; конец каждого потока обозначается (ключ, тег, None).
+    """
+
+    CHUNK_SIZE = 65536
+
+    def __init__(self, process, output_queue, key, encoding=None):
+        self.process = process
+        self.queue = output_queue
+        self.key = key
+        self.encoding = encoding or locale.getpreferredencoding(False)
+        self.stopped = False
+        self.threads = []
+        for stream, tag in ((process.stdout, "output"), (process.stderr, "error")):
+            if stream is None:
+                continue
+            thread = threading.Thread(target=self._read, args=(stream, tag), daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    @property
+    def stream_count(self):
+        """Количество читаемых потоков"""
+        return len(self.threads)
+
+    def stop(self):
+        """Прекращает передачу вывода: очередь больше никто не разбирает"""
+        self.stopped = True
+
+    def _put(self, item):
+        """Кладёт элемент в ограниченную очередь, не зависая после stop()"""
+        while not self.stopped:
+            try:
+                self.queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def _read(self, stream, tag):
+        """Читает поток кусками, не дожидаясь перевода строки"""
+        decoder = codecs.getincrementaldecoder(self.encoding)(errors="replace")
+        carry = ""
+        try:
+            while True:
+                data = os.read(stream.fileno(), self.CHUNK_SIZE)
+                text = carry + decoder.decode(data, final=not data)
+                carry = ""
+                if data and text.endswith("\r"):
+                    # "\r\n" может разорваться между кусками
+                    text, carry = text[:-1], "\r"
+                if text:
+                    self._put((self.key, tag, text.replace("\r\n", "\n").replace("\r", "\n")))
+                if not data or self.stopped:
+                    break
+        except (OSError, ValueError):
+            pass
+        finally:
+            try:
+                stream.close()
+            except OSError:
+                pass
+            self._put((self.key, tag, None))
+
+
+def process_group_options():
+    """Параметры Popen, запускающие процесс в собственной группе процессов"""
+    if platform.system() == "Windows":
+        return {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP | subprocess.CREATE_NO_WINDOW}
+    return {"start_new_session": True}
+
+
+def signal_process_group(process, interrupt=False):
+    """Прерывает (interrupt=True) или убивает процесс вместе со всеми его потомками.
+
+    В POSIX сигнал получает вся группа, даже если сам процесс уже вышел:
+    его потомки могут продолжать работать и держать открытым вывод.
+    """
+    try:
+        if platform.system() == "Windows":
+            # Без живого родителя taskkill /T не найдёт дерево процессов
+            if process.poll() is not None:
+                return
+            if interrupt:
+                process.send_signal(signal.CTRL_BREAK_EVENT)
+            else:
+                # /T завершает всё дерево процессов, а не только прямого потомка
+                subprocess.run(["taskkill", "/F", "/T", "/PID", str(process.pid)],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                               creationflags=subprocess.CREATE_NO_WINDOW)
+                process.kill()
+        else:
+            # Группа живёт, пока в ней есть хоть один процесс; ProcessLookupError - её уже нет
+            os.killpg(process.pid, signal.SIGINT if interrupt else signal.SIGKILL)
+    except (OSError, ValueError):
+        pass
+
+
+def poll_process_usage(process):
+    """Проверяет без ожидания, завершился ли процесс.
+
+    Возвращает None, пока процесс работает, иначе (код выхода, rusage).
+    Там, где есть os.wait4, процесс забирается им, чтобы получить время
+    процессора и пиковую память; иначе rusage равен None.
+    """
+    if process.returncode is not None or not hasattr(os, "wait4"):
+        return_code = process.poll()
+        return None if return_code is None else (return_code, None)
+    try:
+        pid, status, usage = os.wait4(process.pid, os.WNOHANG)
+    except ChildProcessError:
+        return process.poll(), None
+    if pid == 0:
+        return None
+    # Popen больше не будет ждать процесс: код выхода уже известен
+    # (в том же виде, что у Popen: убитый сигналом процесс - минус номер сигнала)
+    if os.WIFSIGNALED(status):
+        process.returncode = -os.WTERMSIG(status)
+    else:
+        process.returncode = os.WEXITSTATUS(status)
+    return process.returncode, usage
+
+
+# Загрузчик запуска кода: заранее импортирует модули из argv, затем ждёт
+# в stdin заголовок JSON и код и выполняет его как __main__. Так запускаются
+# и тёплые, и обычные процессы, поэтому код не пишется во временный файл
+WARM_WORKER_BOOTSTRAP = r'''
+import sys, os, json, types, builtins, linecache, traceback
+for _name in sys.argv[1:]:
+    try:
+        __import__(_name)
+    except Exception:
+        pass
+_header = json.loads(sys.stdin.buffer.readline())
+_path = _header["path"]
+_code = sys.stdin.buffer.read(_header["size"]).decode("utf-8")
+os.chdir(_header["cwd"])
+# Ограничения ставятся до выполнения кода и наследуются его дочерними процессами
+try:
+    import resource
+except ImportError:
+    resource = None
+for _name, _value in (("RLIMIT_CPU", _header["limits"].get("cpu_seconds")),
+                      ("RLIMIT_AS", _header["limits"].get("memory_bytes"))):
+    if resource is not None and _value and hasattr(resource, _name):
+        try:
+            resource.setrlimit(getattr(resource, _name), (_value, _value))
+        except (ValueError, OSError):
+            pass
+sys.argv = [_path]
+sys.path[0] = os.path.dirname(_path)
+# Трассировки показывают строки переданного кода, даже если файла нет на диске
+linecache.cache[_path] = (len(_code), None, _code.splitlines(True), _path)
+_module = types.ModuleType("__main__")
+_module.__file__ = _path
+_module.__builtins__ = builtins
+sys.modules["__main__"] = _module
+
+
+class _SamplingProfiler:
+    """Раз в interval секунд снимает стек главного потока.
+
+    Каждому снимку приписывается время, прошедшее с предыдущего: поток
+    профилировщика просыпается реже, пока код не отпускает GIL.
+    """
+
+    def __init__(self, interval):
+        import threading
+        self.interval = interval
+        self.target = threading.get_ident()
+        self.own = {}
+        self.total = {}
+        self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def enable(self):
+        self.thread.start()
+
+    def disable(self):
+        self.running = False
+        self.thread.join()
+
+    def run(self):
+        import time
+        last = time.perf_counter()
+        while self.running:
+            time.sleep(self.interval)
+            now = time.perf_counter()
+            elapsed, last = now - last, now
+            frame = sys._current_frames().get(self.target)
+            seen = set()
+            top = True
+            while frame is not None:
+                code = frame.f_code
+                # Кадры самого загрузчика в профиль не попадают
+                if code.co_filename != "<string>":
+                    key = (code.co_filename, code.co_firstlineno, code.co_name)
+                    if top:
+                        self.own[key] = self.own.get(key, 0) + elapsed
+                        top = False
+                    if key not in seen:
+                        seen.add(key)
+                        self.total[key] = self.total.get(key, 0) + elapsed
+                frame = frame.f_back
+
+    def rows(self):
+        return [list(key) + [None, self.own.get(key, 0), total_time] for key, total_time in self.total.items()]
+
+
+def _profile_rows(profiler):
+    if isinstance(profiler, _SamplingProfiler):
+        return profiler.rows()
+    import pstats
+    return [[file, line, name, calls, own_time, total_time]
+            for (file, line, name), (_, calls, own_time, total_time, _) in pstats.Stats(profiler).stats.items()]
+
+
+_profiler = None
+if _header.get("profile") == "cprofile":
+    import cProfile
+    _profiler = cProfile.Profile()
+elif _header.get("profile") == "sampling":
+    _profiler = _SamplingProfiler(_header["sample_interval"])
+try:
+    _compiled = compile(_code, _path, "exec")
+    if _profiler is not None:
+        _profiler.enable()
+    exec(_compiled, _module.__dict__)
+except SystemExit:
+    raise
+except BaseException as _error:
+    # Кадр загрузчика в трассировке не нужен
+    traceback.print_exception(type(_error), _error, _error.__traceback__.tb_next)
+    sys.exit(1)
+finally:
+    # Профиль сохраняется и при ошибке, и при sys.exit()
+    if _profiler is not None:
+        _profiler.disable()
+        with open(_header["profile_path"], "w", encoding="utf-8") as _profile_file:
+            json.dump({"file": _path, "mode": _header["profile"], "rows": _profile_rows(_profiler)}, _profile_file)
+'''
+
+
+class WarmInterpreterPool:
+    """Запас заранее запущенных интерпретаторов для быстрого запуска кода.
+
+    Для текущей пары (интерпретатор, предзагружаемые модули) держится size
+    процессов, которые уже запустились и импортировали модули и ждут код в
+    stdin. Каждый процесс выполняет код один раз; взамен взятого сразу
+    запускается новый, который прогревается, пока пользователь правит код.
+    Процессы прежней пары (после смены интерпретатора или списка модулей)
+    завершаются при следующем пополнении запаса.
+    """
+
+    def __init__(self, size=1):
+        self.size = size
+        self.workers = {}
+
+    def spawn(self, executable, modules, cwd, env):
+        """Запускает процесс-загрузчик, ждущий код в stdin"""
+        return subprocess.Popen(
+            [executable, "-c", WARM_WORKER_BOOTSTRAP] + list(modules),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            stdin=subprocess.PIPE,
+            cwd=cwd,
+            env=env,
+            **process_group_options()
+        )
+
+    def fill(self, executable, modules, cwd, env):
+        """Дозапускает процессы до size для данного интерпретатора"""
+        key = (executable, tuple(modules))
+        for old_key in [old_key for old_key in self.workers if old_key != key]:
+            self._kill(self.workers.pop(old_key))
+        workers = [worker for worker in self.workers.get(key, []) if worker.poll() is None]
+        while len(workers) < self.size:
+            workers.append(self.spawn(executable, modules, cwd, env))
+        self.workers[key] = workers
+
+    def take(self, executable, modules):
+        """Забирает готовый процесс или возвращает None, если запас пуст"""
+        workers = self.workers.get((executable, tuple(modules)), [])
+        while workers:
+            worker = workers.pop(0)
+            # Процесс мог завершиться сам (например, при смене venv)
+            if worker.poll() is None:
+                return worker
+        return None
+
+    def run(self, worker, code, path, cwd, limits=None, profile=None):
+        """Передаёт код процессу; запись идёт в отдельном потоке, пока процесс дозагружает модули.
+
+        profile - словарь с ключами profile ("cprofile" или "sampling"),
+        profile_path и sample_interval для запуска под профилировщиком.
+        """
+        data = code.encode("utf-8")
+        header = {"path": path, "cwd": cwd, "size": len(data), "limits": limits or {}}
+        header.update(profile or {})
+        header = json.dumps(header).encode("utf-8") + b"\n"
+
+        def send():
+            try:
+                worker.stdin.write(header + data)
+                worker.stdin.close()
+            except (OSError, ValueError):
+                pass
+
+        threading.Thread(target=send, daemon=True).start()
+
+    def shutdown(self):
+        """Завершает все ожидающие процессы"""
+        for workers in self.workers.values():
+            self._kill(workers)
+        self.workers.clear()
+
+    @staticmethod
+    def _kill(workers):
+        for worker in workers:
+            if worker.poll() is None:
+                worker.kill()
+
+
+# Загрузчик ядра: подключается к редактору по локальному сокету, получает
+# запросы (строка JSON и код), выполняет их в общем __main__ и отвечает
+# строкой JSON со статусом. Вывод программы идёт в stdout и stderr процесса
+KERNEL_BOOTSTRAP = r'''
+import sys, os, json, time, types, signal, socket, builtins, linecache, traceback
+if hasattr(signal, "SIGBREAK"):
+    signal.signal(signal.SIGBREAK, signal.default_int_handler)
+_connection = socket.create_connection(("127.0.0.1", int(sys.argv[1])))
+_channel = _connection.makefile("rwb")
+_channel.write(sys.argv[2].encode("ascii") + b"\n")
+_channel.flush()
+_module = types.ModuleType("__main__")
+_module.__builtins__ = builtins
+sys.modules["__main__"] = _module
+sys.argv = [""]
+while True:
+    try:
+        _line = _channel.readline()
+    except KeyboardInterrupt:
+        continue
+    if not _line:
+        break
+    _request = json.loads(_line)
+    _source = _channel.read(_request["size"]).decode("utf-8")
+    _path = _request["path"]
+    # Пустые строки впереди сохраняют номера строк файла в трассировках
+    _source = "\n" * (_request["line"] - 1) + _source
+    linecache.cache[_path] = (len(_source), None, _source.splitlines(True), _path)
+    _module.__file__ = _path
+    sys.path[0] = os.path.dirname(_path)
+    _status = "ok"
+    _started = time.perf_counter()
+    try:
+        exec(compile(_source, _path, "exec"), _module.__dict__)
+    except KeyboardInterrupt:
+        _status = "interrupted"
+        print("KeyboardInterrupt", file=sys.stderr)
+    except SystemExit:
+        _status = "exit"
+    except BaseException as _error:
+        _status = "error"
+        traceback.print_exception(type(_error), _error, _error.__traceback__.tb_next)
+    sys.stdout.flush()
+    sys.stderr.flush()
+    _reply = {"status": _status, "elapsed": time.perf_counter() - _started}
+    _channel.write(json.dumps(_reply).encode("utf-8") + b"\n")
+    _channel.flush()
+'''
+
+
+class PythonKernel:
+    """Долгоживущий интерпретатор проекта для выполнения ячеек и выделений.
+
+    Код передаётся через локальный сокет (127.0.0.1, проверка по токену),
+    вывод читается из stdout и stderr процесса через ProcessOutputReader.
+    Ответы ядра о завершении кода складываются в очередь replies.
+    Переменные сохраняются между запусками, пока ядро не перезапущено.
+    """
+
+    CONNECT_TIMEOUT = 30
+
+    def __init__(self, executable, cwd, env, output_queue, key):
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.bind(("127.0.0.1", 0))
+        self.listener.listen(1)
+        self.listener.settimeout(self.CONNECT_TIMEOUT)
+        self.token = secrets.token_hex(16)
+        self.process = subprocess.Popen(
+            [executable, "-c", KERNEL_BOOTSTRAP, str(self.listener.getsockname()[1]), self.token],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            stdin=subprocess.DEVNULL,
+            cwd=cwd,
+            env=env,
+            **process_group_options()
+        )
+        self.reader = ProcessOutputReader(self.process, output_queue, key, encoding="utf-8")
+        self.replies = queue.Queue()
+        self.channel = None
+        self.connected = threading.Event()
+        self.busy = False
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def _serve(self):
+        """Принимает подключение ядра и читает его ответы"""
+        try:
+            while True:
+                connection, _ = self.listener.accept()
+                channel = connection.makefile("rwb")
+                if channel.readline().strip() == self.token.encode("ascii"):
+                    break
+                connection.close()
+            self.channel = channel
+            self.connected.set()
+            for line in channel:
+                self.replies.put(json.loads(line))
+        except (OSError, ValueError):
+            pass
+        finally:
+            self.listener.close()
+            self.connected.set()
+            self.replies.put(None)
+
+    def alive(self):
+        """Работает ли процесс ядра"""
+        return self.process.poll() is None
+
+    def execute(self, code, path, line):
+        """Отправляет код на выполнение; line - номер первой строки кода в файле"""
+        data = code.encode("utf-8")
+        header = json.dumps({"path": path, "line": line, "size": len(data)}).encode("utf-8") + b"\n"
+        self.busy = True
+
+        def send():
+            # Ядро могло ещё не подключиться: ждём в отдельном потоке
+            self.connected.wait()
+            try:
+                self.channel.write(header + data)
+                self.channel.flush()
+            except (AttributeError, OSError, ValueError):
+                pass
+
+        threading.Thread(target=send, daemon=True).start()
+
+    def interrupt(self):
+        """Прерывает выполняющийся код (KeyboardInterrupt в ядре)"""
+        signal_process_group(self.process, interrupt=True)
+
+    def shutdown(self):
+        """Завершает ядро и всё, что оно запустило"""
+        self.reader.stop()
+        signal_process_group(self.process)
+
+
+def scan_project_files(folder_path, ignore, suffix="", recursive=True, stopped=lambda: False, folders=None):
+    """Находит файлы папки, не скрытые правилами ignore: словарь путь -> (mtime_ns, размер).
+
+    В список folders, если он передан, добавляются найденные вложенные папки.
+    """
+    found = {}
+    stack = [folder_path]
+    while stack and not stopped():
+        try:
+            with os.scandir(stack.pop()) as scan:
+                for entry in scan:
+                    try:
+                        is_dir = entry.is_dir(follow_symlinks=False)
+                        if ignore.is_ignored(entry.path, entry.name, is_dir):
+                            continue
+                        if is_dir:
+                            if folders is not None:
+                                folders.append(entry.path)
+                            if recursive:
+                                stack.append(entry.path)
+                        elif entry.name.endswith(suffix):
+                            stat_result = entry.stat()
+                            found[entry.path] = (stat_result.st_mtime_ns, stat_result.st_size)
+                    except OSError:
+                        pass
+        except OSError:
+            pass
+    return found
+
+
+def extract_symbols(tree):
+    """Список (имя, вид, строка, родитель) классов, функций, методов и импортов дерева ast"""
+    symbols = []
+    stack = [(tree, "", False)]
+    while stack:
+        node, parent, in_class = stack.pop()
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, ast.ClassDef):
+                symbols.append((child.name, "class", child.lineno, parent))
+                stack.append((child, f"{parent}.{child.name}" if parent else child.name, True))
+            elif isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                symbols.append((child.name, "method" if in_class else "function", child.lineno, parent))
+                stack.append((child, f"{parent}.{child.name}" if parent else child.name, False))
+            elif isinstance(child, (ast.Import, ast.ImportFrom)):
+                for alias in child.names:
+                    if alias.name != "*":
+                        name = alias.asname or (alias.name.split(".")[0] if isinstance(child, ast.Import) else alias.name)
+                        symbols.append((name, "import", child.lineno, parent))
+            elif isinstance(child, ast.stmt):
+                # Определения внутри if, try, with и циклов
+                stack.append((child, parent, in_class))
+    symbols.sort(key=lambda symbol: symbol[2])
+    return symbols
+
+
+def parse_symbol_file(file_path):
+    """Разбирает файл для SymbolIndex; выполняется в процессах пула"""
+    try:
+        with open(file_path, "rb") as f:
+            return file_path, extract_symbols(ast.parse(f.read(), file_path))
+    except (OSError, SyntaxError, ValueError, RecursionError):
+        return file_path, []
+
+
+def parse_symbol_files(file_paths):
+    """Разбирает пачку файлов в одном процессе пула"""
+    return [parse_symbol_file(file_path) for file_path in file_paths]
+
+
+class SymbolIndex:
+    """Индекс символов проекта в базе SQLite.
+
+    Для каждого .py файла хранятся время изменения и размер, поэтому при
+    повторном открытии проекта разбираются только изменившиеся файлы.
+    Разбор идёт в пуле процессов, запись - в фоновом потоке со своим
+    соединением; запросы главного потока идут через отдельное соединение.
+    Имена определений с числом их вхождений и дерево имён для
+    автодополнения поток записи обновляет по старым и новым символам
+    каждого файла. Поиск по подстроке идёт в отдельном потоке
+    (find_substring), его результаты - в очереди search_results.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, mtime INTEGER, size INTEGER);
+        CREATE TABLE IF NOT EXISTS symbols (path TEXT, name TEXT COLLATE NOCASE, kind TEXT, line INTEGER, parent TEXT);
+        CREATE INDEX IF NOT EXISTS symbols_name ON symbols (name);
+        CREATE INDEX IF NOT EXISTS symbols_path ON symbols (path);
+    """
+    COMMIT_EVERY = 200
+    POOL_THRESHOLD = 50
+    POOL_CHUNK_SIZE = 16
+    FIND_LIMIT = 200
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.connection = self._connect()
+        self.jobs = queue.Queue()
+        self.progress = None
+        self.cancelled = False
+        # Имя определения -> число символов с ним; None, пока не прочитано из базы
+        self.names = None
+        self.trie = PrefixTrie()
+        self.names_lock = threading.Lock()
+        self.searches = queue.Queue()
+        self.search_results = queue.Queue()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        self.search_thread = threading.Thread(target=self._run_searches, daemon=True)
+        self.search_thread.start()
+
+    def _connect(self):
+        connection = sqlite3.connect(self.db_path)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.executescript(self.SCHEMA)
+        return connection
+
+    @property
+    def busy(self):
+        """Идёт ли индексация"""
+        return self.progress is not None
+
+    def index_folder(self, folder_path, ignore):
+        """Ставит в очередь сверку всей папки с индексом"""
+        self.progress = (0, 0)
+        self.jobs.put((folder_path, ignore))
+
+    def update_file(self, file_path):
+        """Ставит в очередь переиндексацию одного файла"""
+        self.jobs.put((file_path, None))
+
+    def stop(self):
+        """Прерывает индексацию и закрывает базу.
+
+        Поток записи не ожидается: он сам закроет своё соединение, как только
+        заметит отмену, а интерфейс тем временем открывает другой проект.
+        """
+        self.cancelled = True
+        self.jobs.put(None)
+        self.searches.put(None)
+        self.connection.close()
+
+    def find(self, query, limit=FIND_LIMIT):
+        """Символы, имя которых начинается с query (без учёта регистра); поиск идёт по индексу"""
+        pattern = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        return self.connection.execute(
+            "SELECT name, kind, path, line, parent FROM symbols "
+            "WHERE name LIKE ? ESCAPE '\\' AND kind != 'import' ORDER BY length(name), name LIMIT ?",
+            (pattern + "%", limit)
+        ).fetchall()
+
+    def find_substring(self, query, limit=FIND_LIMIT):
+        """Ставит в очередь поиск символов, имя которых содержит query не с начала.
+
+        Результат появится в search_results как (query, строки). Из
+        накопившихся запросов выполняется только последний.
+        """
+        self.searches.put((query, limit))
+
+    def complete(self, prefix, limit=50):
+        """Имена определений проекта, начинающиеся с prefix (для автодополнения)"""
+        with self.names_lock:
+            return self.trie.complete(prefix, limit)
+
+    def definitions(self, name):
+        """Определения (не импорты) с точно таким именем"""
+        rows = self.connection.execute(
+            "SELECT name, kind, path, line, parent FROM symbols WHERE name = ? AND kind != 'import' ORDER BY path, line",
+            (name,)
+        ).fetchall()
+        # Сравнение в индексе без учёта регистра, точное - здесь
+        return [row for row in rows if row[0] == name]
+
+    def _run_searches(self):
+        """Цикл потока поиска по подстроке"""
+        connection = self._connect()
+        while True:
+            jobs = [self.searches.get()]
+            while not self.searches.empty():
+                jobs.append(self.searches.get())
+            if None in jobs:
+                break
+            query, limit = jobs[-1]
+            lowered = query.lower()
+            with self.names_lock:
+                names = list(self.names or ())
+            # Подстрока ищется по различным именам, а не перебором всей таблицы
+            names = sorted((name for name in names if lowered in name.lower() and not name.lower().startswith(lowered)),
+                           key=lambda name: (len(name), name))[:limit]
+            rows = []
+            if names:
+                try:
+                    rows = connection.execute(
+                        f"SELECT name, kind, path, line, parent FROM symbols WHERE name IN ({', '.join('?' * len(names))}) "
+                        f"AND kind != 'import' ORDER BY length(name), name LIMIT ?",
+                        names + [limit]
+                    ).fetchall()
+                except sqlite3.Error:
+                    pass
+            self.search_results.put((query, rows))
+        connection.close()
+
+    def _run(self):
+        """Цикл фонового потока"""
+        connection = self._connect()
+        self._load_names(connection)
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            path, ignore = job
+            try:
+                if ignore is not None:
+                    self._index_folder(connection, path, ignore)
+                elif os.path.isfile(path):
+                    stat_result = os.stat(path)
+                    self._index_files(connection, {path: (stat_result.st_mtime_ns, stat_result.st_size)})
+                else:
+                    self._remove_files(connection, [path])
+            except (OSError, sqlite3.Error):
+                pass
+            finally:
+                if self.jobs.empty():
+                    self.progress = None
+        connection.close()
+
+    def _load_names(self, connection):
+        """Читает из базы имена определений для поиска по подстроке и автодополнения"""
+        try:
+            # Столбец name сравнивается без учёта регистра, а имена различаются точно
+            rows = connection.execute(
+                "SELECT name, COUNT(*) FROM symbols WHERE kind != 'import' GROUP BY name COLLATE BINARY"
+            ).fetchall()
+        except sqlite3.Error:
+            rows = []
+        with self.names_lock:
+            self.names = dict(rows)
+            self.trie = PrefixTrie(self.names)
+
+    def _update_names(self, old_symbols, new_symbols):
+        """Учитывает замену символов файла: списки (имя, вид) до и после"""
+        delta = {}
+        for symbols, step in ((old_symbols, -1), (new_symbols, 1)):
+            for name, kind in symbols:
+                if kind != "import":
+                    delta[name] = delta.get(name, 0) + step
+        with self.names_lock:
+            for name, change in delta.items():
+                count = self.names.get(name, 0) + change
+                if count > 0:
+                    if name not in self.names:
+                        self.trie.insert(name)
+                    self.names[name] = count
+                elif name in self.names:
+                    del self.names[name]
+                    self.trie.remove(name)
+
+    def _file_symbols(self, connection, path):
+        """Имена и виды символов файла, записанные в базе"""
+        return connection.execute("SELECT name, kind FROM symbols WHERE path = ?", (path,)).fetchall()
+
+    def _index_folder(self, connection, folder_path, ignore):
+        """Сверяет папку с индексом и разбирает новые и изменившиеся файлы"""
+        known = {path: (mtime, size) for path, mtime, size in connection.execute("SELECT path, mtime, size FROM files")}
+        found = scan_project_files(folder_path, ignore, suffix=".py", stopped=lambda: self.cancelled)
+        self._remove_files(connection, [path for path in known if path not in found])
+        self._index_files(connection, {path: stat for path, stat in found.items() if known.get(path) != stat})
+
+    def _remove_files(self, connection, paths):
+        """Удаляет файлы из индекса"""
+        for path in paths:
+            self._update_names(self._file_symbols(connection, path), ())
+            connection.execute("DELETE FROM symbols WHERE path = ?", (path,))
+            connection.execute("DELETE FROM files WHERE path = ?", (path,))
+        connection.commit()
+
+    def _index_files(self, connection, files):
+        """Разбирает файлы (путь -> (mtime_ns, размер)) и записывает их символы"""
+        paths = list(files)
+        executor = None
+        futures = []
+        if len(paths) > self.POOL_THRESHOLD and sys.version_info >= (3, 7):
+            # Запуск пула окупается только на большом числе файлов. Процессы
+            # запускаются через spawn: fork копировал бы процесс с потоками Tk,
+            # а до Python 3.7 способ запуска пула не выбрать
+            executor = concurrent.futures.ProcessPoolExecutor(mp_context=multiprocessing.get_context("spawn"))
+            futures = [executor.submit(parse_symbol_files, paths[start:start + self.POOL_CHUNK_SIZE])
+                       for start in range(0, len(paths), self.POOL_CHUNK_SIZE)]
+            results = (result for future in futures for result in future.result())
+        else:
+            results = map(parse_symbol_file, paths)
+        try:
+            for done, (path, symbols) in enumerate(results, 1):
+                if self.cancelled:
+                    break
+                self._update_names(self._file_symbols(connection, path),
+                                   [(name, kind) for name, kind, _, _ in symbols])
+                connection.execute("DELETE FROM symbols WHERE path = ?", (path,))
+                connection.executemany(
+                    "INSERT INTO symbols VALUES (?, ?, ?, ?, ?)",
+                    [(path, name, kind, line, parent) for name, kind, line, parent in symbols]
+                )
+                connection.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?)", (path,) + files[path])
+                if done % self.COMMIT_EVERY == 0:
+                    connection.commit()
+                    self.progress = (done, len(paths))
+            connection.commit()
+        finally:
+            if executor is not None:
+                # Ещё не начатые задачи отменяются, чтобы пул не разбирал файлы впустую
+                for future in futures:
+                    future.cancel()
+                executor.shutdown(wait=False)
+
+
+def required_trigrams(query, regex=False):
+    """Триграммы (в нижнем регистре), которые обязательно есть в тексте с совпадением.
+
+    Для регулярного выражения берутся только участки обычных символов вне
+    классов [...], квантификаторов {...} и необязательных групп. Если
+    разбор не уверен (альтернатива "|", опережающие проверки, флаги и т.п.),
+    обязательных триграмм нет и проверяются все файлы.
+    """
+    if not regex:
+        runs = [query]
+    elif re.search(r"(?<!\\)\|", query):
+        return set()
+    else:
+        runs = [""]
+        # Для каждой открытой группы - номер участка, с которого она началась
+        groups = []
+        index = 0
+        while index < len(query):
+            char = query[index]
+            if char == "\\":
+                if index + 1 >= len(query):
+                    return set()
+                escaped = query[index + 1]
+                index += 2
+                if escaped.isalnum():
+                    # \d, \w, \b, обратные ссылки и подобные - не буквальные символы
+                    runs.append("")
+                    continue
+                char = escaped
+            elif char == "[":
+                # Класс символов пропускается целиком; "]" сразу после "[" или "[^" - его часть
+                end = index + 1
+                if end < len(query) and query[end] == "^":
+                    end += 1
+                if end < len(query) and query[end] == "]":
+                    end += 1
+                while end < len(query) and query[end] != "]":
+                    end += 2 if query[end] == "\\" else 1
+                if end >= len(query):
+                    return set()
+                runs.append("")
+                index = end + 1
+                continue
+            elif char == "{":
+                end = query.find("}", index)
+                if end < 0 or not re.fullmatch(r"\d*(,\d*)?", query[index + 1:end]):
+                    return set()
+                # Повторение может быть нулевым: предыдущий символ необязателен
+                runs[-1] = runs[-1][:-1]
+                runs.append("")
+                index = end + 1
+                continue
+            elif char == "(":
+                if query.startswith("(?:", index):
+                    index += 3
+                elif query.startswith("(?P<", index):
+                    end = query.find(">", index)
+                    if end < 0:
+                        return set()
+                    index = end + 1
+                elif query.startswith("(?", index):
+                    # Опережающие и ретроспективные проверки, флаги, комментарии
+                    return set()
+                else:
+                    index += 1
+                runs.append("")
+                groups.append(len(runs) - 1)
+                continue
+            elif char == ")":
+                if not groups:
+                    return set()
+                start = groups.pop()
+                index += 1
+                if index < len(query) and query[index] in "?*{":
+                    # Необязательная группа ничего не гарантирует
+                    del runs[start:]
+                runs.append("")
+                continue
+            elif char in ".^$]}":
+                runs.append("")
+                index += 1
+                continue
+            elif char in "*?":
+                # Предыдущий символ может отсутствовать
+                runs[-1] = runs[-1][:-1]
+                runs.append("")
+                index += 1
+                continue
+            elif char == "+":
+                runs.append("")
+                index += 1
+                continue
+            else:
+                index += 1
+            runs[-1] += char
+        if groups:
+            return set()
+    trigrams = set()
+    for run in runs:
+        run = run.lower()
+        trigrams.update(run[i:i + 3] for i in range(len(run) - 2))
+    return trigrams
+
+
+class TrigramIndex:
+    """Индекс триграмм текстовых файлов проекта для поиска по файлам.
+
+    Для каждой триграммы (три символа в нижнем регистре) хранится массив
+    номеров файлов, где она встречается, по возрастанию. Поиск проверяет
+    только файлы, содержащие все обязательные триграммы запроса. Индекс
+    строится в фоновом потоке и дальше обновляется по событиям наблюдателя
+    за папками и по сохранениям (update_file); файлы сверяются по времени
+    изменения и размеру. Новые папки проекта кладутся в очередь new_folders,
+    чтобы редактор начал следить и за ними.
+    """
+
+    BINARY_CHECK_SIZE = 8192
+    # Сколько номеров удалённых файлов может остаться в массивах до их чистки
+    MIN_COMPACT = 1000
+
+    def __init__(self, max_file_size):
+        self.max_file_size = max_file_size
+        self.lock = threading.Lock()
+        self.files = {}
+        self.paths = {}
+        self.postings = {}
+        self.next_id = 0
+        self.dead = 0
+        self.folders = set()
+        self.new_folders = queue.Queue()
+        self.jobs = queue.Queue()
+        self.progress = None
+        self.cancelled = False
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    @property
+    def busy(self):
+        """Идёт ли индексация"""
+        return self.progress is not None
+
+    def index_folder(self, folder_path, ignore, recursive=True):
+        """Ставит в очередь сверку папки с индексом"""
+        self.progress = (0, 0)
+        self.jobs.put((folder_path, ignore, recursive))
+
+    def update_file(self, file_path):
+        """Ставит в очередь сверку одного файла с индексом"""
+        self.jobs.put((file_path, None, False))
+
+    def stop(self):
+        """Прерывает индексацию"""
+        self.cancelled = True
+        self.jobs.put(None)
+        self.thread.join()
+
+    def candidates(self, trigrams):
+        """Файлы, содержащие все триграммы: список (путь, mtime_ns)"""
+        with self.lock:
+            if not trigrams:
+                file_ids = list(self.paths)
+            else:
+                # Пересечение начинается с самого короткого массива, остальные
+                # проверяются двоичным поиском: массивы упорядочены по номеру
+                postings = sorted((self.postings.get(trigram, ()) for trigram in trigrams), key=len)
+                file_ids = [file_id for file_id in postings[0] if file_id in self.paths]
+                for posting in postings[1:]:
+                    if not file_ids:
+                        break
+                    file_ids = [file_id for file_id in file_ids if self._contains(posting, file_id)]
+            return [(self.paths[file_id], self.files[self.paths[file_id]][1]) for file_id in file_ids]
+
+    @staticmethod
+    def _contains(posting, file_id):
+        position = bisect.bisect_left(posting, file_id)
+        return position < len(posting) and posting[position] == file_id
+
+    def _run(self):
+        """Цикл фонового потока"""
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            path, ignore, recursive = job
+            try:
+                if ignore is not None:
+                    self._index_folder(path, ignore, recursive)
+                elif os.path.isfile(path):
+                    stat_result = os.stat(path)
+                    stat = (stat_result.st_mtime_ns, stat_result.st_size)
+                    # Наблюдатель сообщает о каждой записи; неизменившийся файл не перечитывается
+                    with self.lock:
+                        known = self.files.get(path, (None, None, None))[1:]
+                    if known != stat:
+                        self._add_file(path, stat)
+                else:
+                    self._remove_file(path)
+            except OSError:
+                pass
+            finally:
+                if self.jobs.empty():
+                    self.progress = None
+
+    def _index_folder(self, folder_path, ignore, recursive):
+        """Добавляет новые и изменившиеся файлы папки и убирает исчезнувшие"""
+        folders = []
+        found = scan_project_files(folder_path, ignore, recursive=recursive,
+                                   stopped=lambda: self.cancelled, folders=folders)
+        if self.cancelled:
+            # Неполный обход нельзя использовать для удаления файлов из индекса
+            return
+        prefix = os.path.join(folder_path, "")
+        with self.lock:
+            known = [path for path in self.files if path.startswith(prefix)]
+        for path in known:
+            # Без рекурсии вложенные файлы убираются, только если их папки больше нет
+            folder = os.path.dirname(path)
+            if path not in found and (recursive or folder == folder_path or not os.path.isdir(folder)):
+                self._remove_file(path)
+        self.folders.difference_update([folder for folder in self.folders
+                                        if folder.startswith(prefix) and not os.path.isdir(folder)])
+        new_folders = [folder for folder in [folder_path] + folders if folder not in self.folders]
+        for folder in new_folders:
+            self.folders.add(folder)
+            self.new_folders.put(folder)
+        with self.lock:
+            changed = [(path, stat) for path, stat in found.items()
+                       if self.files.get(path, (None, None, None))[1:] != stat]
+        for done, (path, stat) in enumerate(changed, 1):
+            if self.cancelled:
+                return
+            self._add_file(path, stat)
+            if done % 100 == 0:
+                self.progress = (done, len(changed))
+        if not recursive:
+            # Папка, появившаяся внутри, ещё не проиндексирована вместе с содержимым
+            for folder in new_folders:
+                if folder != folder_path:
+                    self._index_folder(folder, ignore, True)
+
+    def _add_file(self, path, stat):
+        """Индексирует файл; двоичные и слишком большие файлы пропускаются"""
+        text = self.read_text(path, stat[1])
+        trigrams = ()
+        if text is not None:
+            text = text.lower()
+            trigrams = {text[i:i + 3] for i in range(len(text) - 2)}
+        with self.lock:
+            self._remove_locked(path)
+            if text is None:
+                return
+            # Номера только растут, поэтому дописывание сохраняет порядок массивов
+            file_id = self.next_id
+            self.next_id += 1
+            self.files[path] = (file_id,) + stat
+            self.paths[file_id] = path
+            for trigram in trigrams:
+                posting = self.postings.get(trigram)
+                if posting is None:
+                    self.postings[trigram] = array("I", (file_id,))
+                else:
+                    posting.append(file_id)
+
+    def _remove_file(self, path):
+        with self.lock:
+            self._remove_locked(path)
+
+    def _remove_locked(self, path):
+        """Убирает файл: его номер просто становится недействительным"""
+        entry = self.files.pop(path, None)
+        if entry is None:
+            return
+        del self.paths[entry[0]]
+        self.dead += 1
+        # Массивы чистятся от удалённых номеров, когда их накопилось много
+        if self.dead > max(self.MIN_COMPACT, len(self.paths)):
+            self._compact_locked()
+
+    def _compact_locked(self):
+        live = self.paths
+        for trigram, posting in list(self.postings.items()):
+            kept = array("I", (file_id for file_id in posting if file_id in live))
+            if kept:
+                self.postings[trigram] = kept
+            else:
+                del self.postings[trigram]
+        self.dead = 0
+
+    def read_text(self, path, size=None):
+        """Текст файла или None для двоичного или слишком большого файла"""
+        if size is not None and size > self.max_file_size:
+            return None
+        try:
+            with open(path, "rb") as f:
+                data = f.read(self.max_file_size + 1)
+        except OSError:
+            return None
+        if len(data) > self.max_file_size or b"\0" in data[:self.BINARY_CHECK_SIZE]:
+            return None
+        return data.decode("utf-8", errors="replace")
+
+
+class FileSearch:
+    """Поиск по файлам-кандидатам из TrigramIndex в фоновом потоке.
+
+    Совпадения (путь, строка, столбец начала, столбец конца, текст строки)
+    идут в очередь results по мере нахождения; None означает конец поиска.
+    Файлы проверяются в порядке ранга: сначала приоритетный (текущий) файл,
+    затем файлы с запросом в имени, затем недавно изменённые.
+    """
+
+    MAX_RESULTS = 5000
+    MAX_LINE_LENGTH = 300
+
+    def __init__(self, index, query, regex=False, case_sensitive=False, priority_path=None):
+        flags = 0 if case_sensitive else re.IGNORECASE
+        self.pattern = re.compile(query if regex else re.escape(query), flags)
+        self.index = index
+        self.query = query
+        self.regex = regex
+        self.priority_path = priority_path
+        self.results = queue.Queue()
+        self.cancelled = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def cancel(self):
+        """Прекращает поиск"""
+        self.cancelled.set()
+
+    def rank(self, candidate):
+        path, mtime = candidate
+        lowered = self.query.lower()
+        return (path != self.priority_path, lowered not in os.path.basename(path).lower(), -mtime)
+
+    def _run(self):
+        found = 0
+        try:
+            for path, _ in sorted(self.index.candidates(required_trigrams(self.query, self.regex)), key=self.rank):
+                if self.cancelled.is_set():
+                    break
+                text = self.index.read_text(path)
+                if text is None:
+                    continue
+                line_no, line_start = 1, 0
+                for match in self.pattern.finditer(text):
+                    if self.cancelled.is_set():
+                        break
+                    if match.start() == match.end():
+                        continue
+                    # Номер строки считается от предыдущего совпадения, а не от начала файла
+                    line_no += text.count("\n", line_start, match.start())
+                    line_start = text.rfind("\n", 0, match.start()) + 1
+                    line_end = text.find("\n", match.start())
+                    line = text[line_start:line_end if line_end != -1 else len(text)]
+                    column = match.start() - line_start
+                    self.results.put((path, line_no, column, column + len(match.group()),
+                                      line[:self.MAX_LINE_LENGTH]))
+                    found += 1
+                    if found >= self.MAX_RESULTS:
+                        return
+        finally:
+            self.results.put(None)
+
+
+# Процесс проверки кода: читает из stdin заголовок JSON и текст, проверяет
+# синтаксис через compile(), а при наличии pyflakes - неиспользуемые и
+# неопределённые имена, и пишет в stdout строку JSON с замечаниями
+LINT_WORKER_BOOTSTRAP = r'''
+import sys, json, ast
+try:
+    from pyflakes import checker as _checker, messages as _messages
+except ImportError:
+    _checker = None
+_ERRORS = ("UndefinedName", "UndefinedLocal", "UndefinedExport", "DuplicateArgument", "ReturnOutsideFunction")
+
+
+def _unused_imports(tree):
+    """Упрощённая проверка без pyflakes: импорты модуля, имя которых нигде не используется"""
+    used = {node.id for node in ast.walk(tree) if isinstance(node, ast.Name)}
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Constant) and isinstance(node.value, str):
+            used.add(node.value)
+        elif sys.version_info < (3, 8) and isinstance(node, ast.Str):
+            # До Python 3.8 строки в дереве - ast.Str
+            used.add(node.s)
+    problems = []
+    for node in tree.body:
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            for alias in node.names:
+                name = alias.asname or alias.name.split(".")[0]
+                if alias.name != "*" and name not in used:
+                    problems.append([node.lineno, node.col_offset, "warning", f"'{alias.name}' imported but unused"])
+    return problems
+
+
+def _names(tree):
+    """Имена буфера для автодополнения и словарь импортов: имя -> модуль"""
+    names = set()
+    imports = {}
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name):
+            names.add(node.id)
+        elif isinstance(node, ast.Attribute):
+            names.add(node.attr)
+        elif isinstance(node, ast.arg):
+            names.add(node.arg)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names.add(node.name)
+        elif isinstance(node, ast.Import):
+            for alias in node.names:
+                if alias.asname:
+                    imports[alias.asname] = alias.name
+                else:
+                    imports[alias.name.split(".")[0]] = alias.name.split(".")[0]
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            for alias in node.names:
+                if alias.name != "*":
+                    imports[alias.asname or alias.name] = f"{node.module}.{alias.name}"
+    names.update(imports)
+    return sorted(names), imports
+
+
+def _lint(source, path):
+    try:
+        tree = compile(source, path, "exec", ast.PyCF_ONLY_AST)
+        # Часть ошибок (return вне функции и т.п.) находит только компилятор
+        compile(tree, path, "exec")
+    except SyntaxError as error:
+        return [[error.lineno or 1, max((error.offset or 1) - 1, 0), "error", error.msg]], None
+    except (ValueError, RecursionError) as error:
+        return [[1, 0, "error", str(error)]], None
+    if _checker is None:
+        return _unused_imports(tree), tree
+    problems = []
+    for message in _checker.Checker(tree, filename=path).messages:
+        severity = "error" if type(message).__name__ in _ERRORS else "warning"
+        problems.append([message.lineno, getattr(message, "col", 0), severity, message.message % message.message_args])
+    return sorted(problems), tree
+
+
+while True:
+    _line = sys.stdin.buffer.readline()
+    if not _line:
+        break
+    _request = json.loads(_line)
+    _source = sys.stdin.buffer.read(_request["size"]).decode("utf-8")
+    _reply = {"key": _request["key"], "names": None, "imports": None}
+    try:
+        _reply["problems"], _tree = _lint(_source, _request["path"])
+        # Имена берутся только из разобранного текста; при синтаксической ошибке - None
+        if _tree is not None:
+            _reply["names"], _reply["imports"] = _names(_tree)
+    except Exception as _error:
+        _reply["problems"] = [[1, 0, "error", f"lint failed: {_error!r}"]]
+    sys.stdout.write(json.dumps(_reply) + "\n")
+    sys.stdout.flush()
+'''
+
+
+class LintWorker:
+    """Отдельный процесс, проверяющий код, пока редактор работает.
+
+    Снимки текста передаются через stdin потоком-отправителем; если
+    процесс ещё занят, ждущий снимок заменяется более новым. Ответы
+    (ключ, словарь с замечаниями problems и именами names/imports для
+    автодополнения) поток-читатель кладёт в очередь results. Упавший
+    процесс перезапускается при следующей проверке.
+    """
+
+    def __init__(self, executable):
+        self.executable = executable
+        self.process = None
+        self.results = queue.Queue()
+        self.condition = threading.Condition()
+        self.waiting = None
+        self.stopped = False
+        threading.Thread(target=self._send, daemon=True).start()
+
+    def _start(self):
+        self.process = subprocess.Popen(
+            [self.executable, "-c", LINT_WORKER_BOOTSTRAP],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            **process_group_options()
+        )
+        threading.Thread(target=self._receive, args=(self.process,), daemon=True).start()
+
+    def submit(self, key, path, source):
+        """Ставит снимок на проверку, вытесняя ещё не отправленный"""
+        with self.condition:
+            self.waiting = (key, path, source)
+            self.condition.notify()
+
+    def stop(self):
+        """Останавливает процесс проверки"""
+        with self.condition:
+            self.stopped = True
+            self.condition.notify()
+        if self.process is not None:
+            signal_process_group(self.process)
+
+    def _send(self):
+        """Цикл потока-отправителя"""
+        while True:
+            with self.condition:
+                while self.waiting is None and not self.stopped:
+                    self.condition.wait()
+                if self.stopped:
+                    return
+                key, path, source = self.waiting
+                self.waiting = None
+            data = source.encode("utf-8")
+            header = json.dumps({"key": key, "path": path, "size": len(data)}).encode("utf-8") + b"\n"
+            # Второй попыткой снимок уходит новому процессу, если прежний успел упасть
+            for _ in range(2):
+                try:
+                    if self.process is None or self.process.poll() is not None:
+                        self._start()
+                    self.process.stdin.write(header + data)
+                    self.process.stdin.flush()
+                    break
+                except (OSError, ValueError):
+                    self.process = None
+
+    def _receive(self, process):
+        """Цикл потока-читателя"""
+        for line in process.stdout:
+            try:
+                reply = json.loads(line)
+            except ValueError:
+                continue
+            self.results.put((reply["key"], reply))
+
+
+class PrefixTrie:
+    """Префиксное дерево имён для автодополнения.
+
+    Узлы хранят слова "корзинами": пока в поддереве не больше BUCKET_SIZE
+    слов, они лежат в одном списке узла, а при переполнении узел
+    разбивается на дочерние по следующему символу. Так памяти нужно
+    намного меньше, чем дереву с узлом на каждый символ. Разбитый узел
+    помнит TOP_SIZE самых коротких слов своего поддерева, поэтому поиск
+    по префиксу - это спуск на длину префикса и не зависит от числа слов.
+    """
+
+    BUCKET_SIZE = 64
+    TOP_SIZE = 50
+
+    class Node:
+        __slots__ = ("children", "words", "top", "size")
+
+        def __init__(self):
+            # children is None - узел-корзина со всеми словами поддерева;
+            # иначе в words только слова, заканчивающиеся на этом узле,
+            # а size - число слов поддерева
+            self.children = None
+            self.words = []
+            self.top = None
+            self.size = 0
+
+    def __init__(self, words=()):
+        self.root = self.Node()
+        self.known = set()
+        for word in words:
+            self.insert(word)
+
+    def __len__(self):
+        return len(self.known)
+
+    @staticmethod
+    def rank(word):
+        """Порядок вариантов: сначала короткие, затем по алфавиту"""
+        return len(word), word
+
+    def insert(self, word):
+        """Добавляет слово"""
+        if word in self.known:
+            return
+        self.known.add(word)
+        node, depth = self.root, 0
+        while node.children is not None:
+            node.size += 1
+            self._add_top(node, word)
+            if depth == len(word):
+                break
+            child = node.children.get(word[depth])
+            if child is None:
+                child = node.children[word[depth]] = self.Node()
+            node, depth = child, depth + 1
+        node.words.append(word)
+        if node.children is None and len(node.words) > self.BUCKET_SIZE:
+            self._burst(node, depth)
+
+    def remove(self, word):
+        """Убирает слово; узлы не сливаются обратно в корзины"""
+        if word not in self.known:
+            return
+        self.known.discard(word)
+        node, depth = self.root, 0
+        path = []
+        while node.children is not None:
+            path.append(node)
+            if depth == len(word):
+                break
+            node, depth = node.children[word[depth]], depth + 1
+        node.words.remove(word)
+        ranked = self.rank(word)
+        for node in path:
+            node.size -= 1
+            index = bisect.bisect_left(node.top, ranked)
+            if index < len(node.top) and node.top[index] == ranked:
+                del node.top[index]
+                if len(node.top) < node.size:
+                    # Из списка ушло одно из самых коротких слов, на его место встаёт следующее
+                    node.top = sorted(map(self.rank, self._subtree_words(node)))[:self.TOP_SIZE]
+
+    @staticmethod
+    def _subtree_words(node):
+        """Все слова поддерева узла"""
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            yield from node.words
+            if node.children is not None:
+                stack.extend(node.children.values())
+
+    def _add_top(self, node, word):
+        """Учитывает слово в списке самых коротких слов разбитого узла"""
+        top = node.top
+        ranked = self.rank(word)
+        if len(top) < self.TOP_SIZE or ranked < top[-1]:
+            bisect.insort(top, ranked)
+            del top[self.TOP_SIZE:]
+
+    def _burst(self, node, depth):
+        """Разбивает переполненную корзину на дочерние узлы"""
+        words, node.words, node.children = node.words, [], {}
+        node.size = len(words)
+        # Слова хранятся вместе с ключом порядка (длина, слово)
+        node.top = sorted(map(self.rank, words))[:self.TOP_SIZE]
+        for word in words:
+            if len(word) == depth:
+                node.words.append(word)
+            else:
+                child = node.children.get(word[depth])
+                if child is None:
+                    child = node.children[word[depth]] = self.Node()
+                child.words.append(word)
+        for child in node.children.values():
+            if len(child.words) > self.BUCKET_SIZE:
+                self._burst(child, depth + 1)
+
+    def complete(self, prefix, limit=50):
+        """Слова, начинающиеся с prefix: сначала короткие, не больше limit (и TOP_SIZE)"""
+        node, depth = self.root, 0
+        while node.children is not None:
+            if depth == len(prefix):
+                # Поддерево разбитого узла - ровно слова с этим префиксом
+                return [word for _, word in node.top[:limit]]
+            node = node.children.get(prefix[depth])
+            if node is None:
+                return []
+            depth += 1
+        return sorted((word for word in node.words if word.startswith(prefix)), key=self.rank)[:limit]
+
+
+# Загрузчик интроспекции интерпретатора: без аргументов печатает JSON со
+# встроенными именами и доступными модулями, с именем модуля - его члены
+COMPLETION_INTROSPECT_BOOTSTRAP = r'''
+import sys, json, builtins, importlib, pkgutil
+if len(sys.argv) > 1:
+    _name = sys.argv[1]
+    try:
+        _object = importlib.import_module(_name)
+    except Exception:
+        # "from пакет import имя": имя может быть атрибутом, а не подмодулем
+        _parent, _, _attribute = _name.rpartition(".")
+        try:
+            _object = getattr(importlib.import_module(_parent), _attribute)
+        except Exception:
+            _object = None
+    _result = [] if _object is None else sorted(name for name in dir(_object) if not name.startswith("__"))
+else:
+    _modules = set(sys.builtin_module_names)
+    _modules.update(module.name for module in pkgutil.iter_modules())
+    _result = {"builtins": dir(builtins), "modules": sorted(_modules)}
+# Импортированные модули могли сами что-то напечатать: ответ - последняя строка
+sys.stdout.write("\n" + json.dumps(_result) + "\n")
+'''
+
+
+class InterpreterCompletions:
+    """Имена для автодополнения, полученные от интерпретатора проекта.
+
+    Встроенные имена, список модулей и члены запрошенных модулей узнаются
+    в фоновых процессах выбранного интерпретатора и сохраняются в файл
+    кэша; кэш сбрасывается, когда меняется исполняемый файл интерпретатора.
+    Дерево имён для членов модуля строится один раз и хранится рядом со
+    списком; у каждого интерпретатора свой экземпляр, так что ключ кэша -
+    интерпретатор и модуль.
+    """
+
+    TIMEOUT = 30
+
+    def __init__(self, executable, cache_folder):
+        self.executable = executable
+        self.cache_path = os.path.join(cache_folder, hashlib.sha1(executable.encode("utf-8")).hexdigest() + ".json")
+        self.data = None
+        self.builtins = PrefixTrie()
+        self.modules = PrefixTrie()
+        self.member_tries = {}
+        self.pending = set()
+        self.lock = threading.Lock()
+        threading.Thread(target=self._load, daemon=True).start()
+
+    def _introspect(self, *args):
+        """Запускает интроспекцию в процессе интерпретатора и разбирает ответ"""
+        completed = subprocess.run(
+            [self.executable, "-c", COMPLETION_INTROSPECT_BOOTSTRAP] + list(args),
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            timeout=self.TIMEOUT,
+            creationflags=subprocess.CREATE_NO_WINDOW if platform.system() == "Windows" else 0
+        )
+        return json.loads(completed.stdout.decode("utf-8", errors="replace").strip().splitlines()[-1])
+
+    def _mtime(self):
+        try:
+            return os.stat(self.executable).st_mtime_ns
+        except OSError:
+            return None
+
+    def _load(self):
+        """Читает кэш или заново опрашивает интерпретатор (в фоновом потоке)"""
+        data = None
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("mtime") != self._mtime():
+                data = None
+        except (OSError, ValueError):
+            data = None
+        if data is None:
+            try:
+                data = self._introspect()
+            except (OSError, ValueError, IndexError, subprocess.SubprocessError):
+                return
+            data.update(executable=self.executable, mtime=self._mtime(), members={})
+            self._save(data)
+        self.builtins = PrefixTrie(data["builtins"])
+        self.modules = PrefixTrie(data["modules"])
+        self.data = data
+
+    def _save(self, data):
+        """Записывает кэш; снимок словаря берётся под блокировкой"""
+        with self.lock:
+            text = json.dumps(data)
+            try:
+                write_file_atomic(self.cache_path, text.encode("utf-8"))
+            except OSError:
+                pass
+
+    def members(self, module):
+        """Члены модуля или None, если они ещё не известны (тогда запрашиваются в фоне)"""
+        if self.data is None:
+            return None
+        members = self.data["members"].get(module)
+        if members is None and module not in self.pending:
+            self.pending.add(module)
+            threading.Thread(target=self._fetch_members, args=(module,), daemon=True).start()
+        return members
+
+    def member_trie(self, module):
+        """Дерево членов модуля или None, если они ещё не известны"""
+        trie = self.member_tries.get(module)
+        if trie is None:
+            members = self.members(module)
+            if members is None:
+                return None
+            trie = self.member_tries[module] = PrefixTrie(members)
+        return trie
+
+    def _fetch_members(self, module):
+        try:
+            members = self._introspect(module)
+        except (OSError, ValueError, IndexError, subprocess.SubprocessError):
+            members = []
+        # Словарь меняется под той же блокировкой, под которой _save его сериализует
+        with self.lock:
+            self.data["members"][module] = members
+        self.pending.discard(module)
+        self._save(self.data)
+
+
+class OutputSpill:
+    """Полный вывод запуска во временном файле.
+
+    Панель вывода хранит только последние строки, а весь вывод дописывается
+    сюда. Для постраничного просмотра запоминаются смещения начала каждой
+    PAGE_LINES-й строки, так что страница читается без просмотра всего файла.
+    """
+
+    PAGE_LINES = 1000
+    SEARCH_LIMIT = 1000
+
+    def __init__(self):
+        fd, self.path = tempfile.mkstemp(prefix="pycode_output_", suffix=".log")
+        self.file = os.fdopen(fd, "wb")
+        self.size = 0
+        self.line_count = 0
+        self.page_offsets = [0]
+
+    def write(self, text):
+        """Дописывает текст и обновляет индекс страниц"""
+        data = text.encode("utf-8")
+        new_lines = data.count(b"\n")
+        first_page = self.line_count // self.PAGE_LINES
+        last_page = (self.line_count + new_lines) // self.PAGE_LINES
+        if last_page > first_page:
+            # Смещения ищем только когда кусок пересекает границу страницы
+            line = self.line_count
+            position = data.find(b"\n")
+            while position != -1:
+                line += 1
+                if line % self.PAGE_LINES == 0:
+                    self.page_offsets.append(self.size + position + 1)
+                position = data.find(b"\n", position + 1)
+        self.file.write(data)
+        self.size += len(data)
+        self.line_count += new_lines
+
+    def flush(self):
+        """Сбрасывает буфер записи на диск"""
+        if not self.file.closed:
+            self.file.flush()
+
+    def close(self):
+        """Закрывает файл на запись; прочитать его по-прежнему можно"""
+        if not self.file.closed:
+            self.file.close()
+
+    def remove(self):
+        """Закрывает и удаляет файл"""
+        self.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    @property
+    def page_count(self):
+        """Количество страниц (последняя может быть неполной)"""
+        if len(self.page_offsets) > 1 and self.page_offsets[-1] == self.size:
+            return len(self.page_offsets) - 1
+        return len(self.page_offsets)
+
+    def read_page(self, page):
+        """Возвращает текст страницы с номером page (с нуля)"""
+        self.flush()
+        start = self.page_offsets[page]
+        end = self.page_offsets[page + 1] if page + 1 < len(self.page_offsets) else self.size
+        with open(self.path, "rb") as f:
+            f.seek(start)
+            return f.read(end - start).decode("utf-8", errors="replace")
+
+    def search(self, pattern):
+        """Ищет строки, подходящие под регулярное выражение pattern.
+
+        Возвращает список (номер строки, строка) не длиннее SEARCH_LIMIT.
+        Файл читается построчно, поэтому размер вывода не важен.
+        """
+        self.flush()
+        matches = []
+        with open(self.path, "r", encoding="utf-8", errors="replace", newline="\n") as f:
+            for line_no, line in enumerate(f, start=1):
+                if pattern.search(line):
+                    matches.append((line_no, line.rstrip("\n")))
+                    if len(matches) >= self.SEARCH_LIMIT:
+                        break
+        return matches
+
+    def save_as(self, file_path):
+        """Копирует полный вывод в file_path"""
+        self.flush()
+        shutil.copyfile(self.path, file_path)
+
+
+class TreeIgnoreRules:
+    """Правила скрытия файлов и папок в дереве проекта.
+
+    Шаблоны в стиле fnmatch из настроек сравниваются с именем элемента.
+    Из .gitignore в корне проекта поддерживается основное подмножество
+    синтаксиса: комментарии, "/" в начале (привязка к корню), "/" в конце
+    (только папки) и шаблоны с путём; отрицания ("!") пропускаются.
+    Папки виртуальных окружений (с файлом pyvenv.cfg) скрываются всегда.
+    """
+
+    def __init__(self, root, patterns=(), use_gitignore=True):
+        self.root = root
+        self.name_patterns = list(patterns)
+        # (шаблон, только папки, сравнивать с путём от корня)
+        self.gitignore_rules = []
+        if use_gitignore:
+            self.load_gitignore(os.path.join(root, ".gitignore"))
+
+    def load_gitignore(self, gitignore_path):
+        """Читает правила из .gitignore"""
+        try:
+            with open(gitignore_path, "r", encoding="utf-8", errors="replace") as f:
+                lines = f.read().splitlines()
+        except OSError:
+            return
+        for line in lines:
+            line = line.strip()
+            if not line or line.startswith("#") or line.startswith("!"):
+                continue
+            dir_only = line.endswith("/")
+            line = line.rstrip("/")
+            anchored = "/" in line
+            line = line.lstrip("/")
+            if line:
+                self.gitignore_rules.append((line, dir_only, anchored))
+
+    def is_ignored(self, path, name, is_dir):
+        """Проверяет, нужно ли скрыть элемент path с именем name"""
+        for pattern in self.name_patterns:
+            if fnmatch.fnmatch(name, pattern):
+                return True
+        if self.gitignore_rules:
+            relative_path = os.path.relpath(path, self.root).replace(os.sep, "/")
+            for pattern, dir_only, anchored in self.gitignore_rules:
+                if dir_only and not is_dir:
+                    continue
+                if fnmatch.fnmatch(relative_path if anchored else name, pattern):
+                    return True
+        return is_dir and os.path.exists(os.path.join(path, "pyvenv.cfg"))
+
+
+class PollingDirectoryWatcher:
+    """Следит за папками, сравнивая время их изменения.
+
+    Время изменения папки меняется при создании, удалении и переименовании
+    элементов в ней, поэтому достаточно одного stat на папку за опрос.
+    Изменившиеся папки кладутся в очередь changes. Правки содержимого
+    файлов время папки не меняют, поэтому очередь file_changes здесь всегда
+    пуста.
+    """
+
+    POLL_INTERVAL = 1.0
+
+    def __init__(self):
+        self.changes = queue.Queue()
+        self.file_changes = queue.Queue()
+        self.folders = {}
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _stat(self, folder_path):
+        try:
+            return os.stat(folder_path).st_mtime_ns
+        except OSError:
+            return None
+
+    def watch(self, folder_path):
+        """Начинает следить за папкой"""
+        mtime = self._stat(folder_path)
+        with self.lock:
+            self.folders[folder_path] = mtime
+
+    def unwatch_tree(self, folder_path):
+        """Прекращает следить за папкой и всеми вложенными"""
+        prefix = os.path.join(folder_path, "")
+        with self.lock:
+            for path in [path for path in self.folders if path == folder_path or path.startswith(prefix)]:
+                del self.folders[path]
+
+    def clear(self):
+        """Прекращает следить за всеми папками"""
+        with self.lock:
+            self.folders.clear()
+
+    def stop(self):
+        """Останавливает поток"""
+        self.stopped.set()
+
+    def _run(self):
+        while not self.stopped.wait(self.POLL_INTERVAL):
+            with self.lock:
+                folders = list(self.folders.items())
+            for folder_path, mtime in folders:
+                current = self._stat(folder_path)
+                if current == mtime:
+                    continue
+                with self.lock:
+                    if folder_path not in self.folders:
+                        continue
+                    self.folders[folder_path] = current
+                self.changes.put(folder_path)
+
+
+class InotifyDirectoryWatcher:
+    """Следит за папками через inotify (Linux), без периодического опроса.
+
+    Интерфейс тот же, что у PollingDirectoryWatcher; кроме изменившихся
+    папок в очередь file_changes кладутся файлы, записанные на месте. Если
+    inotify недоступен, конструктор бросает OSError.
+    """
+
+    IN_MODIFY = 0x00000002
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_DELETE_SELF = 0x00000400
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_ONLYDIR = 0x01000000
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+    WATCH_MASK = (IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+                  | IN_DELETE_SELF | IN_ONLYDIR)
+    EVENT_HEADER = struct.Struct("iIII")
+
+    def __init__(self):
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify is not available")
+        self.libc = ctypes.CDLL(None, use_errno=True)
+        if not hasattr(self.libc, "inotify_init1"):
+            raise OSError("inotify is not available")
+        self.fd = self.libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.changes = queue.Queue()
+        self.file_changes = queue.Queue()
+        self.folders = {}
+        self.descriptors = {}
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def watch(self, folder_path):
+        """Начинает следить за папкой"""
+        descriptor = self.libc.inotify_add_watch(self.fd, os.fsencode(folder_path), self.WATCH_MASK)
+        if descriptor < 0:
+            # Например, исчерпан лимит fs.inotify.max_user_watches: папка просто не отслеживается
+            return
+        with self.lock:
+            self.folders[folder_path] = descriptor
+            self.descriptors[descriptor] = folder_path
+
+    def unwatch_tree(self, folder_path):
+        """Прекращает следить за папкой и всеми вложенными"""
+        prefix = os.path.join(folder_path, "")
+        with self.lock:
+            for path in [path for path in self.folders if path == folder_path or path.startswith(prefix)]:
+                descriptor = self.folders.pop(path)
+                # Один дескриптор может быть выдан повторно для той же папки
+                if self.descriptors.get(descriptor) == path:
+                    del self.descriptors[descriptor]
+                    self.libc.inotify_rm_watch(self.fd, descriptor)
+
+    def clear(self):
+        """Прекращает следить за всеми папками"""
+        with self.lock:
+            for descriptor in self.descriptors:
+                self.libc.inotify_rm_watch(self.fd, descriptor)
+            self.folders.clear()
+            self.descriptors.clear()
+
+    def stop(self):
+        """Останавливает поток"""
+        self.stopped.set()
+
+    def _run(self):
+        try:
+            while not self.stopped.is_set():
+                readable, _, _ = select.select([self.fd], [], [], 0.5)
+                if not readable:
+                    continue
+                try:
+                    data = os.read(self.fd, 65536)
+                except BlockingIOError:
+                    continue
+                self._dispatch(data)
+        finally:
+            os.close(self.fd)
+
+    def _dispatch(self, data):
+        """Разбирает пакет событий и сообщает об изменившихся папках и файлах"""
+        changed = set()
+        written = set()
+        offset = 0
+        with self.lock:
+            while offset + self.EVENT_HEADER.size <= len(data):
+                descriptor, mask, _, name_length = self.EVENT_HEADER.unpack_from(data, offset)
+                name = data[offset + self.EVENT_HEADER.size:offset + self.EVENT_HEADER.size + name_length]
+                offset += self.EVENT_HEADER.size + name_length
+                if mask & self.IN_Q_OVERFLOW:
+                    changed.update(self.folders)
+                    continue
+                folder_path = self.descriptors.get(descriptor)
+                if folder_path is None:
+                    continue
+                if mask & self.IN_IGNORED:
+                    # Папка удалена; её узел уберёт обновление родителя
+                    del self.descriptors[descriptor]
+                    if self.folders.get(folder_path) == descriptor:
+                        del self.folders[folder_path]
+                    continue
+                if mask & (self.IN_MODIFY | self.IN_CLOSE_WRITE):
+                    # Запись в файл не меняет список элементов папки
+                    written.add(os.path.join(folder_path, os.fsdecode(name.rstrip(b"\0"))))
+                    continue
+                changed.add(folder_path)
+        for folder_path in changed:
+            self.changes.put(folder_path)
+        for file_path in written:
+            self.file_changes.put(file_path)
+
+
+def create_directory_watcher():
+    """Возвращает наблюдатель за папками: inotify, если доступен, иначе опрос"""
+    try:
+        return InotifyDirectoryWatcher()
+    except (OSError, AttributeError):
+        return PollingDirectoryWatcher()
+
+
+class MappedFile:
+    """Файл, отображённый в память (mmap), для открытия больших файлов.
+
+    read_chunk отдаёт файл кусками по границам строк для постепенной
+    загрузки в редактор. Для постраничного просмотра start_index строит в
+    фоновом потоке индекс начала строк; пока он не готов, доступны уже
+    проиндексированные строки (line_count растёт по ходу).
+    """
+
+    INDEX_BATCH = 4 << 20
+
+    def __init__(self, file_path, encoding="utf-8"):
+        self.path = file_path
+        self.encoding = encoding
+        self.file = open(file_path, "rb")
+        self.size = os.fstat(self.file.fileno()).st_size
+        # Пустой файл отобразить нельзя
+        self.mmap = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b""
+        self.offsets = array("Q", [0])
+        self.indexed_bytes = 0
+        self.index_done = False
+        self.closed = False
+        self.index_thread = None
+
+    def read_chunk(self, start, size, errors="strict"):
+        """Читает около size байт с позиции start, обрезая по концу строки.
+
+        Возвращает (текст, позиция следующего куска). Перевод строки не
+        встречается внутри многобайтовых символов UTF-8, поэтому куски
+        декодируются независимо.
+        """
+        end = min(start + size, self.size)
+        if end < self.size:
+            newline = self.mmap.rfind(b"\n", start, end)
+            if newline != -1:
+                end = newline + 1
+            else:
+                # Очень длинная строка: режем хотя бы не посреди символа UTF-8
+                while end < self.size and self.mmap[end] & 0xC0 == 0x80:
+                    end += 1
+        return self.mmap[start:end].decode(self.encoding, errors=errors), end
+
+    def start_index(self):
+        """Запускает построение индекса строк в фоновом потоке"""
+        self.index_thread = threading.Thread(target=self._build_index, daemon=True)
+        self.index_thread.start()
+
+    def _build_index(self):
+        find = self.mmap.find
+        offsets = self.offsets
+        scan = 0
+        try:
+            while scan < self.size and not self.closed:
+                batch_end = min(scan + self.INDEX_BATCH, self.size)
+                newline = find(b"\n", scan, batch_end)
+                while newline != -1:
+                    offsets.append(newline + 1)
+                    newline = find(b"\n", newline + 1, batch_end)
+                scan = batch_end
+                self.indexed_bytes = scan
+        except ValueError:
+            # Файл закрыт во время индексации
+            return
+        self.index_done = True
+
+    @property
+    def line_count(self):
+        """Количество строк, доступных через read_lines"""
+        if self.index_done:
+            return len(self.offsets)
+        # Последняя строка ещё может продолжаться
+        return len(self.offsets) - 1
+
+    def read_lines(self, first, count):
+        """Возвращает строки first..first+count-1 (с нуля) без завершающего перевода строки"""
+        last = min(first + count, self.line_count)
+        if first >= last:
+            return ""
+        start = self.offsets[first]
+        # Перевод строки перед следующей строкой не включаем
+        end = self.offsets[last] - 1 if last < len(self.offsets) else self.size
+        return self.mmap[start:end].decode(self.encoding, errors="replace")
+
+    def close(self):
+        """Останавливает индексацию и освобождает отображение"""
+        self.closed = True
+        if self.index_thread is not None:
+            self.index_thread.join()
+        if self.size:
+            self.mmap.close()
+        self.file.close()
+
+
+def write_file_atomic(file_path, data):
+    """Атомарно записывает байты data в file_path.
+
+    Данные пишутся во временный файл в той же папке, сбрасываются на диск
+    (fsync) и подменяют файл через os.replace: при сбое на диске остаётся
+    либо старая, либо новая версия целиком. Права доступа сохраняются.
+    """
+    # Для символической ссылки заменяем файл, на который она указывает
+    file_path = os.path.realpath(file_path)
+    folder = os.path.dirname(file_path)
+    fd, temp_path = tempfile.mkstemp(dir=folder, prefix=f".{os.path.basename(file_path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            mode = stat.S_IMODE(os.stat(file_path).st_mode)
+        except FileNotFoundError:
+            mode = 0o666 & ~_UMASK
+        os.chmod(temp_path, mode)
+        os.replace(temp_path, file_path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+    if hasattr(os, "O_DIRECTORY"):
+        # Запись о переименовании тоже должна пережить сбой питания
+        dir_fd = os.open(folder, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+def file_has_content(file_path, data):
+    """Проверяет, что файл на диске содержит ровно байты data (размер и SHA-256)"""
+    try:
+        if os.path.getsize(file_path) != len(data):
+            return False
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    except OSError:
+        return False
+    return digest.digest() == hashlib.sha256(data).digest()
+
+
+class FileSaver:
+    """Сохраняет файлы в фоновом потоке по снимкам текста редактора.
+
+    Задания выполняются по очереди; файл не перезаписывается, если на диске
+    уже то же содержимое. Результаты (путь, записан ли, ошибка, время,
+    on_saved) главный поток забирает через drain().
+    """
+
+    def __init__(self):
+        self.jobs = queue.Queue()
+        self.results = queue.Queue()
+        self.pending = 0
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def submit(self, file_path, content, on_saved=None):
+        """Ставит сохранение в очередь (вызывается в главном потоке)"""
+        self.pending += 1
+        self.jobs.put((file_path, content, on_saved))
+
+    def drain(self):
+        """Забирает результаты сохранений (вызывается в главном потоке)"""
+        results = []
+        while True:
+            try:
+                results.append(self.results.get_nowait())
+            except queue.Empty:
+                break
+        self.pending -= len(results)
+        return results
+
+    def stop(self):
+        """Дожидается уже поставленных сохранений и останавливает поток"""
+        self.jobs.put(None)
+        self.thread.join()
+
+    def _run(self):
+        """Цикл фонового потока"""
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            file_path, content, on_saved = job
+            started = time.perf_counter()
+            written, error = False, None
+            try:
+                written = self.save(file_path, content)
+            except Exception as e:
+                error = e
+            self.results.put((file_path, written, error, time.perf_counter() - started, on_saved))
+
+    @staticmethod
+    def save(file_path, content):
+        """Записывает текст, если он отличается от файла; возвращает, был ли файл записан"""
+        # Переводы строк как при записи в текстовом режиме
+        if os.linesep != "\n":
+            content = content.replace("\n", os.linesep)
+        data = content.encode("utf-8")
+        if file_has_content(file_path, data):
+            return False
+        write_file_atomic(file_path, data)
+        return True
+
+
+class BufferSearch:
+    """Поиск по копии текста буфера с таблицей начал строк.
+
+    Копия обновляется, только когда меняется версия текста редактора, а
+    смещения совпадений переводятся в индексы Tk ("строка.столбец") двоичным
+    поиском по началам строк, без обращений к виджету.
+    """
+
+    def __init__(self):
+        self.version = None
+        self.text = ""
+        self.line_starts = [0]
+        self.pattern = None
+        self.starts = []
+        self.ends = []
+
+    def set_text(self, text, version):
+        """Обновляет копию текста; совпадения прежнего текста сбрасываются"""
+        if version == self.version:
+            return
+        self.version = version
+        self.text = text
+        self.line_starts = [0]
+        self.line_starts.extend(match.end() for match in re.finditer("\n", text))
+        self.pattern = None
+        self.starts = []
+        self.ends = []
+
+    def search(self, pattern):
+        """Находит все непустые совпадения pattern"""
+        self.pattern = pattern
+        self.starts = []
+        self.ends = []
+        for match in pattern.finditer(self.text):
+            if match.end() > match.start():
+                self.starts.append(match.start())
+                self.ends.append(match.end())
+
+    def index(self, offset):
+        """Индекс Tk для смещения в тексте"""
+        line = bisect.bisect_right(self.line_starts, offset) - 1
+        return f"{line + 1}.{offset - self.line_starts[line]}"
+
+    def offset(self, index):
+        """Смещение в тексте для индекса Tk вида "строка.столбец" """
+        line, column = map(int, index.split("."))
+        line = min(line, len(self.line_starts))
+        return min(self.line_starts[line - 1] + column, len(self.text))
+
+    def matches_between(self, first, last):
+        """Номера совпадений, начинающихся между смещениями first и last"""
+        return range(bisect.bisect_left(self.starts, first), bisect.bisect_right(self.starts, last))
+
+    def match_after(self, offset):
+        """Номер первого совпадения, начинающегося не раньше offset (по кругу)"""
+        index = bisect.bisect_left(self.starts, offset)
+        return index if index < len(self.starts) else 0
+
+
+class UndoJournal:
+    """Журнал правок текста для восстановления истории отмены буфера.
+
+    Tk не даёт прочитать стек отмены виджета Text, поэтому команды, которые
+    его меняют (вставка, удаление, замена, разделители, отмена, повтор и
+    флаг изменений), записываются с индексами вида "строка.символ" вместе с
+    текстом на момент последнего сброса истории. Повтор журнала в виджете
+    с теми же autoseparators собирает тот же стек отмены и повтора.
+    """
+
+    # Примерные накладные расходы на одну запись журнала в памяти, байт
+    ENTRY_COST = 120
+
+    def __init__(self, base):
+        self.base = base
+        self.entries = []
+        self.size = sys.getsizeof(base)
+
+    def record(self, entry):
+        """Добавляет выполненную команду виджета: кортеж её аргументов"""
+        entry = tuple(entry)
+        if self.entries and len(entry) == 3 and entry[0] == "insert":
+            # Набранные подряд символы склеиваются в одну вставку: Tk и так
+            # не ставит разделитель между соседними вставками
+            last = self.entries[-1]
+            if len(last) == 3 and last[0] == "insert" and "\n" not in last[2]:
+                line, column = last[1].split(".")
+                if entry[1] == f"{line}.{int(column) + len(last[2])}":
+                    self.entries[-1] = (last[0], last[1], last[2] + entry[2])
+                    self.size += len(entry[2])
+                    return
+        self.entries.append(entry)
+        self.size += self.ENTRY_COST + sum(len(part) for part in entry)
+
+    def replay(self, call, widget):
+        """Заменяет текст виджета и собирает его историю отмены заново"""
+        call(widget, "delete", "1.0", "end")
+        call(widget, "insert", "1.0", self.base)
+        call(widget, "edit", "reset")
+        for entry in self.entries:
+            call((widget,) + tuple(entry))
+
+    def to_json(self):
+        return [self.base, self.entries]
+
+    @classmethod
+    def from_json(cls, data):
+        journal = cls(data[0])
+        for entry in data[1]:
+            journal.record(entry)
+        return journal
+
+
+class EditorBuffer:
+    """Открытый в редакторе файл (вкладка).
+
+    Текст активного буфера живёт в единственном виджете редактора, у
+    неактивных хранится снимок: курсор, прокрутка, флаг изменений, разбор
+    подсветки и либо текст (text), либо журнал правок (undo), из которого
+    восстанавливаются и текст, и история отмены. Снимки, не уместившиеся в
+    кэш, вытесняются: без изменений и истории - просто забываются и при
+    активации читаются с диска, остальные - выгружаются во временный файл.
+    """
+
+    # Примерный размер одного разобранного фрагмента подсветки в памяти, байт
+    SPAN_COST = 72
+
+    def __init__(self, file_path=None):
+        self.file_path = file_path
+        self.text = ""
+        self.undo = None
+        self.spill_path = None
+        self.cursor = "1.0"
+        self.yview = 0.0
+        self.modified = False
+        self.highlight = None
+        self.highlight_size = 0
+        self.last_used = 0
+        self.tab = None
+
+    @property
+    def evicted(self):
+        """Снимок текста забыт: при активации файл читается с диска"""
+        return self.text is None and self.undo is None and self.spill_path is None
+
+    @property
+    def memory_size(self):
+        """Примерный объём снимка в памяти, байт"""
+        text_size = sys.getsizeof(self.text) if self.text is not None else 0
+        undo_size = self.undo.size if self.undo is not None else 0
+        return text_size + undo_size + self.highlight_size
+
+    def store_highlight(self, snapshot):
+        """Запоминает разбор подсветки и оценивает его объём"""
+        self.highlight = snapshot
+        self.highlight_size = (len(snapshot["states"]) * 16
+                               + sum(len(spans) for spans in snapshot["spans"]) * self.SPAN_COST)
+
+    def evict(self):
+        """Освобождает снимок; несохранённый текст и история отмены выгружаются на диск"""
+        self.highlight = None
+        self.highlight_size = 0
+        if self.evicted or self.spill_path is not None:
+            return
+        if not self.modified and self.undo is None and self.file_path:
+            self.text = None
+            return
+        fd, path = tempfile.mkstemp(prefix="pycode_buffer_", suffix=".json")
+        try:
+            with open(fd, "w", encoding="utf-8") as f:
+                json.dump({"text": self.text, "undo": self.undo.to_json() if self.undo else None}, f)
+        except (OSError, ValueError):
+            # Снимок, который не удалось выгрузить, остаётся в памяти
+            self.remove_spill_file(path)
+            return
+        self.spill_path = path
+        self.text = None
+        self.undo = None
+
+    def load_spill(self):
+        """Возвращает в память снимок, выгруженный evict()"""
+        with open(self.spill_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        self.text = data["text"]
+        self.undo = UndoJournal.from_json(data["undo"]) if data["undo"] else None
+        self.drop_spill()
+
+    def drop_spill(self):
+        """Удаляет временный файл выгруженного снимка"""
+        if self.spill_path is not None:
+            self.remove_spill_file(self.spill_path)
+            self.spill_path = None
+
+    @staticmethod
+    def remove_spill_file(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
 class PythonCodeEditor:
     def __init__(self, root):
         self.root = root
@@ -21,6 +3057,70 @@ class PythonCodeEditor:
         self.project_folder = None
         self.process = None
         self.console_process = None
+        self.output_queue = None
+        self.output_reader = None
+        self.output_open_streams = 0
+        self.output_spill = None
+        self.tree_ignore = None
+        self.tree_watcher = create_directory_watcher()
+        self.tree_items = {}
+        self.tree_watch_job = None
+        self.file_load = None
+        self.paged_file = None
+        self.paged_page = 0
+        self.paged_shown_lines = 0
+        self.paged_poll_job = None
+        self.file_saver = FileSaver()
+        self.save_poll_job = None
+        self.buffers = []
+        self.active_buffer = None
+        self.buffer_counter = 0
+        self.buffer_switching = False
+        # Журнал правок активного буфера; None - истории отмены нет
+        self.undo_journal = None
+        self.undo_recording = True
+        self.warm_pool = None
+        self.symbol_index = None
+        self.symbol_index_job = None
+        self.search_index = None
+        self.file_search = None
+        self.search_poll_job = None
+        self.search_result_files = {}
+        self.search_match_count = 0
+        self.search_started = 0
+        self.buffer_search = BufferSearch()
+        self.find_current = None
+        self.find_job = None
+        self.find_highlight_job = None
+        self.lint_worker = None
+        self.lint_cache = OrderedDict()
+        self.lint_key = None
+        self.lint_job = None
+        self.lint_poll_job = None
+        self.buffer_trie = PrefixTrie(keyword.kwlist)
+        self.buffer_imports = {}
+        self.completions = {}
+        self.completion_popup = None
+        self.completion_start = None
+        self.completion_job = None
+        self.run_counter = 0
+        self.run_started = 0
+        self.run_result = None
+        self.run_timed_out = False
+        self.run_profile_path = None
+        self.run_timeout_job = None
+        self.kernels = {}
+        self.kernel_queue = queue.Queue(maxsize=1000)
+        self.kernel_poll_job = None
+        self.console_jobs = {}
+        self.console_job_counter = 0
+        self.console_queue = queue.Queue(maxsize=1000)
+        self.console_flush_job = None
+        self.text_version = 0
+        self.highlight_job = None
+        self.highlight_poll_job = None
+        self.viewport_highlight_job = None
+        self.idle_highlight_job = None
         self.languages = {}
         self.current_language = "en"
         self.syntax_colors = {}
@@ -28,7 +3128,28 @@ class PythonCodeEditor:
             "language": "en",
             "dark_mode": False,
             "font_size": 12,
-            "font_family": "Consolas"
+            "font_family": "Consolas",
+            "highlighter": "tokenize",
+            "viewport_highlight_threshold": 5000,
+            "viewport_highlight_margin": 100,
+            "highlight_debounce_ms": 120,
+            "highlight_chunk_lines": 300,
+            "console_max_lines": 5000,
+            "output_max_lines": 10000,
+            "tree_ignore_patterns": [".git", "__pycache__", "venv", ".venv", "pyvenv"],
+            "tree_use_gitignore": True,
+            "large_file_threshold_mb": 5,
+            "paged_view_threshold_mb": 100,
+            "paged_view_lines": 5000,
+            "buffer_cache_mb": 256,
+            "warm_pool_enabled": False,
+            "warm_pool_size": 1,
+            "warm_pool_modules": [],
+            "run_limits": {},
+            "profile_mode": "cprofile",
+            "profile_sample_interval_ms": 5,
+            "search_max_file_mb": 2,
+            "autocomplete_on_type": True
         }
         
         # Настройка виртуального окружения
@@ -43,12 +3164,15 @@ class PythonCodeEditor:
         self.load_languages()
         self.load_syntax_colors()
         self.load_settings()
+        self.warm_pool = WarmInterpreterPool(self.settings["warm_pool_size"])
         
         # Затем создаем интерфейс
         self.setup_ui()
         
         # Затем настраиваем виртуальное окружение
         self.init_venv()
+        if self.settings["warm_pool_enabled"]:
+            self.prewarm_interpreters()
     
     def load_languages(self):
         """Загружает языковые файлы из папки languages"""
@@ -166,10 +3290,6 @@ class PythonCodeEditor:
     
     def setup_syntax_highlighting(self):
         """Настраивает подсветку синтаксиса"""
-        # Очищаем все существующие теги
-        for tag in self.text_editor.tag_names():
-            self.text_editor.tag_remove(tag, "1.0", "end")
-        
         # Добавляем теги с настройками из colors.json
         for tag_name, tag_config in self.syntax_colors.items():
             self.text_editor.tag_configure(tag_name, **tag_config)
@@ -178,33 +3298,149 @@ class PythonCodeEditor:
         self.highlight_syntax()
     
     def highlight_syntax(self, event=None):
-        """Применяет подсветку синтаксиса к коду"""
+        """Отправляет порцию изменённых строк на лексирование в фоновый поток"""
+        self.cancel_highlight()
+        if not self.current_file or not self.current_file.endswith(".py"):
+            return
+        
+        self.highlighter.paint_visible()
+        job = self.highlighter.prepare_job(self.settings["highlight_chunk_lines"])
+        if job:
+            self.highlight_worker.submit(job)
+            self.schedule_highlight_poll()
+        elif self.highlighter.dirty:
+            self.schedule_idle_highlight()
+    
+    def schedule_highlight(self, event=None):
+        """Откладывает подсветку до паузы во вводе: каждый новый ввод отменяет предыдущий запрос"""
+        self.cancel_highlight()
+        self.highlight_job = self.root.after(self.settings["highlight_debounce_ms"], self.highlight_syntax)
+    
+    def cancel_highlight(self):
+        """Отменяет запланированную подсветку и фоновое лексирование"""
+        for job in (self.highlight_job, self.idle_highlight_job):
+            if job is not None:
+                self.root.after_cancel(job)
+        self.highlight_job = None
+        self.idle_highlight_job = None
+    
+    def schedule_idle_highlight(self):
+        """Планирует фоновую подсветку строк за пределами видимой области"""
+        if self.idle_highlight_job is None:
+            self.idle_highlight_job = self.root.after(IDLE_HIGHLIGHT_DELAY, self.highlight_idle)
+    
+    def highlight_idle(self):
+        """Отправляет на лексирование очередную порцию строк, пока редактор простаивает"""
+        self.idle_highlight_job = None
         if not self.current_file or not self.current_file.endswith(".py"):
             return
         
-        # Удаляем предыдущую подсветку
-        for tag in self.text_editor.tag_names():
-            self.text_editor.tag_remove(tag, "1.0", "end")
+        job = self.highlighter.prepare_job(self.settings["highlight_chunk_lines"], ahead=True)
+        if job:
+            self.highlight_worker.submit(job)
+            self.schedule_highlight_poll()
+    
+    def schedule_highlight_poll(self):
+        """Планирует опрос очереди результатов фонового лексирования"""
+        if self.highlight_poll_job is None:
+            self.highlight_poll_job = self.root.after(HIGHLIGHT_POLL_INTERVAL, self.poll_highlight_results)
+    
+    def poll_highlight_results(self):
+        """Применяет теги по результатам фонового лексирования и планирует следующую порцию"""
+        self.highlight_poll_job = None
+        for result in self.highlight_worker.drain():
+            # Результаты для устаревшей версии текста отбрасываются
+            self.highlighter.commit(result)
+        
+        if self.highlight_worker.pending:
+            self.schedule_highlight_poll()
+        elif self.highlight_job is None and self.idle_highlight_job is None:
+            if self.highlighter.has_dirty():
+                self.highlight_job = self.root.after(1, self.highlight_syntax)
+            elif self.highlighter.dirty:
+                self.schedule_idle_highlight()
+    
+    def on_editor_scroll(self, first, last):
+        """Обновляет полосу прокрутки и подсвечивает строки, ставшие видимыми"""
+        self.text_editor.vbar.set(first, last)
+        if self.highlighter.viewport_mode and self.viewport_highlight_job is None:
+            self.viewport_highlight_job = self.root.after_idle(self.highlight_viewport)
+        # Подсвечены только видимые совпадения поиска, после прокрутки их нужно обновить
+        if self.find_bar.winfo_ismapped() and self.find_highlight_job is None:
+            self.find_highlight_job = self.root.after_idle(self.highlight_visible_matches)
+    
+    def highlight_viewport(self):
+        """Подсвечивает видимую область после прокрутки"""
+        self.viewport_highlight_job = None
+        self.highlight_syntax()
+    
+    def create_lexer(self):
+        """Создаёт лексер подсветки, выбранный в настройках"""
+        lexer_class = LEXERS.get(self.settings.get("highlighter"), TokenizeLexer)
+        return lexer_class()
+    
+    def setup_text_proxy(self):
+        """Подменяет Tcl-команду редактора, чтобы отслеживать изменённые строки"""
+        widget = str(self.text_editor)
+        self.text_editor_orig = widget + "_orig"
+        self.root.tk.call("rename", widget, self.text_editor_orig)
+        self.root.tk.createcommand(widget, self.text_editor_proxy)
+    
+    def text_editor_proxy(self, *args):
+        """Пробрасывает команды виджета редактора и сообщает подсветке о правках"""
+        call = self.root.tk.call
+        orig = self.text_editor_orig
+        if args[:1] == ("edit",):
+            return self.text_editor_edit(args)
+        if not args or args[0] not in ("insert", "delete", "replace"):
+            return call((orig,) + args)
         
-        # Получаем весь текст
-        code = self.text_editor.get("1.0", "end-1c")
+        # Номера строк затронутых индексов до правки
+        if args[0] == "insert":
+            indices = args[1:2]
+        elif args[0] == "replace":
+            indices = args[1:3]
+        else:
+            indices = args[1:]
+        line_count = int(str(call(orig, "index", "end-1c")).split(".")[0])
+        resolved = [str(call(orig, "index", index)) for index in indices]
+        lines = [min(int(index.split(".")[0]), line_count) for index in resolved]
+        # Загрузка файла частями всё равно заканчивается сбросом истории отмены
+        recording = self.undo_recording and self.file_load is None
+        if recording and self.undo_journal is None:
+            # История отмены начинается с текста до первой правки после сброса
+            self.undo_journal = UndoJournal(call(orig, "get", "1.0", "end-1c"))
         
-        # Шаблоны для подсветки
-        patterns = {
-            "keywords": r"\b(and|as|assert|break|class|continue|def|del|elif|else|except|finally|for|from|global|if|import|in|is|lambda|nonlocal|not|or|pass|raise|return|try|while|with|yield)\b",
-            "strings": r"(\"\"\".*?\"\"\"|\'\'\'.*?\'\'\'|\".*?\"|\'.*?\')",
-            "comments": r"#.*?$",
-            "numbers": r"\b\d+\.?\d*\b",
-            "functions": r"\bdef\s+(\w+)\s*\(",
-            "builtins": r"\b(print|len|range|str|int|float|list|dict|set|tuple|bool|type|isinstance|super|__init__)\b"
-        }
+        result = call((orig,) + args)
         
-        # Применяем подсветку для каждого типа
-        for tag_name, pattern in patterns.items():
-            for match in re.finditer(pattern, code, re.MULTILINE|re.DOTALL):
-                start = f"1.0 + {match.start()}c"
-                end = f"1.0 + {match.end()}c"
-                self.text_editor.tag_add(tag_name, start, end)
+        if recording:
+            self.undo_journal.record([args[0]] + resolved + list(args[1 + len(resolved):]))
+        delta = int(str(call(orig, "index", "end-1c")).split(".")[0]) - line_count
+        self.text_version += 1
+        self.highlighter.on_change(min(lines), max(lines), delta)
+        self.schedule_highlight()
+        if self.find_bar.winfo_ismapped():
+            self.schedule_find_after_edit()
+        self.schedule_lint()
+        return result
+    
+    def text_editor_edit(self, args):
+        """Выполняет команду edit редактора и записывает в журнал изменения стека отмены"""
+        command = args[1] if len(args) > 1 else ""
+        recording = self.undo_recording
+        if command in ("undo", "redo"):
+            # Отмена выполняет свои правки через команду виджета, их не записываем
+            self.undo_recording = False
+        try:
+            result = self.root.tk.call((self.text_editor_orig,) + args)
+        finally:
+            self.undo_recording = recording
+        if command == "reset":
+            self.undo_journal = None
+        elif recording and self.undo_journal is not None and (
+                command in ("separator", "undo", "redo") or (command == "modified" and len(args) > 2)):
+            self.undo_journal.record(args)
+        return result
     
     def load_settings(self):
         """Загружает настройки из файла"""
@@ -255,7 +3491,8 @@ class PythonCodeEditor:
         self.setup_syntax_highlighting()
         
         # Привязываем подсветку к изменениям текста
-        self.text_editor.bind("<KeyRelease>", self.highlight_syntax)
+        self.text_editor.bind("<KeyRelease>", self.schedule_highlight)
+        self.text_editor.bind("<KeyRelease>", self.on_completion_key, add="+")
     
     def create_menu(self):
         """Создание меню приложения"""
@@ -268,6 +3505,7 @@ class PythonCodeEditor:
         file_menu.add_command(label=self.tr("open_folder"), command=self.open_folder, accelerator="Ctrl+K Ctrl+O")
         file_menu.add_command(label=self.tr("save"), command=self.save_file, accelerator="Ctrl+S")
         file_menu.add_command(label=self.tr("save_as"), command=self.save_file_as)
+        file_menu.add_command(label=self.tr("close_tab"), command=self.close_buffer, accelerator="Ctrl+W")
         file_menu.add_separator()
         file_menu.add_command(label=self.tr("settings"), command=self.show_settings)
         file_menu.add_command(label=self.tr("check_updates"), command=self.check_for_updates)
@@ -285,6 +3523,20 @@ class PythonCodeEditor:
         edit_menu.add_command(label=self.tr("copy"), command=lambda: self.text_editor.event_generate("<<Copy>>"), accelerator="Ctrl+C")
         edit_menu.add_command(label=self.tr("paste"), command=lambda: self.text_editor.event_generate("<<Paste>>"), accelerator="Ctrl+V")
         edit_menu.add_command(label=self.tr("select_all"), command=lambda: self.text_editor.tag_add("sel", "1.0", "end"), accelerator="Ctrl+A")
+        edit_menu.add_separator()
+        edit_menu.add_command(label=self.tr("find"), command=self.show_find_bar, accelerator="Ctrl+F")
+        edit_menu.add_command(label=self.tr("replace"), command=lambda: self.show_find_bar(replace=True), accelerator="Ctrl+H")
+        edit_menu.add_command(label=self.tr("find_next"), command=lambda: self.find_next(1), accelerator="F3")
+        edit_menu.add_separator()
+        edit_menu.add_command(label=self.tr("go_to_definition"), command=self.go_to_definition, accelerator="F12")
+        edit_menu.add_command(label=self.tr("go_to_symbol"), command=self.go_to_symbol, accelerator="Ctrl+T")
+        edit_menu.add_command(label=self.tr("outline"), command=self.show_outline, accelerator="Ctrl+Shift+O")
+        edit_menu.add_command(label=self.tr("find_in_files"), command=self.find_in_files, accelerator="Ctrl+Shift+F")
+        edit_menu.add_separator()
+        edit_menu.add_command(label=self.tr("autocomplete"), command=self.show_completions, accelerator="Ctrl+Space")
+        self.autocomplete_var = tk.BooleanVar(value=self.settings["autocomplete_on_type"])
+        edit_menu.add_checkbutton(label=self.tr("autocomplete_on_type"), variable=self.autocomplete_var,
+                                  command=self.toggle_autocomplete)
         menubar.add_cascade(label=self.tr("edit"), menu=edit_menu)
         
         # Меню "Вид"
@@ -296,7 +3548,19 @@ class PythonCodeEditor:
         # Меню "Запуск"
         run_menu = tk.Menu(menubar, tearoff=0)
         run_menu.add_command(label=self.tr("run_python"), command=self.run_python_code, accelerator="F5")
+        run_menu.add_command(label=self.tr("run_with_profiler"), command=self.run_with_profiler, accelerator="Shift+F5")
         run_menu.add_command(label=self.tr("stop_execution"), command=self.stop_execution, accelerator="F6")
+        run_menu.add_command(label=self.tr("run_cell"), command=self.run_in_kernel, accelerator="Ctrl+Enter")
+        run_menu.add_command(label=self.tr("interrupt_kernel"), command=self.interrupt_kernel)
+        run_menu.add_command(label=self.tr("restart_kernel"), command=self.restart_kernel)
+        self.warm_pool_var = tk.BooleanVar(value=self.settings["warm_pool_enabled"])
+        run_menu.add_checkbutton(label=self.tr("use_warm_interpreter"), variable=self.warm_pool_var,
+                                 command=self.toggle_warm_pool)
+        run_menu.add_command(label=self.tr("run_limits"), command=self.show_run_limits)
+        self.sampling_profiler_var = tk.BooleanVar(value=self.settings["profile_mode"] == "sampling")
+        run_menu.add_checkbutton(label=self.tr("sampling_profiler"), variable=self.sampling_profiler_var,
+                                 command=self.toggle_sampling_profiler)
+        run_menu.add_command(label=self.tr("open_profile"), command=self.open_profile)
         run_menu.add_separator()
         run_menu.add_command(label=self.tr("activate_venv"), command=self.activate_venv_manually)
         menubar.add_cascade(label=self.tr("run"), menu=run_menu)
@@ -307,7 +3571,16 @@ class PythonCodeEditor:
         self.root.bind_all("<Control-n>", lambda event: self.new_file())
         self.root.bind_all("<Control-o>", lambda event: self.open_file())
         self.root.bind_all("<Control-s>", lambda event: self.save_file())
+        self.root.bind_all("<Control-w>", lambda event: self.close_buffer())
         self.root.bind_all("<F5>", lambda event: self.run_python_code())
+        self.root.bind_all("<Shift-F5>", lambda event: self.run_with_profiler())
+        self.root.bind_all("<F12>", lambda event: self.go_to_definition())
+        self.root.bind_all("<Control-t>", self.go_to_symbol)
+        self.root.bind_all("<Control-O>", lambda event: self.show_outline())
+        self.root.bind_all("<Control-F>", self.find_in_files)
+        self.root.bind_all("<Control-f>", self.show_find_bar)
+        self.root.bind_all("<F3>", lambda event: self.find_next(1))
+        self.root.bind_all("<Shift-F3>", lambda event: self.find_next(-1))
         self.root.bind_all("<F6>", lambda event: self.stop_execution())
         self.root.bind_all("<Control-k><Control-o>", lambda event: self.open_folder())
     
@@ -344,6 +3617,15 @@ class PythonCodeEditor:
         )
         dark_mode_check.pack(pady=5, padx=10, anchor="w")
         
+        # Лексер подсветки синтаксиса
+        highlighter_label = ttk.Label(settings_window, text=self.tr("highlighter") + ":")
+        highlighter_label.pack(pady=(10, 0), padx=10, anchor="w")
+        
+        highlighter_var = tk.StringVar(value=self.settings.get("highlighter", "tokenize"))
+        highlighter_combobox = ttk.Combobox(settings_window, textvariable=highlighter_var, state="readonly")
+        highlighter_combobox['values'] = list(LEXERS.keys())
+        highlighter_combobox.pack(pady=5, padx=10, fill=tk.X)
+        
         # Кнопки
         button_frame = ttk.Frame(settings_window)
         button_frame.pack(pady=20, fill=tk.X, padx=10)
@@ -354,7 +3636,8 @@ class PythonCodeEditor:
             command=lambda: self.save_settings_values(
                 lang_var.get(),
                 dark_mode_var.get(),
-                settings_window
+                settings_window,
+                highlighter_var.get()
             )
         ).pack(side=tk.RIGHT, padx=5)
         
@@ -364,11 +3647,16 @@ class PythonCodeEditor:
             command=settings_window.destroy
         ).pack(side=tk.RIGHT, padx=5)
     
-    def save_settings_values(self, language, dark_mode, window):
+    def save_settings_values(self, language, dark_mode, window, highlighter=None):
         """Сохраняет настройки и применяет их"""
         self.current_language = language
         self.settings["language"] = language
         
+        if highlighter and highlighter != self.settings.get("highlighter"):
+            self.settings["highlighter"] = highlighter
+            self.highlighter.set_lexer(self.create_lexer())
+            self.highlight_syntax()
+        
         if self.dark_mode != dark_mode:
             self.dark_mode = dark_mode
             self.settings["dark_mode"] = dark_mode
@@ -427,6 +3715,7 @@ class PythonCodeEditor:
         tree_scroll.pack(side=tk.RIGHT, fill=tk.Y)
         self.file_tree.pack(fill=tk.BOTH, expand=True)
         self.file_tree.bind("<Double-1>", self.on_file_double_click)
+        self.file_tree.bind("<<TreeviewOpen>>", self.on_tree_open)
         
         # Правая панель - редактор и вывод
         right_panel = ttk.Frame(main_panel)
@@ -439,6 +3728,12 @@ class PythonCodeEditor:
         editor_frame = ttk.Frame(self.notebook)
         self.notebook.add(editor_frame, text=self.tr("editor"))
         
+        # Вкладки открытых файлов: у каждой пустая страница, текст показывает общий редактор
+        self.buffer_tabs = ttk.Notebook(editor_frame)
+        self.buffer_tabs.pack(fill=tk.X)
+        self.buffer_tabs.bind("<<NotebookTabChanged>>", self.on_buffer_tab_changed)
+        self.buffer_tabs.bind("<Button-2>", self.on_buffer_tab_middle_click)
+        
         self.text_editor = scrolledtext.ScrolledText(
             editor_frame, 
             wrap=tk.WORD, 
@@ -449,6 +3744,93 @@ class PythonCodeEditor:
         )
         self.text_editor.pack(fill=tk.BOTH, expand=True)
         
+        # Панель постраничного просмотра очень больших файлов (показывается только в этом режиме)
+        self.paged_bar = ttk.Frame(editor_frame)
+        ttk.Button(self.paged_bar, text="<<", width=4, command=lambda: self.show_paged_page(0)).pack(side=tk.LEFT)
+        ttk.Button(self.paged_bar, text="<", width=4,
+                   command=lambda: self.show_paged_page(self.paged_page - 1)).pack(side=tk.LEFT)
+        ttk.Button(self.paged_bar, text=">", width=4,
+                   command=lambda: self.show_paged_page(self.paged_page + 1)).pack(side=tk.LEFT)
+        ttk.Button(self.paged_bar, text=">>", width=4,
+                   command=lambda: self.show_paged_page(self.paged_page_count() - 1)).pack(side=tk.LEFT)
+        self.paged_line_entry = ttk.Entry(self.paged_bar, width=10)
+        self.paged_line_entry.pack(side=tk.LEFT, padx=(10, 0))
+        self.paged_line_entry.bind("<Return>", self.go_to_paged_line)
+        ttk.Button(self.paged_bar, text=self.tr("go_to_line"), command=self.go_to_paged_line).pack(side=tk.LEFT)
+        self.paged_label = ttk.Label(self.paged_bar)
+        self.paged_label.pack(side=tk.LEFT, padx=10)
+        
+        # Панель поиска и замены в буфере (показывается по Ctrl+F / Ctrl+H)
+        self.find_bar = ttk.Frame(editor_frame)
+        find_frame = ttk.Frame(self.find_bar)
+        find_frame.pack(fill=tk.X)
+        self.find_var = tk.StringVar()
+        self.find_var.trace_add("write", self.schedule_find)
+        self.find_entry = ttk.Entry(find_frame, textvariable=self.find_var)
+        self.find_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5, pady=2)
+        self.find_entry.bind("<Return>", lambda event: self.find_next(1))
+        self.find_entry.bind("<Shift-Return>", lambda event: self.find_next(-1))
+        self.find_entry.bind("<Escape>", self.hide_find_bar)
+        self.find_regex_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(find_frame, text=self.tr("regex"), variable=self.find_regex_var,
+                        command=self.refresh_find).pack(side=tk.LEFT)
+        self.find_case_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(find_frame, text=self.tr("match_case"), variable=self.find_case_var,
+                        command=self.refresh_find).pack(side=tk.LEFT)
+        self.find_count_label = ttk.Label(find_frame, width=14)
+        self.find_count_label.pack(side=tk.LEFT, padx=5)
+        ttk.Button(find_frame, text="<", width=3, command=lambda: self.find_next(-1)).pack(side=tk.LEFT)
+        ttk.Button(find_frame, text=">", width=3, command=lambda: self.find_next(1)).pack(side=tk.LEFT)
+        ttk.Button(find_frame, text="x", width=3, command=self.hide_find_bar).pack(side=tk.LEFT, padx=5)
+        self.replace_frame = ttk.Frame(self.find_bar)
+        self.replace_var = tk.StringVar()
+        self.replace_entry = ttk.Entry(self.replace_frame, textvariable=self.replace_var)
+        self.replace_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5, pady=2)
+        self.replace_entry.bind("<Return>", lambda event: self.replace_current())
+        self.replace_entry.bind("<Escape>", self.hide_find_bar)
+        ttk.Button(self.replace_frame, text=self.tr("replace"), command=self.replace_current).pack(side=tk.LEFT)
+        ttk.Button(self.replace_frame, text=self.tr("replace_all"), command=self.replace_all).pack(side=tk.LEFT, padx=5)
+        
+        # Инкрементальная подсветка отслеживает правки через прокси виджета
+        # Для больших файлов подсвечивается только видимая область
+        self.highlighter = IncrementalHighlighter(
+            self.text_editor,
+            self.create_lexer(),
+            viewport_threshold=self.settings["viewport_highlight_threshold"],
+            viewport_margin=self.settings["viewport_highlight_margin"]
+        )
+        self.highlight_worker = HighlightWorker(self.highlighter)
+        self.setup_text_proxy()
+        self.text_editor.configure(yscrollcommand=self.on_editor_scroll)
+        self.text_editor.bind("<<Modified>>", self.on_editor_modified)
+        self.text_editor.bind("<Control-Return>", self.run_in_kernel)
+        self.text_editor.bind("<Control-t>", self.go_to_symbol)
+        # Ctrl+F и Ctrl+H у текстового поля заняты перемещением курсора и удалением символа
+        self.text_editor.bind("<Control-f>", self.show_find_bar)
+        self.text_editor.bind("<Control-h>", lambda event: self.show_find_bar(replace=True))
+        self.text_editor.bind("<Control-space>", self.show_completions)
+        # Пока открыт список автодополнения, эти клавиши управляют им, а не редактором
+        self.text_editor.bind("<Down>", lambda event: self.move_completion(1))
+        self.text_editor.bind("<Up>", lambda event: self.move_completion(-1))
+        self.text_editor.bind("<Tab>", self.accept_completion)
+        self.text_editor.bind("<Return>", self.accept_completion)
+        self.text_editor.bind("<Escape>", self.hide_completions)
+        # Щелчок по списку может забрать фокус, поэтому список закрывается с задержкой
+        self.text_editor.bind("<FocusOut>", lambda event: self.root.after(150, self.hide_completions_unfocused), add="+")
+        self.text_editor.bind("<Button-1>", self.hide_completions, add="+")
+        self.text_editor.tag_config("find_match", background="#fff59d")
+        self.text_editor.tag_config("find_current", background="#ffb74d")
+        self.text_editor.tag_raise("sel")
+        for tag, color in (("lint_error", "red"), ("lint_warning", "#e6a100")):
+            try:
+                self.text_editor.tag_config(tag, underline=True, underlinefg=color)
+            except tk.TclError:
+                # Цвет подчёркивания поддерживается не во всех версиях Tk
+                self.text_editor.tag_config(tag, underline=True)
+        
+        self.active_buffer = self.add_buffer()
+        self.buffer_tabs.select(self.active_buffer.tab)
+        
         # Вкладка вывода
         output_frame = ttk.Frame(self.notebook)
         self.notebook.add(output_frame, text=self.tr("output"))
@@ -473,8 +3855,50 @@ class PythonCodeEditor:
         )
         self.console_text.pack(fill=tk.BOTH, expand=True)
         
+        # Вкладка проблем, найденных фоновой проверкой кода
+        self.problems_frame = ttk.Frame(self.notebook)
+        self.notebook.add(self.problems_frame, text=self.tr("problems"))
+        self.problems_list = ttk.Treeview(self.problems_frame, columns=("line", "severity", "message"), show="headings")
+        for column, width in (("line", 60), ("severity", 100), ("message", 600)):
+            self.problems_list.heading(column, text=self.tr(column), anchor=tk.W)
+            self.problems_list.column(column, width=width, stretch=column == "message")
+        problems_scroll = ttk.Scrollbar(self.problems_frame, orient="vertical", command=self.problems_list.yview)
+        self.problems_list.configure(yscrollcommand=problems_scroll.set)
+        problems_scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        self.problems_list.pack(fill=tk.BOTH, expand=True)
+        self.problems_list.bind("<Double-1>", self.open_problem)
+        self.problems_list.bind("<Return>", self.open_problem)
+        
+        # Вкладка поиска по файлам проекта
+        self.search_frame = ttk.Frame(self.notebook)
+        self.notebook.add(self.search_frame, text=self.tr("find_in_files"))
+        
+        search_controls = ttk.Frame(self.search_frame)
+        search_controls.pack(fill=tk.X)
+        self.search_entry = ttk.Entry(search_controls)
+        self.search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5, pady=5)
+        self.search_entry.bind("<Return>", self.start_file_search)
+        self.search_entry.bind("<Escape>", lambda event: self.cancel_file_search())
+        self.search_regex_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(search_controls, text=self.tr("regex"), variable=self.search_regex_var).pack(side=tk.LEFT)
+        self.search_case_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(search_controls, text=self.tr("match_case"), variable=self.search_case_var).pack(side=tk.LEFT)
+        ttk.Button(search_controls, text=self.tr("find"), command=self.start_file_search).pack(side=tk.LEFT, padx=5)
+        ttk.Button(search_controls, text=self.tr("stop"), command=self.cancel_file_search).pack(side=tk.LEFT)
+        self.search_status = ttk.Label(self.search_frame)
+        self.search_status.pack(fill=tk.X, padx=5)
+        
+        self.search_results = ttk.Treeview(self.search_frame, show="tree")
+        search_scroll = ttk.Scrollbar(self.search_frame, orient="vertical", command=self.search_results.yview)
+        self.search_results.configure(yscrollcommand=search_scroll.set)
+        search_scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        self.search_results.pack(fill=tk.BOTH, expand=True)
+        self.search_results.bind("<Double-1>", self.open_search_result)
+        self.search_results.bind("<Return>", self.open_search_result)
+        
         self.setup_context_menu()
         self.setup_file_tree_context_menu()
+        self.setup_output_context_menu()
         self.setup_text_tags()
     
     def setup_text_tags(self):
@@ -499,22 +3923,26 @@ class PythonCodeEditor:
     def setup_console(self):
         """Настройка консоли с возможностью ввода команд"""
         self.console_text.bind("<Return>", self.execute_console_command)
+        self.console_text.bind("<Control-c>", self.cancel_console_job)
         self.console_prompt()
     
     def console_prompt(self):
         """Добавляет приглашение в консоль"""
         self.console_text.config(state="normal")
         self.console_text.insert(tk.END, ">>> ")
+        # Вывод работающих команд вставляется перед строкой приглашения
+        self.console_text.mark_set("prompt_start", "end-1c linestart")
         self.console_text.mark_set(tk.INSERT, tk.END)
         self.console_text.config(state="normal")
     
     def execute_console_command(self, event=None):
-        """Выполняет команду из консоли"""
-        # Получаем последнюю строку с командой
-        last_line = self.console_text.get("end-2c linestart", "end-1c").strip()
+        """Запускает команду из консоли, не дожидаясь её завершения"""
+        # Получаем строку приглашения с командой
+        last_line = self.console_text.get("prompt_start", "end-1c").strip()
         command = last_line.replace(">>> ", "")
         
         if not command:
+            self.console_text.insert(tk.END, "\n")
             self.console_prompt()
             return "break"
         
@@ -535,31 +3963,107 @@ class PythonCodeEditor:
                 command = f'"{pip_exec}" {command[4:]}'
         
         try:
-            # Выполняем команду
+            # Запускаем команду в отдельной группе процессов, чтобы Ctrl+C дошёл до всех её потомков
             process = subprocess.Popen(
                 command if platform.system() != "Windows" else ["cmd", "/c", command],
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
-                stdin=subprocess.PIPE,
+                stdin=subprocess.DEVNULL,
                 shell=True,
-                universal_newlines=True,
-                cwd=self.project_folder if self.project_folder else os.getcwd()
+                cwd=self.project_folder if self.project_folder else os.getcwd(),
+                **process_group_options()
             )
             
-            # Читаем вывод
-            output, error = process.communicate()
-            
-            if output:
-                self.console_text.insert(tk.END, output, "output")
-            if error:
-                self.console_text.insert(tk.END, error, "error")
-            
+            self.console_job_counter += 1
+            job_id = self.console_job_counter
+            reader = ProcessOutputReader(process, self.console_queue, job_id)
+            self.console_jobs[job_id] = {
+                "process": process,
+                "open_streams": reader.stream_count,
+                "cancelled": False
+            }
+            self.schedule_console_flush()
         except Exception as e:
             self.console_text.insert(tk.END, f"Ошибка выполнения команды: {str(e)}\n", "error")
         
         self.console_prompt()
         return "break"
     
+    def schedule_console_flush(self):
+        """Планирует вывод накопленного вывода команд консоли"""
+        if self.console_flush_job is None:
+            self.console_flush_job = self.root.after(CONSOLE_FLUSH_INTERVAL, self.flush_console_output)
+    
+    def flush_console_output(self):
+        """Переносит накопленный вывод команд в консоль и отмечает завершённые команды"""
+        self.console_flush_job = None
+        chunks = []
+        while True:
+            try:
+                job_id, tag, text = self.console_queue.get_nowait()
+            except queue.Empty:
+                break
+            if text is None:
+                self.console_jobs[job_id]["open_streams"] -= 1
+            elif chunks and chunks[-1][0] == tag:
+                chunks[-1][1].append(text)
+            else:
+                chunks.append((tag, [text]))
+        
+        if chunks:
+            self.append_console_output([(tag, "".join(texts)) for tag, texts in chunks])
+        
+        # Команда завершена, когда закрыты её потоки вывода и процесс вышел
+        for job_id, job in list(self.console_jobs.items()):
+            if job["open_streams"] <= 0 and job["process"].poll() is not None:
+                del self.console_jobs[job_id]
+                status = self.tr("job_cancelled") if job["cancelled"] else self.tr("job_finished")
+                self.append_console_output([("command", f"[{job_id}] {status}: {job['process'].returncode}\n")])
+        
+        if self.console_jobs:
+            self.schedule_console_flush()
+    
+    def append_console_output(self, chunks):
+        """Вставляет куски вывода перед приглашением, ограничивая размер консоли"""
+        max_lines = self.settings["console_max_lines"]
+        # Из очень большого пакета вывода сохраняем только хвост, который всё равно поместится
+        total_lines = 0
+        for index in range(len(chunks) - 1, -1, -1):
+            tag, text = chunks[index]
+            total_lines += text.count("\n")
+            if total_lines > max_lines:
+                chunks = chunks[index:]
+                chunks[0] = (tag, "\n".join(text.split("\n")[total_lines - max_lines:]))
+                break
+        
+        at_end = self.console_text.yview()[1] >= 1.0
+        for tag, text in chunks:
+            self.console_text.insert("prompt_start", text, tag)
+        
+        line_count = int(self.console_text.index("end-1c").split(".")[0])
+        if line_count > max_lines:
+            self.console_text.delete("1.0", f"{line_count - max_lines + 1}.0")
+        if at_end:
+            self.console_text.see(tk.END)
+    
+    def cancel_console_job(self, event=None):
+        """Прерывает последнюю запущенную команду консоли (Ctrl+C)"""
+        # При выделенном тексте Ctrl+C остаётся копированием
+        if self.console_text.tag_ranges("sel"):
+            return None
+        
+        running = [job_id for job_id, job in self.console_jobs.items() if not job["cancelled"]]
+        if not running:
+            return "break"
+        
+        job_id = running[-1]
+        job = self.console_jobs[job_id]
+        job["cancelled"] = True
+        self.append_console_output([("error", f"[{job_id}] ^C\n")])
+        signal_process_group(job["process"], interrupt=True)
+        self.root.after(CONSOLE_KILL_TIMEOUT, lambda: signal_process_group(job["process"]))
+        return "break"
+    
     def setup_context_menu(self):
         """Настройка контекстного меню для редактора"""
         self.context_menu = tk.Menu(self.text_editor, tearoff=0)
@@ -584,6 +4088,15 @@ class PythonCodeEditor:
         
         self.file_tree.bind("<Button-3>", self.show_tree_context_menu)
     
+    def setup_output_context_menu(self):
+        """Настройка контекстного меню панели вывода"""
+        self.output_context_menu = tk.Menu(self.output_text, tearoff=0)
+        self.output_context_menu.add_command(label=self.tr("browse_full_output"), command=self.browse_full_output)
+        self.output_context_menu.add_command(label=self.tr("search_full_output"), command=self.search_full_output)
+        self.output_context_menu.add_command(label=self.tr("save_full_output"), command=self.save_full_output)
+        
+        self.output_text.bind("<Button-3>", self.show_output_context_menu)
+    
     def init_venv(self):
         """Инициализация виртуального окружения с проверкой ошибок"""
         try:
@@ -622,6 +4135,9 @@ class PythonCodeEditor:
         """Обновляет статус venv в интерфейсе"""
         self.status_bar.config(text=message)
         self.venv_btn.config(text=f"Venv: {'ON' if self.venv_active else 'OFF'}")
+        if self.settings["warm_pool_enabled"]:
+            # Интерпретатор мог смениться: запас прогревается для нового, старые процессы завершаются
+            self.prewarm_interpreters()
     
     def toggle_venv_status(self):
         """Безопасное переключение статуса venv"""
@@ -681,6 +4197,10 @@ class PythonCodeEditor:
         """Показывает контекстное меню редактора"""
         self.context_menu.tk_popup(event.x_root, event.y_root)
         
+    def show_output_context_menu(self, event):
+        """Показывает контекстное меню панели вывода"""
+        self.output_context_menu.tk_popup(event.x_root, event.y_root)
+    
     def show_tree_context_menu(self, event):
         """Показывает контекстное меню дерева файлов"""
         item = self.file_tree.identify_row(event.y)
@@ -689,37 +4209,425 @@ class PythonCodeEditor:
             self.tree_context_menu.tk_popup(event.x_root, event.y_root)
     
     def new_file(self):
-        """Создает новый файл"""
-        self.text_editor.delete(1.0, tk.END)
-        self.current_file = None
-        self.update_title()
+        """Создает новый файл в новой вкладке"""
+        self.activate_buffer(self.add_buffer())
         self.status_bar.config(text=self.tr("new_file_created"))
     
     def open_file(self, file_path=None):
-        """Открывает файл"""
+        """Открывает файл в новой вкладке или переключается на уже открытую"""
         if not file_path:
             file_path = filedialog.askopenfilename(
                 filetypes=[("Python Files", "*.py"), ("Text Files", "*.txt"), ("All Files", "*.*")]
             )
         
         if file_path:
-            try:
-                with open(file_path, "r", encoding="utf-8") as file:
-                    content = file.read()
-                    self.text_editor.delete(1.0, tk.END)
-                    self.text_editor.insert(tk.END, content)
-                
+            buffer = self.find_buffer(file_path)
+            if buffer is not None:
+                # Файл уже открыт: переключение без чтения с диска и перелексирования
+                self.activate_buffer(buffer)
+            else:
+                # Пустая безымянная вкладка занимается открываемым файлом
+                buffer = self.active_buffer
+                if buffer.file_path is not None or self.text_editor.get(1.0, "end-1c"):
+                    self.store_active_buffer()
+                    buffer = self.add_buffer(file_path)
+                    self.active_buffer = buffer
+                    self.select_buffer_tab(buffer)
+                buffer.file_path = file_path
                 self.current_file = file_path
+                try:
+                    self.load_file_into_editor(file_path)
+                except Exception as e:
+                    messagebox.showerror(self.tr("error"), f"{self.tr('file_open_error')}:\n{str(e)}")
+                    self.discard_buffer(buffer)
+                    return
+                if buffer not in self.buffers:
+                    # Файл не прочитался целиком: load_file_step уже закрыл буфер
+                    return
+                self.update_buffer_tab(buffer)
                 self.update_title()
-                self.status_bar.config(text=f"{self.tr('file_opened')}: {file_path}")
-                
-                if self.project_folder and file_path.startswith(self.project_folder):
-                    self.highlight_file_in_tree(file_path)
-                
+                self.trim_buffer_cache()
                 # Применяем подсветку синтаксиса
                 self.highlight_syntax()
+            
+            if self.project_folder and file_path.startswith(self.project_folder):
+                self.highlight_file_in_tree(file_path)
+    
+    def load_file_into_editor(self, file_path):
+        """Читает файл в редактор способом, подходящим для его размера"""
+        self.cancel_file_load()
+        self.close_paged_view()
+        size = os.path.getsize(file_path)
+        megabyte = 1 << 20
+        if size >= self.settings["paged_view_threshold_mb"] * megabyte:
+            self.open_paged_view(file_path)
+        elif size >= self.settings["large_file_threshold_mb"] * megabyte:
+            # Большой файл вставляется частями; статус обновит load_file_step
+            self.start_file_load(file_path)
+        else:
+            with open(file_path, "r", encoding="utf-8") as file:
+                content = file.read()
+                self.text_editor.delete(1.0, tk.END)
+                self.text_editor.insert(tk.END, content)
+            self.text_editor.edit_reset()
+            self.text_editor.edit_modified(False)
+            self.status_bar.config(text=f"{self.tr('file_opened')}: {file_path}")
+    
+    def add_buffer(self, file_path=None):
+        """Создаёт буфер с вкладкой (без переключения на него)"""
+        buffer = EditorBuffer(file_path)
+        buffer.tab = ttk.Frame(self.buffer_tabs, height=0)
+        self.buffers.append(buffer)
+        self.buffer_switching = True
+        try:
+            self.buffer_tabs.add(buffer.tab, text=self.buffer_title(buffer))
+        finally:
+            self.buffer_switching = False
+        return buffer
+    
+    def find_buffer(self, file_path):
+        """Находит буфер, в котором открыт file_path"""
+        key = os.path.normcase(os.path.abspath(file_path))
+        for buffer in self.buffers:
+            if buffer.file_path and os.path.normcase(os.path.abspath(buffer.file_path)) == key:
+                return buffer
+        return None
+    
+    def buffer_title(self, buffer):
+        """Подпись вкладки: имя файла и звёздочка, если есть несохранённые изменения"""
+        name = os.path.basename(buffer.file_path) if buffer.file_path else self.tr("untitled")
+        modified = self.text_editor.edit_modified() if buffer is self.active_buffer else buffer.modified
+        return f"*{name}" if modified else name
+    
+    def update_buffer_tab(self, buffer):
+        """Обновляет подпись вкладки буфера"""
+        self.buffer_tabs.tab(buffer.tab, text=self.buffer_title(buffer))
+    
+    def select_buffer_tab(self, buffer):
+        """Выбирает вкладку буфера, не вызывая переключения"""
+        self.buffer_switching = True
+        try:
+            self.buffer_tabs.select(buffer.tab)
+        finally:
+            self.buffer_switching = False
+    
+    def on_buffer_tab_changed(self, event=None):
+        """Переключает буфер при выборе вкладки пользователем"""
+        if self.buffer_switching:
+            return
+        selected = self.buffer_tabs.select()
+        for buffer in self.buffers:
+            if str(buffer.tab) == selected:
+                self.activate_buffer(buffer)
+                return
+    
+    def on_buffer_tab_middle_click(self, event):
+        """Закрывает вкладку по щелчку средней кнопкой"""
+        try:
+            index = self.buffer_tabs.index(f"@{event.x},{event.y}")
+        except tk.TclError:
+            return
+        self.close_buffer(self.buffers[index])
+    
+    def on_editor_modified(self, event=None):
+        """Отмечает звёздочкой вкладку с несохранёнными изменениями"""
+        if self.active_buffer is not None:
+            self.update_buffer_tab(self.active_buffer)
+    
+    def store_active_buffer(self):
+        """Сохраняет снимок активного буфера перед переключением на другой"""
+        buffer = self.active_buffer
+        if buffer is None:
+            return
+        self.buffer_counter += 1
+        buffer.last_used = self.buffer_counter
+        if self.file_load is not None or self.paged_file is not None:
+            # Файл загружен не целиком: при возврате он просто откроется заново
+            self.cancel_file_load()
+            self.close_paged_view()
+            buffer.text = None
+            buffer.undo = None
+            buffer.highlight = None
+            buffer.highlight_size = 0
+        else:
+            # Журнал правок сам восстанавливает текст, отдельная копия не нужна
+            buffer.undo = self.undo_journal
+            buffer.text = self.text_editor.get(1.0, "end-1c") if buffer.undo is None else None
+            buffer.cursor = self.text_editor.index(tk.INSERT)
+            buffer.yview = self.text_editor.yview()[0]
+            buffer.modified = self.text_editor.edit_modified()
+            buffer.store_highlight(self.highlighter.snapshot())
+    
+    def trim_buffer_cache(self):
+        """Вытесняет снимки буферов, которые дольше всех не были активны, сверх buffer_cache_mb"""
+        limit = self.settings["buffer_cache_mb"] << 20
+        inactive = sorted((buffer for buffer in self.buffers if buffer is not self.active_buffer),
+                          key=lambda buffer: buffer.last_used)
+        total = sum(buffer.memory_size for buffer in inactive)
+        for buffer in inactive:
+            if total <= limit:
+                break
+            total -= buffer.memory_size
+            buffer.evict()
+            total += buffer.memory_size
+    
+    def activate_buffer(self, buffer):
+        """Показывает буфер в редакторе вместо текущего"""
+        if buffer is self.active_buffer:
+            return
+        self.store_active_buffer()
+        self.active_buffer = buffer
+        self.select_buffer_tab(buffer)
+        self.restore_buffer(buffer)
+    
+    def restore_buffer(self, buffer):
+        """Переносит снимок буфера в редактор"""
+        self.cancel_highlight()
+        self.current_file = buffer.file_path
+        self.undo_journal = None
+        if buffer.spill_path is not None:
+            try:
+                buffer.load_spill()
+            except (OSError, ValueError, KeyError) as e:
+                self.fail_file_load(e)
+                return
+        if buffer.evicted:
+            # Снимок вытеснен из кэша: файл читается с диска
+            try:
+                self.load_file_into_editor(buffer.file_path)
             except Exception as e:
-                messagebox.showerror(self.tr("error"), f"{self.tr('file_open_error')}:\n{str(e)}")
+                # Пустой буфер с путём файла затёр бы файл при сохранении
+                self.fail_file_load(e)
+                return
+            if buffer not in self.buffers:
+                # Загрузка частями не удалась, и буфер уже закрыт
+                return
+        else:
+            # Замена текста - не правка пользователя, в журнал она не попадает
+            self.undo_recording = False
+            try:
+                if buffer.undo is not None:
+                    buffer.undo.replay(self.root.tk.call, self.text_editor_orig)
+                else:
+                    self.text_editor.delete(1.0, tk.END)
+                    self.text_editor.insert(tk.END, buffer.text)
+                    self.text_editor.edit_reset()
+            finally:
+                self.undo_recording = True
+            self.undo_journal = buffer.undo
+            if bool(self.text_editor.edit_modified()) != bool(buffer.modified):
+                self.text_editor.edit_modified(buffer.modified)
+            if buffer.undo is not None:
+                # Журнал повторялся в обход прокси: о новом тексте сообщается здесь
+                self.text_version += 1
+                self.highlighter.invalidate()
+                if self.find_bar.winfo_ismapped():
+                    self.schedule_find()
+                self.schedule_lint()
+            if buffer.highlight is not None:
+                self.highlighter.restore(buffer.highlight)
+            self.text_editor.mark_set(tk.INSERT, buffer.cursor)
+            self.text_editor.yview_moveto(buffer.yview)
+            self.status_bar.config(text=buffer.file_path or self.tr("untitled"))
+        # Данные активного буфера теперь в виджете
+        buffer.text = ""
+        buffer.undo = None
+        buffer.highlight = None
+        buffer.highlight_size = 0
+        self.update_buffer_tab(buffer)
+        self.update_title()
+        self.trim_buffer_cache()
+        self.highlight_syntax()
+    
+    def close_buffer(self, buffer=None):
+        """Закрывает вкладку (по умолчанию активную), предлагая сохранить изменения"""
+        buffer = buffer or self.active_buffer
+        modified = self.text_editor.edit_modified() if buffer is self.active_buffer else buffer.modified
+        if modified:
+            answer = messagebox.askyesnocancel(
+                self.tr("confirmation"),
+                f"{self.tr('save_changes')} {self.buffer_title(buffer).lstrip('*')}?"
+            )
+            if answer is None:
+                return
+            if answer:
+                self.activate_buffer(buffer)
+                self.save_file()
+                # Снимок для записи уже взят; без имени файла (отмена "Сохранить как") не закрываем
+                if self.current_file is None or self.text_editor.edit_modified():
+                    return
+        self.discard_buffer(buffer)
+    
+    def discard_buffer(self, buffer):
+        """Убирает буфер без вопросов; вместо активного показывается последний открывавшийся"""
+        self.buffers.remove(buffer)
+        self.buffer_switching = True
+        try:
+            self.buffer_tabs.forget(buffer.tab)
+        finally:
+            self.buffer_switching = False
+        buffer.tab.destroy()
+        buffer.drop_spill()
+        if buffer is not self.active_buffer:
+            return
+        
+        self.cancel_file_load()
+        self.close_paged_view()
+        self.active_buffer = None
+        if self.buffers:
+            next_buffer = max(self.buffers, key=lambda item: item.last_used)
+        else:
+            next_buffer = self.add_buffer()
+        self.active_buffer = next_buffer
+        self.select_buffer_tab(next_buffer)
+        self.restore_buffer(next_buffer)
+    
+    def start_file_load(self, file_path):
+        """Начинает загрузку большого файла в редактор частями, не блокируя интерфейс"""
+        mapped = MappedFile(file_path)
+        self.text_editor.delete(1.0, tk.END)
+        # Пока файл загружается, редактировать его нельзя
+        self.text_editor.config(state="disabled")
+        self.file_load = {"file": mapped, "position": 0, "job": None}
+        self.load_file_step()
+    
+    def load_file_step(self):
+        """Вставляет в редактор очередную часть загружаемого файла"""
+        load = self.file_load
+        mapped = load["file"]
+        try:
+            text, load["position"] = mapped.read_chunk(load["position"], FILE_LOAD_CHUNK)
+        except UnicodeDecodeError as e:
+            self.fail_file_load(e)
+            return
+        
+        self.text_editor.config(state="normal")
+        self.text_editor.insert(tk.END, text)
+        self.text_editor.config(state="disabled")
+        
+        if load["position"] < mapped.size:
+            percent = load["position"] * 100 // mapped.size
+            self.status_bar.config(text=f"{self.tr('loading_file')} {mapped.path}: {percent}%")
+            load["job"] = self.root.after(1, self.load_file_step)
+            return
+        
+        self.cancel_file_load()
+        # Вставка частями не должна попадать в историю отмены
+        self.text_editor.edit_reset()
+        self.text_editor.edit_modified(False)
+        self.status_bar.config(text=f"{self.tr('file_opened')}: {mapped.path}")
+    
+    def fail_file_load(self, error):
+        """Закрывает буфер, файл которого не удалось прочитать целиком.
+        
+        Частичный текст нельзя оставлять связанным с путём: сохранение записало
+        бы его поверх файла. Поэтому редактор очищается, буфер отвязывается от
+        файла и закрывается, а затем показывается ошибка.
+        """
+        self.cancel_file_load()
+        self.close_paged_view()
+        self.text_editor.delete(1.0, tk.END)
+        self.text_editor.edit_reset()
+        self.text_editor.edit_modified(False)
+        buffer = self.active_buffer
+        buffer.file_path = None
+        self.current_file = None
+        self.discard_buffer(buffer)
+        messagebox.showerror(self.tr("error"), f"{self.tr('file_open_error')}:\n{str(error)}")
+    
+    def cancel_file_load(self):
+        """Прерывает загрузку файла частями, если она идёт"""
+        if self.file_load is None:
+            return
+        if self.file_load["job"] is not None:
+            self.root.after_cancel(self.file_load["job"])
+        self.file_load["file"].close()
+        self.file_load = None
+        self.text_editor.config(state="normal")
+    
+    def open_paged_view(self, file_path):
+        """Открывает очень большой файл только для чтения, по странице за раз"""
+        self.paged_file = MappedFile(file_path)
+        self.paged_file.start_index()
+        self.paged_bar.pack(fill=tk.X, before=self.text_editor.frame)
+        self.show_paged_page(0)
+        self.paged_poll_job = self.root.after(PAGED_VIEW_POLL_INTERVAL, self.poll_paged_index)
+        self.status_bar.config(text=f"{self.tr('file_opened')}: {file_path} ({self.tr('paged_view')})")
+    
+    def close_paged_view(self):
+        """Закрывает постраничный просмотр и возвращает обычный редактор"""
+        if self.paged_file is None:
+            return
+        if self.paged_poll_job is not None:
+            self.root.after_cancel(self.paged_poll_job)
+            self.paged_poll_job = None
+        self.paged_file.close()
+        self.paged_file = None
+        self.paged_bar.pack_forget()
+        self.text_editor.config(state="normal")
+        self.text_editor.delete(1.0, tk.END)
+        self.text_editor.edit_reset()
+    
+    def paged_page_count(self):
+        """Количество страниц в уже проиндексированной части файла"""
+        page_lines = self.settings["paged_view_lines"]
+        return max(1, -(-self.paged_file.line_count // page_lines))
+    
+    def show_paged_page(self, page):
+        """Показывает в редакторе страницу файла из постраничного просмотра"""
+        if self.paged_file is None:
+            return
+        page_lines = self.settings["paged_view_lines"]
+        page = max(0, min(page, self.paged_page_count() - 1))
+        text = self.paged_file.read_lines(page * page_lines, page_lines)
+        
+        self.paged_page = page
+        self.paged_shown_lines = min(page_lines, self.paged_file.line_count - page * page_lines)
+        self.text_editor.config(state="normal")
+        self.text_editor.delete(1.0, tk.END)
+        self.text_editor.insert(tk.END, text)
+        self.text_editor.config(state="disabled")
+        self.text_editor.edit_reset()
+        self.update_paged_label()
+    
+    def update_paged_label(self):
+        """Обновляет номер страницы и ход индексации"""
+        page_lines = self.settings["paged_view_lines"]
+        first_line = self.paged_page * page_lines + 1
+        text = (f"{self.tr('page')} {self.paged_page + 1}/{self.paged_page_count()} "
+                f"({self.tr('lines')} {first_line}-{first_line + max(self.paged_shown_lines, 1) - 1})")
+        if not self.paged_file.index_done:
+            percent = self.paged_file.indexed_bytes * 100 // max(self.paged_file.size, 1)
+            text += f", {self.tr('indexing')} {percent}%"
+        self.paged_label.config(text=text)
+    
+    def poll_paged_index(self):
+        """Следит за индексацией: дорисовывает неполную страницу и обновляет счётчики"""
+        self.paged_poll_job = None
+        if self.paged_file is None:
+            return
+        page_lines = self.settings["paged_view_lines"]
+        available = self.paged_file.line_count - self.paged_page * page_lines
+        if self.paged_shown_lines < page_lines and available > self.paged_shown_lines:
+            self.show_paged_page(self.paged_page)
+        else:
+            self.update_paged_label()
+        if not self.paged_file.index_done:
+            self.paged_poll_job = self.root.after(PAGED_VIEW_POLL_INTERVAL, self.poll_paged_index)
+    
+    def go_to_paged_line(self, event=None):
+        """Переходит к строке с номером из поля ввода постраничного просмотра"""
+        try:
+            line = int(self.paged_line_entry.get()) - 1
+        except ValueError:
+            return
+        page_lines = self.settings["paged_view_lines"]
+        if line < 0 or line >= self.paged_file.line_count:
+            return
+        self.show_paged_page(line // page_lines)
+        index = f"{line % page_lines + 1}.0"
+        self.text_editor.mark_set(tk.INSERT, index)
+        self.text_editor.see(index)
     
     def open_folder(self):
         """Открывает папку как проект"""
@@ -729,31 +4637,171 @@ class PythonCodeEditor:
             self.update_title()
             self.status_bar.config(text=f"{self.tr('folder_opened')}: {folder_path}")
             self.build_file_tree(folder_path)
+            self.start_symbol_index(folder_path)
+            self.start_search_index(folder_path)
     
     def build_file_tree(self, folder_path):
-        """Строит дерево файлов для указанной папки"""
+        """Строит дерево файлов для указанной папки.
+        
+        Сразу читается только корень проекта; вложенные папки добавляются
+        с заглушкой и читаются при первом раскрытии (on_tree_open).
+        """
         for item in self.file_tree.get_children():
             self.file_tree.delete(item)
+        self.tree_items.clear()
+        self.tree_watcher.clear()
         
+        self.tree_ignore = TreeIgnoreRules(
+            folder_path,
+            self.settings["tree_ignore_patterns"],
+            self.settings["tree_use_gitignore"]
+        )
         root_node = self.file_tree.insert("", "end", text=os.path.basename(folder_path), 
-                                        values=[folder_path], open=True)
+                                        values=[folder_path], open=True, tags=("folder",))
+        self.tree_items[self.tree_path_key(folder_path)] = root_node
         self.add_folder_contents(root_node, folder_path)
+        
+        if self.tree_watch_job is None:
+            self.tree_watch_job = self.root.after(TREE_WATCH_INTERVAL, self.poll_tree_changes)
     
-    def add_folder_contents(self, parent_node, folder_path):
-        """Добавляет содержимое папки в дерево файлов"""
+    def scan_tree_folder(self, folder_path):
+        """Читает папку для дерева: список (это файл, ключ сортировки, имя, путь) или None.
+        
+        Папки идут первыми, затем файлы, по алфавиту; скрытые правилами элементы пропускаются.
+        """
+        entries = []
         try:
-            for item in os.listdir(folder_path):
-                full_path = os.path.join(folder_path, item)
-                
-                if os.path.isdir(full_path):
-                    node = self.file_tree.insert(parent_node, "end", text=item, 
-                                               values=[full_path], open=False)
-                    self.add_folder_contents(node, full_path)
-                else:
-                    self.file_tree.insert(parent_node, "end", text=item, 
-                                      values=[full_path])
-        except PermissionError:
-            pass
+            with os.scandir(folder_path) as scan:
+                for entry in scan:
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        is_dir = False
+                    if not self.tree_ignore.is_ignored(entry.path, entry.name, is_dir):
+                        entries.append((not is_dir, entry.name.lower(), entry.name, entry.path))
+        except OSError:
+            return None
+        return sorted(entries)
+    
+    def insert_tree_entry(self, parent_node, index, entry):
+        """Вставляет в дерево элемент, полученный от scan_tree_folder"""
+        is_file, _, name, full_path = entry
+        if is_file:
+            node = self.file_tree.insert(parent_node, index, text=name, values=[full_path], tags=("file",))
+        else:
+            node = self.file_tree.insert(parent_node, index, text=name, 
+                                       values=[full_path], open=False, tags=("folder",))
+            # Заглушка, чтобы у закрытой папки был значок раскрытия
+            self.file_tree.insert(node, "end", text="...", values=[""], tags=("placeholder",))
+        self.tree_items[self.tree_path_key(full_path)] = node
+        return node
+    
+    def delete_tree_item(self, node):
+        """Удаляет узел вместе с вложенными из дерева, индекса путей и наблюдателя"""
+        path = self.file_tree.item(node, "values")[0]
+        key = self.tree_path_key(path)
+        prefix = os.path.join(key, "")
+        for item_key in [item_key for item_key in self.tree_items if item_key.startswith(prefix)]:
+            del self.tree_items[item_key]
+        self.tree_items.pop(key, None)
+        self.tree_watcher.unwatch_tree(path)
+        self.file_tree.delete(node)
+    
+    def tree_path_key(self, path):
+        """Ключ индекса tree_items: один и тот же для разных записей одного пути"""
+        return os.path.normcase(os.path.normpath(path))
+    
+    def add_folder_contents(self, parent_node, folder_path):
+        """Добавляет в дерево содержимое одной папки и начинает следить за ней"""
+        entries = self.scan_tree_folder(folder_path)
+        if entries is None:
+            return
+        
+        for entry in entries:
+            self.insert_tree_entry(parent_node, "end", entry)
+        self.tree_watcher.watch(folder_path)
+    
+    def is_tree_folder_loaded(self, node):
+        """Проверяет, что содержимое папки уже прочитано (нет заглушки)"""
+        if not self.file_tree.tag_has("folder", node):
+            return False
+        children = self.file_tree.get_children(node)
+        return not (len(children) == 1 and self.file_tree.tag_has("placeholder", children[0]))
+    
+    def sync_tree_folder(self, folder_path):
+        """Приводит прочитанную папку дерева в соответствие с диском.
+        
+        Удаляются и вставляются только изменившиеся элементы (переименование -
+        это удаление старого и вставка нового), поэтому раскрытые папки и
+        выделение остальных элементов сохраняются.
+        """
+        # За папками проекта следят и ради индекса поиска, даже если в дереве они не прочитаны
+        if self.search_index is not None and os.path.isdir(folder_path):
+            self.search_index.index_folder(folder_path, self.tree_ignore, recursive=False)
+        node = self.find_tree_item(folder_path)
+        if node is None or not self.is_tree_folder_loaded(node):
+            return
+        entries = self.scan_tree_folder(folder_path)
+        if entries is None:
+            # Папка удалена: её узел уберёт обновление родительской папки
+            return
+        
+        existing = {}
+        for child in self.file_tree.get_children(node):
+            existing[(self.file_tree.tag_has("file", child), self.file_tree.item(child, "text"))] = child
+        wanted = {(is_file, name) for is_file, _, name, _ in entries}
+        
+        for key, child in existing.items():
+            if key not in wanted:
+                self.delete_tree_item(child)
+        # Оставшиеся элементы уже стоят в нужном порядке, новые вставляем на их места
+        for index, entry in enumerate(entries):
+            if (entry[0], entry[2]) not in existing:
+                self.insert_tree_entry(node, index, entry)
+    
+    def poll_tree_changes(self):
+        """Применяет к дереву изменения папок, замеченные наблюдателем"""
+        changed = set()
+        while True:
+            try:
+                changed.add(self.tree_watcher.changes.get_nowait())
+            except queue.Empty:
+                break
+        # Родительские папки раньше вложенных: удалённые узлы уже не ищутся
+        for folder_path in sorted(changed):
+            try:
+                self.sync_tree_folder(folder_path)
+            except tk.TclError:
+                pass
+        written = set()
+        while True:
+            try:
+                written.add(self.tree_watcher.file_changes.get_nowait())
+            except queue.Empty:
+                break
+        if self.search_index is not None:
+            for file_path in written:
+                self.search_index.update_file(file_path)
+            # Индекс поиска сообщает о папках проекта, в том числе не раскрытых в дереве
+            while True:
+                try:
+                    self.tree_watcher.watch(self.search_index.new_folders.get_nowait())
+                except queue.Empty:
+                    break
+        self.tree_watch_job = self.root.after(TREE_WATCH_INTERVAL, self.poll_tree_changes)
+    
+    def load_tree_node(self, node):
+        """Заменяет заглушку папки её содержимым, если папка ещё не прочитана"""
+        children = self.file_tree.get_children(node)
+        if len(children) == 1 and self.file_tree.tag_has("placeholder", children[0]):
+            self.file_tree.delete(children[0])
+            self.add_folder_contents(node, self.file_tree.item(node, "values")[0])
+    
+    def on_tree_open(self, event):
+        """Читает содержимое папки при её раскрытии"""
+        node = self.file_tree.focus()
+        if node:
+            self.load_tree_node(node)
     
     def on_file_double_click(self, event):
         """Обработчик двойного клика по файлу"""
@@ -763,26 +4811,43 @@ class PythonCodeEditor:
         if os.path.isfile(file_path):
             self.open_file(file_path)
     
+    def find_tree_item(self, path, load=False):
+        """Находит узел дерева для пути; с load=True читает папки по пути к нему.
+        
+        Поиск идёт по словарю tree_items (путь -> узел), без обхода дерева.
+        Возвращает None, если путь вне проекта, скрыт правилами игнорирования
+        или его папка ещё не прочитана.
+        """
+        key = self.tree_path_key(path)
+        item = self.tree_items.get(key)
+        if item is not None or not load:
+            return item
+        
+        # Поднимаемся до ближайшей папки, уже вставленной в дерево, и читаем папки вниз от неё
+        missing = []
+        while key not in self.tree_items:
+            parent_key = os.path.dirname(key)
+            if parent_key == key:
+                return None
+            missing.append(key)
+            key = parent_key
+        for child_key in reversed(missing):
+            self.load_tree_node(self.tree_items[key])
+            if child_key not in self.tree_items:
+                return None
+            key = child_key
+        return self.tree_items[key]
+    
     def highlight_file_in_tree(self, file_path):
-        """Выделяет файл в дереве файлов"""
-        for item in self.file_tree.get_children():
-            if self.file_tree.item(item, "values") and self.file_tree.item(item, "values")[0] == file_path:
-                self.file_tree.selection_set(item)
-                self.file_tree.focus(item)
-                return
+        """Выделяет файл в дереве файлов, при необходимости читая его родительские папки"""
+        item = self.find_tree_item(file_path, load=True)
+        if item is None:
+            return
         
-        for item in self.file_tree.get_children():
-            self._search_and_highlight_file(item, file_path)
-    
-    def _search_and_highlight_file(self, parent_item, file_path):
-        """Рекурсивный поиск файла в дереве"""
-        for item in self.file_tree.get_children(parent_item):
-            if self.file_tree.item(item, "values") and self.file_tree.item(item, "values")[0] == file_path:
-                self.file_tree.selection_set(item)
-                self.file_tree.focus(item)
-                self.expand_parents(item)
-                return
-            self._search_and_highlight_file(item, file_path)
+        self.file_tree.selection_set(item)
+        self.file_tree.focus(item)
+        self.expand_parents(item)
+        self.file_tree.see(item)
     
     def expand_parents(self, item):
         """Раскрывает родительские папки для элемента"""
@@ -791,22 +4856,55 @@ class PythonCodeEditor:
             self.file_tree.item(parent, open=True)
             self.expand_parents(parent)
     
-    def save_file(self):
-        """Сохраняет текущий файл"""
+    def save_file(self, on_saved=None):
+        """Сохраняет текущий файл; on_saved вызывается после успешной записи"""
+        if not self.can_save_buffer():
+            return
         if self.current_file:
-            try:
-                content = self.text_editor.get(1.0, tk.END)
-                with open(self.current_file, "w", encoding="utf-8") as file:
-                    file.write(content)
-                
-                self.status_bar.config(text=f"{self.tr('file_saved')}: {self.current_file}")
-            except Exception as e:
-                messagebox.showerror(self.tr("error"), f"{self.tr('file_save_error')}:\n{str(e)}")
+            # Снимок без перевода строки, который Text всегда держит в конце;
+            # запись идёт в фоновом потоке, интерфейс не ждёт диска
+            content = self.text_editor.get(1.0, "end-1c")
+            self.file_saver.submit(self.current_file, content, on_saved)
+            self.text_editor.edit_modified(False)
+            self.status_bar.config(text=f"{self.tr('saving_file')}: {self.current_file}")
+            if self.save_poll_job is None:
+                self.save_poll_job = self.root.after(SAVE_POLL_INTERVAL, self.poll_save_results)
         else:
             self.save_file_as()
     
+    def poll_save_results(self):
+        """Показывает результаты фоновых сохранений"""
+        self.save_poll_job = None
+        for file_path, written, error, elapsed, on_saved in self.file_saver.drain():
+            if error is not None:
+                self.mark_buffer_modified(file_path)
+                messagebox.showerror(self.tr("error"), f"{self.tr('file_save_error')}:\n{str(error)}")
+                continue
+            status = self.tr("file_saved") if written else self.tr("file_unchanged")
+            self.status_bar.config(text=f"{status}: {file_path} ({elapsed * 1000:.0f} {self.tr('ms')})")
+            if written and self.symbol_index is not None and file_path.endswith(".py"):
+                self.symbol_index.update_file(file_path)
+            if written and self.search_index is not None:
+                self.search_index.update_file(file_path)
+            if on_saved is not None:
+                on_saved()
+        if self.file_saver.pending > 0:
+            self.save_poll_job = self.root.after(SAVE_POLL_INTERVAL, self.poll_save_results)
+    
+    def can_save_buffer(self):
+        """Проверяет, что в редакторе весь файл, а не его часть"""
+        if self.paged_file is not None:
+            messagebox.showinfo(self.tr("paged_view"), self.tr("paged_view_read_only"))
+            return False
+        if self.file_load is not None:
+            messagebox.showinfo(self.tr("loading_file"), self.tr("file_still_loading"))
+            return False
+        return True
+    
     def save_file_as(self):
         """Сохраняет файл с указанием имени"""
+        if not self.can_save_buffer():
+            return
         file_path = filedialog.asksaveasfilename(
             defaultextension=".py",
             filetypes=[("Python Files", "*.py"), ("Text Files", "*.txt"), ("All Files", "*.*")]
@@ -814,12 +4912,30 @@ class PythonCodeEditor:
         
         if file_path:
             self.current_file = file_path
-            self.save_file()
+            self.active_buffer.file_path = file_path
+            self.update_buffer_tab(self.active_buffer)
             self.update_title()
             
             if self.project_folder and file_path.startswith(self.project_folder):
-                self.refresh_file_tree()
-                self.highlight_file_in_tree(file_path)
+                self.save_file(on_saved=lambda: self.reveal_saved_file(file_path))
+            else:
+                self.save_file()
+    
+    def mark_buffer_modified(self, file_path):
+        """Снова помечает буфер несохранённым (запись не удалась)"""
+        buffer = self.find_buffer(file_path)
+        if buffer is None:
+            return
+        if buffer is self.active_buffer:
+            self.text_editor.edit_modified(True)
+        else:
+            buffer.modified = True
+            self.update_buffer_tab(buffer)
+    
+    def reveal_saved_file(self, file_path):
+        """Показывает в дереве файл, только что сохранённый под новым именем"""
+        self.sync_tree_folder(os.path.dirname(file_path))
+        self.highlight_file_in_tree(file_path)
     
     def update_title(self):
         """Обновляет заголовок окна"""
@@ -830,8 +4946,8 @@ class PythonCodeEditor:
             title += f" - {os.path.basename(self.current_file)}"
         self.root.title(title)
     
-    def run_python_code(self):
-        """Запускает Python-код с обработкой временного файла"""
+    def run_python_code(self, profile=False):
+        """Запускает Python-код, передавая его новому процессу через stdin"""
         code = self.text_editor.get(1.0, tk.END)
         
         if not code.strip():
@@ -845,111 +4961,1370 @@ class PythonCodeEditor:
             self.stop_execution()
         
         python_exec = self.get_python_executable()
-        temp_dir = self.project_folder if self.project_folder else os.getcwd()
-        temp_file = os.path.join(temp_dir, "__temp_execution.py")
+        work_dir = self.project_folder if self.project_folder else os.getcwd()
+        # Каждый запуск получает свой номер: он служит ключом вывода и именем безымянного кода
+        self.run_counter += 1
+        run_id = self.run_counter
+        code_path = self.current_file or os.path.join(work_dir, f"<untitled-{run_id}>")
+        # Вывод без буферизации, чтобы он появлялся по мере работы программы
+        env = dict(os.environ, PYTHONUNBUFFERED="1", PYTHONIOENCODING="utf-8")
+        modules = self.settings["warm_pool_modules"]
+        worker = self.warm_pool.take(python_exec, modules) if self.settings["warm_pool_enabled"] else None
         
         try:
-            # Сохраняем код во временный файл
-            with open(temp_file, "w", encoding="utf-8") as f:
-                f.write(code)
-            
-            # Убедимся, что файл записался на диск
-            if not os.path.exists(temp_file):
-                raise FileNotFoundError(f"{self.tr('temp_file_error')}: {temp_file}")
-            
+            # Полный вывод прошлого запуска больше не нужен
+            if self.output_spill:
+                self.output_spill.remove()
+            self.output_spill = OutputSpill()
             self.output_text.config(state="normal")
             self.output_text.delete(1.0, tk.END)
-            self.output_text.insert(tk.END, f"{self.tr('running_code_with')} {python_exec}...\n")
-            self.output_text.see(tk.END)
             self.output_text.config(state="disabled")
             
-            # Запускаем процесс с указанием рабочей директории
-            self.process = subprocess.Popen(
-                [python_exec, temp_file],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                stdin=subprocess.PIPE,
-                universal_newlines=True,
-                cwd=temp_dir,
-                creationflags=subprocess.CREATE_NO_WINDOW if platform.system() == "Windows" else 0
-            )
+            if worker is not None:
+                # Тёплый интерпретатор уже запущен и импортировал модули
+                self.append_output([(f"{self.tr('running_code_with')} {python_exec} ({self.tr('warm_interpreter')})...\n", None)])
+            else:
+                self.append_output([(f"{self.tr('running_code_with')} {python_exec}...\n", None)])
+                worker = self.warm_pool.spawn(python_exec, [], work_dir, env)
+            # Код передаётся процессу через stdin, минуя диск
+            limits = self.get_run_limits()
+            self.process = worker
+            self.run_started = time.perf_counter()
+            self.run_result = None
+            self.run_timed_out = False
+            self.run_profile_path = None
+            profile_options = None
+            if profile:
+                # Профиль каждого запуска сохраняется отдельно, чтобы запуски можно было сравнить
+                profile_name = f"{time.strftime('%Y%m%d-%H%M%S')}-{run_id}-{os.path.basename(code_path)}.json"
+                self.run_profile_path = os.path.join(self.profiles_folder(), re.sub(r"[<>]", "", profile_name))
+                profile_options = {
+                    "profile": self.settings["profile_mode"],
+                    "profile_path": self.run_profile_path,
+                    "sample_interval": self.settings["profile_sample_interval_ms"] / 1000
+                }
+            self.warm_pool.run(worker, code, code_path, work_dir, {
+                "cpu_seconds": limits["cpu_seconds"],
+                "memory_bytes": limits["memory_mb"] * 1024 * 1024
+            }, profile_options)
+            if limits["wall_seconds"]:
+                self.run_timeout_job = self.root.after(limits["wall_seconds"] * 1000, self.on_run_timeout)
             
-            self.root.after(100, self.read_process_output)
+            # Потоки чтения разбирают оба канала сразу, не давая трубам переполниться
+            self.output_queue = queue.Queue(maxsize=1000)
+            self.output_reader = ProcessOutputReader(self.process, self.output_queue, run_id, encoding="utf-8")
+            self.output_open_streams = self.output_reader.stream_count
+            self.root.after(OUTPUT_FLUSH_INTERVAL, self.read_process_output)
             self.notebook.select(1)
             self.status_bar.config(text=self.tr("executing_code"))
             
-            # Удаляем временный файл после завершения процесса
-            self.root.after(100, lambda: self.cleanup_temp_file(temp_file))
+            # Взамен использованного интерпретатора сразу прогревается новый
+            if self.settings["warm_pool_enabled"]:
+                self.warm_pool.fill(python_exec, modules, work_dir, env)
         except Exception as e:
             self.output_text.config(state="normal")
             self.output_text.insert(tk.END, f"{self.tr('error')}: {str(e)}\n", "error")
             self.output_text.config(state="disabled")
             self.status_bar.config(text=self.tr("execution_error"))
-            # Удаляем временный файл в случае ошибки
-            self.cleanup_temp_file(temp_file)
 
-    def cleanup_temp_file(self, temp_file):
-        """Безопасное удаление временного файла"""
+    def get_run_limits(self):
+        """Ограничения запуска для текущего проекта (0 - без ограничения)"""
+        limits = {"cpu_seconds": 0, "wall_seconds": 0, "memory_mb": 0}
+        limits.update(self.settings["run_limits"].get(self.project_folder or "", {}))
+        return limits
+    
+    def show_run_limits(self):
+        """Показывает окно ограничений запуска для текущего проекта"""
+        limits_window = tk.Toplevel(self.root)
+        limits_window.title(self.tr("run_limits"))
+        limits_window.geometry("400x260")
+        limits_window.resizable(False, False)
+        
+        limits = self.get_run_limits()
+        variables = {}
+        for key, label in (("cpu_seconds", "cpu_time_limit"), ("wall_seconds", "wall_time_limit"),
+                           ("memory_mb", "memory_limit")):
+            ttk.Label(limits_window, text=self.tr(label) + ":").pack(pady=(10, 0), padx=10, anchor="w")
+            variables[key] = tk.StringVar(value=str(limits[key]))
+            tk.Spinbox(limits_window, from_=0, to=10 ** 6, textvariable=variables[key]).pack(pady=5, padx=10, fill=tk.X)
+        
+        def save():
+            try:
+                values = {key: max(0, int(variable.get())) for key, variable in variables.items()}
+            except ValueError:
+                messagebox.showerror(self.tr("error"), self.tr("invalid_number"), parent=limits_window)
+                return
+            self.settings["run_limits"][self.project_folder or ""] = values
+            self.save_settings()
+            limits_window.destroy()
+        
+        # Кнопки
+        button_frame = ttk.Frame(limits_window)
+        button_frame.pack(pady=20, fill=tk.X, padx=10)
+        ttk.Button(button_frame, text=self.tr("save"), command=save).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(button_frame, text=self.tr("cancel"), command=limits_window.destroy).pack(side=tk.RIGHT, padx=5)
+    
+    def on_run_timeout(self):
+        """Убивает запуск, превысивший ограничение по времени"""
+        self.run_timeout_job = None
+        if self.run_in_progress():
+            self.run_timed_out = True
+            signal_process_group(self.process)
+    
+    def run_in_progress(self):
+        """Идёт ли запуск: процесс работает или его потомки ещё держат открытым вывод"""
+        return self.process is not None and (self.process.poll() is None or self.output_open_streams > 0)
+    
+    def format_run_stats(self, return_code, usage):
+        """Строка со статистикой завершённого запуска"""
+        wall_time = time.perf_counter() - self.run_started
+        parts = [f"{self.tr('exit_code')}: {return_code}", f"{self.tr('wall_time')}: {wall_time:.2f} s"]
+        if usage is not None:
+            # ru_maxrss в Linux измеряется в килобайтах, в macOS - в байтах
+            peak_memory = usage.ru_maxrss if platform.system() == "Darwin" else usage.ru_maxrss * 1024
+            parts.append(f"{self.tr('cpu_time')}: {usage.ru_utime + usage.ru_stime:.2f} s")
+            parts.append(f"{self.tr('peak_memory')}: {peak_memory / (1024 * 1024):.1f} MB")
+        return " | ".join(parts)
+    
+    def run_with_profiler(self):
+        """Запускает код под профилировщиком и показывает самые затратные функции"""
+        self.run_python_code(profile=True)
+    
+    def toggle_sampling_profiler(self):
+        """Переключает профилирование между cProfile и выборочным режимом"""
+        self.settings["profile_mode"] = "sampling" if self.sampling_profiler_var.get() else "cprofile"
+        self.save_settings()
+    
+    def profiles_folder(self):
+        """Папка, в которой сохраняются профили запусков"""
+        folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), "profiles")
+        os.makedirs(folder, exist_ok=True)
+        return folder
+    
+    def open_profile(self):
+        """Открывает сохранённый профиль одного из прошлых запусков"""
+        profile_path = filedialog.askopenfilename(
+            initialdir=self.profiles_folder(),
+            filetypes=[("Profiles", "*.json"), ("All Files", "*.*")]
+        )
+        if profile_path:
+            self.show_profile(profile_path)
+    
+    def load_profile(self, profile_path):
+        """Читает профиль; возвращает его описание и строки по ключу (файл, строка, функция)"""
+        with open(profile_path, "r", encoding="utf-8") as f:
+            profile = json.load(f)
+        rows = {}
+        for file_name, line, name, calls, own_time, total_time in profile["rows"]:
+            rows[(file_name, line, name)] = (calls, own_time, total_time)
+        return profile, rows
+    
+    def show_profile(self, profile_path):
+        """Показывает таблицу функций профиля с сортировкой по столбцам"""
         try:
-            if os.path.exists(temp_file):
-                os.remove(temp_file)
-        except Exception as e:
-            print(f"{self.tr('temp_file_delete_error')}: {str(e)}")
+            profile, rows = self.load_profile(profile_path)
+        except (OSError, ValueError, KeyError) as e:
+            messagebox.showerror(self.tr("error"), f"{self.tr('profile_open_error')}:\n{str(e)}")
+            return
+        
+        window = tk.Toplevel(self.root)
+        window.title(f"{self.tr('profile')} - {os.path.basename(profile_path)}")
+        window.geometry("900x500")
+        
+        controls = ttk.Frame(window)
+        controls.pack(fill=tk.X)
+        columns = ("function", "location", "calls", "own_time", "total_time", "delta")
+        table = ttk.Treeview(window, columns=columns, show="headings")
+        scrollbar = ttk.Scrollbar(window, orient=tk.VERTICAL, command=table.yview)
+        table.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        table.pack(fill=tk.BOTH, expand=True)
+        for column, width in zip(columns, (200, 320, 80, 90, 90, 90)):
+            table.heading(column, text=self.tr(column), command=lambda column=column: sort(column))
+            table.column(column, width=width, anchor="w" if column in ("function", "location") else "e")
+        
+        state = {"sort": "total_time", "baseline": {}}
+        items = {}
+        
+        def row_values(key):
+            file_name, line, name = key
+            calls, own_time, total_time = rows[key]
+            baseline = state["baseline"].get(key)
+            delta = "" if not state["baseline"] else f"{total_time - (baseline[2] if baseline else 0):+.4f}"
+            return (name, f"{file_name}:{line}", "" if calls is None else calls,
+                    f"{own_time:.4f}", f"{total_time:.4f}", delta)
+        
+        def sort(column):
+            state["sort"] = column
+            index = columns.index(column)
+            if column in ("function", "location"):
+                ordered = sorted(rows, key=lambda key: row_values(key)[index])
+            elif column == "calls":
+                ordered = sorted(rows, key=lambda key: rows[key][0] or 0, reverse=True)
+            elif column == "delta":
+                ordered = sorted(rows, key=lambda key: abs(float(row_values(key)[5] or 0)), reverse=True)
+            else:
+                ordered = sorted(rows, key=lambda key: rows[key][index - 2], reverse=True)
+            # Порядок меняется перестановкой готовых строк, без их пересоздания
+            for position, key in enumerate(ordered):
+                table.move(items[key], "", position)
+        
+        def compare():
+            baseline_path = filedialog.askopenfilename(
+                parent=window,
+                initialdir=os.path.dirname(profile_path),
+                filetypes=[("Profiles", "*.json"), ("All Files", "*.*")]
+            )
+            if not baseline_path:
+                return
+            try:
+                _, state["baseline"] = self.load_profile(baseline_path)
+            except (OSError, ValueError, KeyError) as e:
+                messagebox.showerror(self.tr("error"), f"{self.tr('profile_open_error')}:\n{str(e)}", parent=window)
+                return
+            for key, item in items.items():
+                table.item(item, values=row_values(key))
+            compare_label.config(text=f"{self.tr('compared_with')}: {os.path.basename(baseline_path)}")
+            sort("delta")
+        
+        def jump(event):
+            item = table.focus()
+            for key, row_item in items.items():
+                if row_item == item:
+                    self.go_to_profile_location(profile, key[0], key[1])
+                    break
+        
+        for key in rows:
+            items[key] = table.insert("", tk.END, values=row_values(key))
+        sort(state["sort"])
+        table.bind("<Double-1>", jump)
+        table.bind("<Return>", jump)
+        
+        ttk.Label(controls, text=f"{profile['file']} ({profile['mode']})").pack(side=tk.LEFT, padx=10)
+        ttk.Button(controls, text=self.tr("compare_profile"), command=compare).pack(side=tk.RIGHT, padx=5)
+        compare_label = ttk.Label(controls)
+        compare_label.pack(side=tk.RIGHT, padx=10)
+    
+    def start_symbol_index(self, folder_path):
+        """Запускает фоновую индексацию символов проекта"""
+        if self.symbol_index is not None:
+            self.symbol_index.stop()
+            self.symbol_index = None
+        index_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), "index")
+        try:
+            os.makedirs(index_folder, exist_ok=True)
+            # Для каждого проекта своя база
+            name = hashlib.sha1(self.tree_path_key(folder_path).encode("utf-8")).hexdigest()
+            self.symbol_index = SymbolIndex(os.path.join(index_folder, f"{name}.sqlite"))
+        except (OSError, sqlite3.Error) as e:
+            self.status_bar.config(text=f"{self.tr('error')}: {str(e)}")
+            return
+        self.symbol_index.index_folder(folder_path, self.tree_ignore)
+        self.schedule_symbol_index_poll()
+    
+    def schedule_symbol_index_poll(self):
+        """Запускает опрос хода индексации, если он ещё не запущен"""
+        if self.symbol_index_job is None:
+            self.symbol_index_job = self.root.after(SYMBOL_INDEX_POLL_INTERVAL, self.poll_symbol_index)
+    
+    def poll_symbol_index(self):
+        """Показывает ход индексации символов в строке состояния"""
+        self.symbol_index_job = None
+        if self.symbol_index is None:
+            return
+        if self.symbol_index.busy:
+            done, total = self.symbol_index.progress
+            self.status_bar.config(text=f"{self.tr('indexing_symbols')}: {done}/{total}" if total else self.tr("indexing_symbols"))
+            self.schedule_symbol_index_poll()
+        else:
+            self.status_bar.config(text=self.tr("symbols_indexed"))
+    
+    def buffer_symbols(self):
+        """Символы текущего буфера: разбирается текст редактора, а не файл на диске"""
+        try:
+            return extract_symbols(ast.parse(self.text_editor.get("1.0", "end-1c")))
+        except (SyntaxError, ValueError, RecursionError):
+            return []
+    
+    def symbol_label(self, symbol):
+        """Строка символа (имя, вид, путь, строка, родитель) для списка"""
+        name, kind, path, line, parent = symbol
+        if path and self.project_folder and self.tree_path_key(path).startswith(self.tree_path_key(self.project_folder)):
+            path = os.path.relpath(path, self.project_folder)
+        qualified = f"{parent}.{name}" if parent else name
+        return f"{qualified}  [{self.tr(kind)}]  {path or self.tr('untitled')}:{line}"
+    
+    def show_symbol_palette(self, title, search, query="", index=None):
+        """Окно выбора символа: search(строка) возвращает список символов для неё.
+        
+        Если передан индекс символов, к результатам search, когда их мало,
+        добавляются найденные им в фоне символы с запросом внутри имени.
+        """
+        palette = tk.Toplevel(self.root)
+        palette.title(title)
+        palette.geometry("700x400")
+        palette.transient(self.root)
+        
+        query_var = tk.StringVar(value=query)
+        entry = ttk.Entry(palette, textvariable=query_var)
+        entry.pack(fill=tk.X, padx=5, pady=5)
+        listbox = tk.Listbox(palette, font=(self.settings["font_family"], self.settings["font_size"] - 2))
+        listbox.pack(fill=tk.BOTH, expand=True, padx=5, pady=(0, 5))
+        results = []
+        poll_job = [None]
+        
+        def update(*args):
+            query = query_var.get()
+            results[:] = search(query)
+            listbox.delete(0, tk.END)
+            listbox.insert(tk.END, *[self.symbol_label(symbol) for symbol in results])
+            if results:
+                listbox.selection_set(0)
+            if index is not None and query and len(results) < index.FIND_LIMIT:
+                index.find_substring(query, index.FIND_LIMIT - len(results))
+                if poll_job[0] is None:
+                    poll_job[0] = palette.after(SYMBOL_SEARCH_POLL_INTERVAL, poll_substring)
+        
+        def poll_substring():
+            poll_job[0] = None
+            if not palette.winfo_exists():
+                return
+            while True:
+                try:
+                    query, rows = index.search_results.get_nowait()
+                except queue.Empty:
+                    break
+                if query == query_var.get():
+                    # Ответ на текущий запрос: дописывается к совпадениям с начала имени
+                    results.extend(rows)
+                    listbox.insert(tk.END, *[self.symbol_label(symbol) for symbol in rows])
+                    if rows and not listbox.curselection():
+                        listbox.selection_set(0)
+                    return
+            poll_job[0] = palette.after(SYMBOL_SEARCH_POLL_INTERVAL, poll_substring)
+        
+        def move(delta):
+            if not results:
+                return "break"
+            selection = listbox.curselection()
+            index = max(0, min(len(results) - 1, (selection[0] if selection else 0) + delta))
+            listbox.selection_clear(0, tk.END)
+            listbox.selection_set(index)
+            listbox.see(index)
+            return "break"
+        
+        def choose(event=None):
+            selection = listbox.curselection()
+            if selection:
+                _, _, path, line, _ = results[selection[0]]
+                palette.destroy()
+                self.go_to_location(path, line)
+            return "break"
+        
+        query_var.trace_add("write", update)
+        entry.bind("<Down>", lambda event: move(1))
+        entry.bind("<Up>", lambda event: move(-1))
+        entry.bind("<Return>", choose)
+        listbox.bind("<Double-1>", choose)
+        palette.bind("<Escape>", lambda event: palette.destroy())
+        update()
+        entry.focus_set()
+        entry.icursor(tk.END)
+    
+    def go_to_symbol(self, event=None):
+        """Палитра поиска символа по всему проекту"""
+        if self.symbol_index is None:
+            messagebox.showinfo(self.tr("go_to_symbol"), self.tr("open_folder_first"))
+        else:
+            self.show_symbol_palette(
+                self.tr("go_to_symbol"),
+                lambda query: self.symbol_index.find(query) if query else [],
+                index=self.symbol_index
+            )
+        # Ctrl+T в редакторе не должен переставлять символы
+        return "break"
+    
+    def show_outline(self):
+        """Палитра символов текущего файла"""
+        symbols = [(name, kind, self.current_file, line, parent)
+                   for name, kind, line, parent in self.buffer_symbols() if kind != "import"]
+        self.show_symbol_palette(
+            self.tr("outline"),
+            lambda query: [symbol for symbol in symbols if query.lower() in symbol[0].lower()]
+        )
+    
+    def go_to_definition(self):
+        """Переходит к определению имени под курсором"""
+        name = self.text_editor.get("insert wordstart", "insert wordend").strip()
+        if not name.isidentifier():
+            return
+        # Текущий буфер мог быть изменён после индексации, поэтому его символы берутся из текста
+        candidates = [(symbol_name, kind, self.current_file, line, parent)
+                      for symbol_name, kind, line, parent in self.buffer_symbols()
+                      if symbol_name == name and kind != "import"]
+        if self.symbol_index is not None:
+            current_key = self.tree_path_key(self.current_file) if self.current_file else None
+            candidates += [symbol for symbol in self.symbol_index.definitions(name)
+                           if self.tree_path_key(symbol[2]) != current_key]
+        if not candidates:
+            self.status_bar.config(text=f"{self.tr('definition_not_found')}: {name}")
+        elif len(candidates) == 1:
+            self.go_to_location(candidates[0][2], candidates[0][3])
+        else:
+            self.show_symbol_palette(
+                self.tr("go_to_definition"),
+                lambda query: [symbol for symbol in candidates if query.lower() in self.symbol_label(symbol).lower()]
+            )
+    
+    def start_search_index(self, folder_path):
+        """Запускает фоновое построение индекса поиска по файлам проекта"""
+        self.cancel_file_search()
+        if self.search_index is not None:
+            self.search_index.stop()
+        self.search_index = TrigramIndex(self.settings["search_max_file_mb"] * 1024 * 1024)
+        self.search_index.index_folder(folder_path, self.tree_ignore)
+    
+    def find_in_files(self, event=None):
+        """Открывает вкладку поиска по файлам, подставляя выделенный текст"""
+        if self.text_editor.tag_ranges("sel"):
+            selected = self.text_editor.get("sel.first", "sel.last")
+            if "\n" not in selected:
+                self.search_entry.delete(0, tk.END)
+                self.search_entry.insert(0, selected)
+        self.notebook.select(self.search_frame)
+        self.search_entry.focus_set()
+        self.search_entry.select_range(0, tk.END)
+        return "break"
+    
+    def start_file_search(self, event=None):
+        """Начинает поиск по файлам; прежний поиск отменяется"""
+        self.cancel_file_search()
+        query = self.search_entry.get()
+        if not query:
+            return
+        if self.search_index is None:
+            messagebox.showinfo(self.tr("find_in_files"), self.tr("open_folder_first"))
+            return
+        try:
+            self.file_search = FileSearch(
+                self.search_index,
+                query,
+                regex=self.search_regex_var.get(),
+                case_sensitive=self.search_case_var.get(),
+                priority_path=self.current_file
+            )
+        except re.error as e:
+            self.search_status.config(text=f"{self.tr('invalid_pattern')}: {str(e)}")
+            return
+        self.search_results.delete(*self.search_results.get_children())
+        self.search_result_files = {}
+        self.search_match_count = 0
+        self.search_started = time.perf_counter()
+        self.search_status.config(text=self.tr("searching"))
+        self.search_poll_job = self.root.after(SEARCH_POLL_INTERVAL, self.poll_file_search)
+    
+    def cancel_file_search(self):
+        """Останавливает текущий поиск по файлам"""
+        if self.search_poll_job is not None:
+            self.root.after_cancel(self.search_poll_job)
+            self.search_poll_job = None
+        if self.file_search is not None:
+            self.file_search.cancel()
+            self.file_search = None
+            self.search_status.config(text=f"{self.tr('search_cancelled')}: {self.search_summary()}")
+    
+    def search_summary(self):
+        """Строка с числом найденных совпадений и файлов"""
+        return f"{self.search_match_count} {self.tr('matches_in')} {len(self.search_result_files)} {self.tr('files_count')}"
+    
+    def poll_file_search(self):
+        """Переносит найденные совпадения в список результатов по мере поиска"""
+        self.search_poll_job = None
+        search = self.file_search
+        finished = False
+        for _ in range(SEARCH_BATCH_SIZE):
+            try:
+                result = search.results.get_nowait()
+            except queue.Empty:
+                break
+            if result is None:
+                finished = True
+                break
+            path, line, column, end, text = result
+            file_node = self.search_result_files.get(path)
+            if file_node is None:
+                label = os.path.relpath(path, self.project_folder) if self.project_folder else path
+                file_node = self.search_results.insert("", tk.END, text=label, open=True)
+                self.search_result_files[path] = file_node
+            self.search_results.insert(file_node, tk.END, text=f"{line}: {text.strip()}",
+                                       values=(path, line, column, end))
+            self.search_match_count += 1
+        
+        if finished:
+            self.file_search = None
+            elapsed = (time.perf_counter() - self.search_started) * 1000
+            status = f"{self.search_summary()} ({elapsed:.0f} {self.tr('ms')})"
+            if self.search_index.busy:
+                status += f" - {self.tr('search_index_incomplete')}"
+            self.search_status.config(text=status)
+        else:
+            self.search_status.config(text=f"{self.tr('searching')} {self.search_summary()}")
+            self.search_poll_job = self.root.after(SEARCH_POLL_INTERVAL, self.poll_file_search)
+    
+    def open_search_result(self, event=None):
+        """Открывает совпадение из результатов поиска и выделяет его"""
+        values = self.search_results.item(self.search_results.focus(), "values")
+        if not values:
+            return
+        path, line, column, end = values
+        self.go_to_location(path, int(line))
+        self.text_editor.tag_remove("sel", "1.0", tk.END)
+        self.text_editor.tag_add("sel", f"{line}.{column}", f"{line}.{end}")
+    
+    def show_find_bar(self, event=None, replace=False):
+        """Показывает панель поиска (и замены) по текущему буферу"""
+        if not self.find_bar.winfo_ismapped():
+            self.find_bar.pack(fill=tk.X, before=self.text_editor.frame)
+        if replace:
+            self.replace_frame.pack(fill=tk.X)
+        if self.text_editor.tag_ranges("sel"):
+            selected = self.text_editor.get("sel.first", "sel.last")
+            if "\n" not in selected:
+                self.find_var.set(selected)
+        target = self.replace_entry if replace and self.find_var.get() else self.find_entry
+        target.focus_set()
+        target.select_range(0, tk.END)
+        self.refresh_find()
+        return "break"
+    
+    def hide_find_bar(self, event=None):
+        """Скрывает панель поиска и снимает подсветку совпадений"""
+        self.find_bar.pack_forget()
+        self.replace_frame.pack_forget()
+        self.text_editor.tag_remove("find_match", "1.0", tk.END)
+        self.text_editor.tag_remove("find_current", "1.0", tk.END)
+        self.text_editor.focus_set()
+        return "break"
+    
+    def schedule_find(self, *args):
+        """Откладывает поиск, пока пользователь печатает"""
+        if self.find_job is not None:
+            self.root.after_cancel(self.find_job)
+        self.find_job = self.root.after(FIND_DEBOUNCE_MS, self.refresh_find)
+    
+    def schedule_find_after_edit(self):
+        """Откладывает повторный поиск после правки текста до паузы в наборе.
+        
+        Подсветка совпадений - теги виджета и сдвигается вместе с текстом,
+        поэтому копия текста не пересобирается на каждое нажатие клавиши.
+        Переход к совпадению и замена, если поиск отложен, выполняют его сразу.
+        """
+        if self.find_job is not None:
+            self.root.after_cancel(self.find_job)
+        self.find_job = self.root.after(FIND_EDIT_DEBOUNCE_MS, self.refresh_find)
+    
+    def find_pattern(self):
+        """Компилирует запрос панели поиска; None - если запрос пуст или ошибочен"""
+        query = self.find_var.get()
+        if not query:
+            return None
+        flags = 0 if self.find_case_var.get() else re.IGNORECASE
+        try:
+            return re.compile(query if self.find_regex_var.get() else re.escape(query), flags | re.MULTILINE)
+        except re.error:
+            return None
+    
+    def refresh_find(self):
+        """Заново ищет запрос в копии буфера и подсвечивает видимые совпадения"""
+        self.find_job = None
+        if not self.find_bar.winfo_ismapped():
+            return
+        search = self.buffer_search
+        search.set_text(self.text_editor.get("1.0", "end-1c"), self.text_version)
+        pattern = self.find_pattern()
+        if pattern is None:
+            search.search(re.compile("(?!)"))
+            self.find_count_label.config(text=self.tr("invalid_pattern") if self.find_var.get() else "")
+        else:
+            search.search(pattern)
+        self.find_current = search.match_after(search.offset(self.text_editor.index(tk.INSERT))) if search.starts else None
+        self.update_find_count()
+        self.highlight_visible_matches()
+        if self.find_current is not None:
+            self.text_editor.see(search.index(search.starts[self.find_current]))
+    
+    def update_find_count(self):
+        """Показывает номер текущего совпадения и их количество"""
+        search = self.buffer_search
+        if search.pattern is None or search.pattern.pattern == "(?!)":
+            return
+        if not search.starts:
+            self.find_count_label.config(text=self.tr("no_matches"))
+        else:
+            self.find_count_label.config(text=f"{self.find_current + 1}/{len(search.starts)}")
+    
+    def highlight_visible_matches(self):
+        """Подсвечивает только совпадения в видимой части редактора"""
+        self.find_highlight_job = None
+        search = self.buffer_search
+        if search.version != self.text_version:
+            # Смещения устарели; прежние теги остаются до отложенного поиска
+            return
+        self.text_editor.tag_remove("find_match", "1.0", tk.END)
+        self.text_editor.tag_remove("find_current", "1.0", tk.END)
+        if not search.starts:
+            return
+        first = search.offset(self.text_editor.index("@0,0 linestart"))
+        last = search.offset(self.text_editor.index(f"@0,{self.text_editor.winfo_height()} lineend"))
+        indices = []
+        for number in search.matches_between(first, last):
+            indices.extend((search.index(search.starts[number]), search.index(search.ends[number])))
+        if indices:
+            self.text_editor.tag_add("find_match", *indices)
+        if self.find_current is not None:
+            current = self.find_current
+            self.text_editor.tag_add("find_current", search.index(search.starts[current]), search.index(search.ends[current]))
+    
+    def find_next(self, delta=1):
+        """Переходит к следующему (delta=1) или предыдущему (delta=-1) совпадению"""
+        if not self.find_bar.winfo_ismapped():
+            return self.show_find_bar()
+        if self.buffer_search.version != self.text_version or self.find_job is not None:
+            self.refresh_find()
+        search = self.buffer_search
+        if not search.starts:
+            return "break"
+        if self.find_current is None:
+            self.find_current = search.match_after(search.offset(self.text_editor.index(tk.INSERT)))
+        else:
+            self.find_current = (self.find_current + delta) % len(search.starts)
+        start = search.index(search.starts[self.find_current])
+        end = search.index(search.ends[self.find_current])
+        self.text_editor.tag_remove("sel", "1.0", tk.END)
+        self.text_editor.tag_add("sel", start, end)
+        self.text_editor.mark_set(tk.INSERT, end)
+        self.text_editor.see(start)
+        self.update_find_count()
+        self.highlight_visible_matches()
+        return "break"
+    
+    def replacement_for(self, start, end):
+        """Текст замены для совпадения между смещениями start и end"""
+        replacement = self.replace_var.get()
+        if not self.find_regex_var.get():
+            return replacement
+        text = self.buffer_search.text
+        # Без ограничения конца: опережающим проверкам нужен текст после совпадения
+        match = self.buffer_search.pattern.match(text, start)
+        if match is None or match.end() != end:
+            # Совпадение не воспроизводится - участок остаётся как есть
+            return text[start:end]
+        return match.expand(replacement)
+    
+    def replace_current(self):
+        """Заменяет текущее совпадение и переходит к следующему"""
+        if self.buffer_search.version != self.text_version or self.find_job is not None:
+            self.refresh_find()
+        search = self.buffer_search
+        if self.find_current is None or not search.starts:
+            return
+        start, end = search.starts[self.find_current], search.ends[self.find_current]
+        try:
+            replacement = self.replacement_for(start, end)
+        except re.error as e:
+            self.status_bar.config(text=f"{self.tr('invalid_pattern')}: {str(e)}")
+            return
+        self.text_editor.edit_separator()
+        self.text_editor.replace(search.index(start), search.index(end), replacement)
+        self.text_editor.edit_separator()
+        self.text_editor.mark_set(tk.INSERT, search.index(start) + f"+{len(replacement)}c")
+        self.refresh_find()
+    
+    def replace_all(self):
+        """Заменяет все совпадения одной правкой виджета и одним шагом отмены"""
+        self.refresh_find()
+        search = self.buffer_search
+        if not search.starts:
+            return
+        first, last = search.starts[0], search.ends[-1]
+        text = search.text
+        replacement = self.replace_var.get()
+        pieces = []
+        position = first
+        # Заменённый участок собирается в Python: от первого до последнего совпадения
+        try:
+            for start, end in zip(search.starts, search.ends):
+                pieces.append(text[position:start])
+                pieces.append(self.replacement_for(start, end) if self.find_regex_var.get() else replacement)
+                position = end
+        except re.error as e:
+            # Ошибка в шаблоне замены (например, ссылка на несуществующую группу)
+            self.status_bar.config(text=f"{self.tr('invalid_pattern')}: {str(e)}")
+            return
+        count = len(search.starts)
+        self.text_editor.config(autoseparators=False)
+        try:
+            self.text_editor.edit_separator()
+            self.text_editor.replace(search.index(first), search.index(last), "".join(pieces))
+            self.text_editor.edit_separator()
+        finally:
+            self.text_editor.config(autoseparators=True)
+        self.refresh_find()
+        self.status_bar.config(text=f"{self.tr('replaced')}: {count}")
+    
+    def schedule_lint(self):
+        """Откладывает проверку кода до паузы в наборе"""
+        if self.lint_job is not None:
+            self.root.after_cancel(self.lint_job)
+        self.lint_job = self.root.after(LINT_DEBOUNCE_MS, self.lint_buffer)
+    
+    def lint_buffer(self):
+        """Отправляет снимок буфера на проверку или берёт готовый результат из кэша"""
+        self.lint_job = None
+        path = self.current_file or self.tr("untitled")
+        # В постраничном просмотре и при загрузке в редакторе только часть файла
+        partial = self.paged_file is not None or self.file_load is not None
+        if (self.current_file and not self.current_file.endswith((".py", ".pyw"))) or partial:
+            self.show_problems([])
+            self.buffer_trie = PrefixTrie(keyword.kwlist)
+            self.buffer_imports = {}
+            return
+        source = self.text_editor.get("1.0", "end-1c")
+        executable = self.get_python_executable()
+        # Результат зависит и от интерпретатора: синтаксис его версии, наличие pyflakes
+        key = hashlib.sha1(executable.encode("utf-8", errors="surrogatepass") + b"\0"
+                           + source.encode("utf-8", errors="surrogatepass")).hexdigest()
+        self.lint_key = key
+        # Неизменившийся текст повторно не проверяется
+        if key in self.lint_cache:
+            self.lint_cache.move_to_end(key)
+            self.apply_lint_reply(self.lint_cache[key])
+            return
+        if self.lint_worker is not None and self.lint_worker.executable != executable:
+            self.lint_worker.stop()
+            self.lint_worker = None
+        if self.lint_worker is None:
+            self.lint_worker = LintWorker(executable)
+        self.lint_worker.submit(key, path, source)
+        if self.lint_poll_job is None:
+            self.lint_poll_job = self.root.after(LINT_POLL_INTERVAL, self.poll_lint_results)
+    
+    def poll_lint_results(self):
+        """Забирает результаты проверки и показывает те, что относятся к текущему тексту"""
+        self.lint_poll_job = None
+        while True:
+            try:
+                key, reply = self.lint_worker.results.get_nowait()
+            except queue.Empty:
+                break
+            self.lint_cache[key] = reply
+            if len(self.lint_cache) > LINT_CACHE_SIZE:
+                self.lint_cache.popitem(last=False)
+            if key == self.lint_key:
+                self.apply_lint_reply(reply)
+        if self.lint_key not in self.lint_cache:
+            self.lint_poll_job = self.root.after(LINT_POLL_INTERVAL, self.poll_lint_results)
+    
+    def apply_lint_reply(self, reply):
+        """Показывает замечания проверки и обновляет имена буфера для автодополнения"""
+        self.show_problems(reply["problems"])
+        # При синтаксической ошибке (обычно посреди набора) остаются прежние имена
+        if reply["names"] is not None:
+            self.buffer_trie = PrefixTrie(keyword.kwlist + reply["names"])
+            self.buffer_imports = reply["imports"]
+    
+    def show_problems(self, problems):
+        """Подчёркивает замечания в редакторе и выводит их на вкладке проблем"""
+        for tag in ("lint_error", "lint_warning"):
+            self.text_editor.tag_remove(tag, "1.0", tk.END)
+        self.problems_list.delete(*self.problems_list.get_children())
+        ranges = {"lint_error": [], "lint_warning": []}
+        for line, column, severity, message in problems:
+            start = f"{line}.{column}"
+            # Подчёркивается слово с замечанием, а если его нет - остаток строки
+            end = self.text_editor.index(f"{start} wordend")
+            if self.text_editor.compare(end, "<=", start) or self.text_editor.compare(end, ">", f"{line}.0 lineend"):
+                end = f"{line}.0 lineend"
+            ranges[f"lint_{severity}"].extend((start, end))
+            self.problems_list.insert("", tk.END, values=(line, self.tr(severity), message))
+        for tag, indices in ranges.items():
+            if indices:
+                self.text_editor.tag_add(tag, *indices)
+        title = self.tr("problems")
+        self.notebook.tab(self.problems_frame, text=f"{title} ({len(problems)})" if problems else title)
+    
+    def open_problem(self, event=None):
+        """Переходит к строке выбранного замечания"""
+        values = self.problems_list.item(self.problems_list.focus(), "values")
+        if values:
+            self.show_editor_line(int(values[0]))
+    
+    def get_completions(self):
+        """Имена интерпретатора проекта; при первом обращении опрос идёт в фоне"""
+        executable = self.get_python_executable()
+        completions = self.completions.get(executable)
+        if completions is None:
+            cache_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), "completion")
+            try:
+                os.makedirs(cache_folder, exist_ok=True)
+            except OSError:
+                pass
+            completions = self.completions[executable] = InterpreterCompletions(executable, cache_folder)
+        return completions
+    
+    def toggle_autocomplete(self):
+        """Включает или выключает автоматическое открытие списка автодополнения"""
+        self.settings["autocomplete_on_type"] = self.autocomplete_var.get()
+        self.save_settings()
+        if not self.settings["autocomplete_on_type"]:
+            self.hide_completions()
+    
+    def completion_context(self):
+        """Разбирает текст перед курсором: (объект перед точкой, префикс, модуль импорта или None)"""
+        line = self.text_editor.get("insert linestart", tk.INSERT)
+        match = re.search(r"(?:[A-Za-z_][\w.]*)?$", line)
+        base, _, prefix = match.group().rpartition(".")
+        if not prefix.isidentifier() and prefix:
+            return None
+        # "import пакет.мод" и "from пакет.мод" дополняются именами модулей,
+        # "from модуль import имя" - членами модуля
+        import_match = re.match(r"\s*(?:import|from)\s+[\w.]*$", line)
+        if import_match:
+            return base, prefix, base if base else ""
+        from_match = re.match(r"\s*from\s+([\w.]+)\s+import\s+(?:[\w\s,(]*,\s*|\(?\s*)[\w]*$", line)
+        if from_match:
+            return "", prefix, from_match.group(1)
+        if base.endswith(".") or (base and not all(part.isidentifier() for part in base.split("."))):
+            return None
+        return base, prefix, None
+    
+    def completion_candidates(self, base, prefix, module):
+        """Варианты для префикса: имена буфера, члены модуля, встроенные имена и символы проекта"""
+        completions = self.get_completions()
+        if module == "":
+            sources = [completions.modules]
+        elif module is not None:
+            sources = [completions.member_trie(module) or PrefixTrie()]
+        elif base:
+            # Имя перед точкой заменяется модулем, под которым оно импортировано
+            head, _, tail = base.partition(".")
+            imported = self.buffer_imports.get(head)
+            members = completions.member_trie(f"{imported}.{tail}" if tail else imported) if imported else None
+            sources = [members] if members else [self.buffer_trie]
+        else:
+            sources = [self.buffer_trie, completions.builtins]
+            if self.symbol_index is not None:
+                sources.append(self.symbol_index)
+        candidates = []
+        seen = set()
+        for source in sources:
+            for word in source.complete(prefix, COMPLETION_LIMIT):
+                if word not in seen and word != prefix:
+                    seen.add(word)
+                    candidates.append(word)
+            if len(candidates) >= COMPLETION_LIMIT:
+                break
+        return candidates[:COMPLETION_LIMIT]
+    
+    def on_completion_key(self, event):
+        """Открывает или обновляет список автодополнения по мере набора"""
+        if event.keysym in ("Up", "Down", "Tab", "Return", "Escape", "Control_L", "Control_R", "Shift_L", "Shift_R"):
+            return
+        if self.completion_popup_visible():
+            self.update_completions()
+        elif self.settings["autocomplete_on_type"] and (event.char == "." or event.char.isidentifier() or event.char.isdigit()):
+            context = self.completion_context()
+            if context is not None and (event.char == "." or len(context[1]) >= COMPLETION_MIN_CHARS):
+                self.update_completions(context)
+        else:
+            self.hide_completions()
+    
+    def show_completions(self, event=None):
+        """Открывает список автодополнения для слова под курсором (Ctrl+Space)"""
+        self.update_completions(manual=True)
+        return "break"
+    
+    def completion_popup_visible(self):
+        """Открыт ли сейчас список автодополнения"""
+        return self.completion_popup is not None and self.completion_start is not None
+    
+    def create_completion_popup(self):
+        """Создаёт всплывающее окно со списком вариантов"""
+        self.completion_popup = tk.Toplevel(self.root)
+        self.completion_popup.withdraw()
+        self.completion_popup.overrideredirect(True)
+        self.completion_list = tk.Listbox(self.completion_popup, height=10, width=40, takefocus=0,
+                                          activestyle="none", exportselection=False)
+        self.completion_list.pack(fill=tk.BOTH, expand=True)
+        self.completion_list.bind("<ButtonRelease-1>", self.accept_completion)
+    
+    def update_completions(self, context=None, manual=False):
+        """Подбирает варианты для текста перед курсором и показывает их под курсором"""
+        if context is None:
+            context = self.completion_context()
+        if context is None or (not manual and not context[1] and not context[0] and context[2] is None):
+            return self.hide_completions()
+        base, prefix, module = context
+        candidates = self.completion_candidates(base, prefix, module)
+        bbox = self.text_editor.bbox(tk.INSERT)
+        if not candidates or bbox is None:
+            # Члены модуля могут прийти из фонового процесса чуть позже
+            if (base or module) and self.completion_job is None:
+                self.completion_job = self.root.after(200, self.retry_completions)
+            return self.hide_completions()
+        if self.completion_popup is None:
+            self.create_completion_popup()
+        self.completion_start = self.text_editor.index(f"insert - {len(prefix)}c")
+        self.completion_list.delete(0, tk.END)
+        self.completion_list.insert(tk.END, *candidates)
+        self.completion_list.selection_set(0)
+        self.completion_list.config(height=min(len(candidates), 10))
+        x, y, _, height = bbox
+        self.completion_popup.geometry(f"+{self.text_editor.winfo_rootx() + x}+{self.text_editor.winfo_rooty() + y + height}")
+        self.completion_popup.deiconify()
+        self.completion_popup.lift()
+    
+    def retry_completions(self):
+        """Повторяет подбор вариантов, если курсор всё ещё после точки или в импорте"""
+        self.completion_job = None
+        if self.text_editor.focus_get() is self.text_editor and not self.completion_popup_visible():
+            context = self.completion_context()
+            if context is not None and (context[0] or context[2] is not None):
+                self.update_completions(context)
+    
+    def hide_completions(self, event=None):
+        """Закрывает список автодополнения"""
+        if not self.completion_popup_visible():
+            return None
+        self.completion_start = None
+        self.completion_popup.withdraw()
+        return "break" if event is not None and event.keysym == "Escape" else None
+    
+    def hide_completions_unfocused(self):
+        """Закрывает список автодополнения, если фокус ушёл из редактора"""
+        try:
+            focused = self.root.focus_get()
+        except KeyError:
+            focused = None
+        if focused is not self.text_editor:
+            self.hide_completions()
+    
+    def move_completion(self, delta):
+        """Выбирает следующий или предыдущий вариант"""
+        if not self.completion_popup_visible():
+            return None
+        size = self.completion_list.size()
+        selection = self.completion_list.curselection()
+        current = ((selection[0] if selection else -delta) + delta) % size
+        self.completion_list.selection_clear(0, tk.END)
+        self.completion_list.selection_set(current)
+        self.completion_list.see(current)
+        return "break"
+    
+    def accept_completion(self, event=None):
+        """Вставляет выбранный вариант вместо набранного префикса"""
+        if not self.completion_popup_visible():
+            return None
+        selection = self.completion_list.curselection()
+        start = self.completion_start
+        self.hide_completions()
+        if not selection:
+            return None
+        word = self.completion_list.get(selection[0])
+        prefix = self.text_editor.get(start, tk.INSERT)
+        if word.startswith(prefix):
+            self.text_editor.insert(tk.INSERT, word[len(prefix):])
+        self.text_editor.focus_set()
+        return "break"
+    
+    def go_to_location(self, file_path, line):
+        """Открывает файл (если это не текущий) и переходит к строке"""
+        if file_path and file_path != self.current_file:
+            if not os.path.isfile(file_path):
+                return
+            self.open_file(file_path)
+        self.show_editor_line(line)
+    
+    def go_to_profile_location(self, profile, file_name, line):
+        """Открывает функцию из профиля в редакторе"""
+        if os.path.isfile(file_name):
+            self.open_file(file_name)
+        elif file_name != profile["file"]:
+            # Встроенные функции и код, которого нет на диске, открыть нельзя
+            return
+        self.show_editor_line(line)
+    
+    def show_editor_line(self, line):
+        """Переводит курсор на начало строки и прокручивает к ней редактор"""
+        self.text_editor.mark_set(tk.INSERT, f"{line}.0")
+        self.text_editor.see(tk.INSERT)
+        self.text_editor.focus_set()
+    
+    def toggle_warm_pool(self):
+        """Включает или выключает запуск кода в заранее прогретых интерпретаторах"""
+        self.settings["warm_pool_enabled"] = self.warm_pool_var.get()
+        self.save_settings()
+        if self.settings["warm_pool_enabled"]:
+            self.prewarm_interpreters()
+        else:
+            self.warm_pool.shutdown()
+    
+    def prewarm_interpreters(self):
+        """Заранее запускает тёплые интерпретаторы для текущего Python"""
+        work_dir = self.project_folder if self.project_folder else os.getcwd()
+        env = dict(os.environ, PYTHONUNBUFFERED="1", PYTHONIOENCODING="utf-8")
+        try:
+            self.warm_pool.fill(self.get_python_executable(), self.settings["warm_pool_modules"], work_dir, env)
+        except OSError as e:
+            self.status_bar.config(text=f"{self.tr('error')}: {str(e)}")
+    
+    def kernel_key(self):
+        """Ключ ядра: папка проекта и интерпретатор"""
+        return (self.project_folder or os.getcwd(), self.get_python_executable())
+    
+    def get_kernel(self):
+        """Возвращает работающее ядро проекта, при необходимости запуская новое"""
+        key = self.kernel_key()
+        kernel = self.kernels.get(key)
+        if kernel is None or not kernel.alive():
+            env = dict(os.environ, PYTHONUNBUFFERED="1", PYTHONIOENCODING="utf-8")
+            kernel = PythonKernel(key[1], key[0], env, self.kernel_queue, key)
+            self.kernels[key] = kernel
+            self.append_output([(f"{self.tr('kernel_started')}: {key[1]}\n", None)])
+        return kernel
+    
+    def current_cell(self):
+        """Возвращает выделенный код или ячейку "# %%" под курсором и номер её первой строки"""
+        if self.text_editor.tag_ranges("sel"):
+            first_line = int(self.text_editor.index("sel.first").split(".")[0])
+            code = self.text_editor.get("sel.first linestart", "sel.last")
+            return textwrap.dedent(code), first_line
+        
+        lines = self.text_editor.get("1.0", "end-1c").split("\n")
+        cursor_line = int(self.text_editor.index(tk.INSERT).split(".")[0]) - 1
+        start = 0
+        for line_no in range(cursor_line, -1, -1):
+            if lines[line_no].lstrip().startswith("# %%"):
+                start = line_no + 1
+                break
+        end = len(lines)
+        for line_no in range(cursor_line + 1, len(lines)):
+            if lines[line_no].lstrip().startswith("# %%"):
+                end = line_no
+                break
+        return "\n".join(lines[start:end]) + "\n", start + 1
+    
+    def run_in_kernel(self, event=None):
+        """Выполняет выделение или текущую ячейку в долгоживущем интерпретаторе проекта"""
+        code, first_line = self.current_cell()
+        if not code.strip():
+            self.status_bar.config(text=self.tr("no_code_to_execute"))
+            return "break"
+        
+        try:
+            kernel = self.get_kernel()
+        except OSError as e:
+            self.append_output([(f"{self.tr('error')}: {str(e)}\n", "error")])
+            self.status_bar.config(text=self.tr("execution_error"))
+            return "break"
+        if kernel.busy:
+            self.status_bar.config(text=self.tr("kernel_busy"))
+            return "break"
+        
+        # Вывод ядра дописывается к панели; полный вывод пишется в новый файл, если прошлый закрыт
+        if self.output_spill is None or self.output_spill.file.closed:
+            if self.output_spill:
+                self.output_spill.remove()
+            self.output_spill = OutputSpill()
+        code_lines = code.count("\n") or 1
+        self.append_output([(f"[{first_line}-{first_line + code_lines - 1}]\n", None)])
+        kernel.execute(code, self.current_file or "<cell>", first_line)
+        self.notebook.select(1)
+        self.status_bar.config(text=self.tr("executing_code"))
+        if self.kernel_poll_job is None:
+            self.kernel_poll_job = self.root.after(OUTPUT_FLUSH_INTERVAL, self.read_kernel_output)
+        # Ctrl+Enter не должен вставлять перевод строки
+        return "break"
+    
+    def read_kernel_output(self):
+        """Переносит вывод ядер в панель вывода и обрабатывает их ответы"""
+        self.kernel_poll_job = None
+        chunks = []
+        while True:
+            try:
+                _, tag, text = self.kernel_queue.get_nowait()
+            except queue.Empty:
+                break
+            if text is None:
+                continue
+            if chunks and chunks[-1][1] == tag:
+                chunks[-1][0].append(text)
+            else:
+                chunks.append(([text], tag))
+        if chunks:
+            self.append_output([("".join(texts), tag) for texts, tag in chunks])
+        
+        for key, kernel in list(self.kernels.items()):
+            while True:
+                try:
+                    reply = kernel.replies.get_nowait()
+                except queue.Empty:
+                    break
+                kernel.busy = False
+                if reply is None:
+                    # Соединение закрыто: ядро завершилось или было убито
+                    del self.kernels[key]
+                    kernel.shutdown()
+                    self.append_output([(f"{self.tr('kernel_stopped')}\n", "error")])
+                    self.status_bar.config(text=self.tr("kernel_stopped"))
+                    break
+                status = self.tr("execution_completed") if reply["status"] == "ok" else self.tr("execution_error")
+                if reply["status"] == "interrupted":
+                    status = self.tr("execution_stopped")
+                self.status_bar.config(text=f"{status} ({reply['elapsed'] * 1000:.0f} {self.tr('ms')})")
+        
+        if self.kernels:
+            self.kernel_poll_job = self.root.after(OUTPUT_FLUSH_INTERVAL, self.read_kernel_output)
+    
+    def interrupt_kernel(self):
+        """Прерывает код, выполняющийся в ядре проекта"""
+        kernel = self.kernels.get(self.kernel_key())
+        if kernel is not None and kernel.busy:
+            kernel.interrupt()
+            return True
+        return False
+    
+    def restart_kernel(self):
+        """Перезапускает ядро проекта, сбрасывая все его переменные"""
+        kernel = self.kernels.pop(self.kernel_key(), None)
+        if kernel is not None:
+            kernel.shutdown()
+            self.append_output([(f"{self.tr('kernel_restarted')}\n", None)])
+        try:
+            self.get_kernel()
+        except OSError as e:
+            self.append_output([(f"{self.tr('error')}: {str(e)}\n", "error")])
+            return
+        if self.kernel_poll_job is None:
+            self.kernel_poll_job = self.root.after(OUTPUT_FLUSH_INTERVAL, self.read_kernel_output)
     
     def read_process_output(self):
-        """Читает вывод выполняемого процесса с обработкой ошибок"""
+        """Переносит накопленный вывод процесса в панель вывода одним insert за кадр"""
         if self.process is None:
             return
             
         try:
-            # Чтение stdout
-            stdout = self.process.stdout
-            if stdout:
-                output = stdout.readline()
-                if output:
-                    self.output_text.config(state="normal")
-                    self.output_text.insert(tk.END, output)
-                    self.output_text.see(tk.END)
-                    self.output_text.config(state="disabled")
+            chunks = []
+            while True:
+                try:
+                    _, tag, text = self.output_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if text is None:
+                    self.output_open_streams -= 1
+                elif chunks and chunks[-1][1] == tag:
+                    chunks[-1][0].append(text)
+                else:
+                    chunks.append(([text], tag))
             
-            # Чтение stderr
-            stderr = self.process.stderr
-            if stderr:
-                error = stderr.readline()
-                if error:
-                    self.output_text.config(state="normal")
-                    self.output_text.insert(tk.END, error, "error")
-                    self.output_text.see(tk.END)
-                    self.output_text.config(state="disabled")
+            if chunks:
+                self.append_output([("".join(texts), tag) for texts, tag in chunks])
             
-            if self.process.poll() is None:
-                self.root.after(100, self.read_process_output)
+            # Процесс завершён, когда он вышел и оба канала вывода прочитаны до конца
+            if self.run_result is None:
+                self.run_result = poll_process_usage(self.process)
+            if self.output_open_streams > 0 or self.run_result is None:
+                self.root.after(OUTPUT_FLUSH_INTERVAL, self.read_process_output)
             else:
                 self.process = None
-                self.status_bar.config(text=self.tr("execution_completed"))
+                if self.run_timeout_job is not None:
+                    self.root.after_cancel(self.run_timeout_job)
+                    self.run_timeout_job = None
+                stats = self.format_run_stats(*self.run_result)
+                if self.run_timed_out:
+                    self.append_output([(f"\n{self.tr('wall_limit_exceeded')}\n", "error")])
+                self.append_output([(f"\n[{stats}]\n", None)])
+                self.output_spill.close()
+                self.status_bar.config(text=f"{self.tr('execution_completed')}: {stats}")
+                if self.run_profile_path and os.path.exists(self.run_profile_path):
+                    self.show_profile(self.run_profile_path)
         except Exception as e:
             self.output_text.config(state="normal")
             self.output_text.insert(tk.END, f"{self.tr('output_read_error')}: {str(e)}\n", "error")
             self.output_text.config(state="disabled")
             self.process = None
     
+    def append_output(self, chunks):
+        """Дописывает куски (текст, тег) в полный вывод и в панель вывода.
+
+        Панель хранит не больше output_max_lines последних строк, поэтому
+        стоимость вставки не растёт с длиной вывода; всё, что не поместилось,
+        остаётся в файле OutputSpill.
+        """
+        if self.output_spill:
+            for text, _ in chunks:
+                self.output_spill.write(text)
+        
+        max_lines = self.settings["output_max_lines"]
+        # Из очень большого пакета вывода вставляем только хвост, который всё равно поместится
+        total_lines = 0
+        for index in range(len(chunks) - 1, -1, -1):
+            text, tag = chunks[index]
+            total_lines += text.count("\n")
+            if total_lines > max_lines:
+                chunks = chunks[index:]
+                chunks[0] = ("\n".join(text.split("\n")[total_lines - max_lines:]), tag)
+                break
+        
+        insert_args = []
+        for text, tag in chunks:
+            insert_args.extend((text, tag))
+        self.output_text.config(state="normal")
+        self.output_text.insert(tk.END, *insert_args)
+        line_count = int(self.output_text.index("end-1c").split(".")[0])
+        if line_count > max_lines:
+            self.output_text.delete("1.0", f"{line_count - max_lines + 1}.0")
+        self.output_text.see(tk.END)
+        self.output_text.config(state="disabled")
+    
+    def check_output_spill(self):
+        """Проверяет, что полный вывод последнего запуска доступен"""
+        if self.output_spill is None or not os.path.exists(self.output_spill.path):
+            messagebox.showinfo(self.tr("full_output"), self.tr("no_full_output"))
+            return False
+        return True
+    
+    def browse_full_output(self):
+        """Постраничный просмотр полного вывода последнего запуска"""
+        if not self.check_output_spill():
+            return
+        spill = self.output_spill
+        
+        window = tk.Toplevel(self.root)
+        window.title(self.tr("full_output"))
+        window.geometry("900x600")
+        
+        controls = ttk.Frame(window)
+        controls.pack(fill=tk.X)
+        page_label = ttk.Label(controls)
+        viewer = scrolledtext.ScrolledText(
+            window,
+            wrap=tk.NONE,
+            font=(self.settings["font_family"], self.settings["font_size"])
+        )
+        viewer.pack(fill=tk.BOTH, expand=True)
+        current = {"page": spill.page_count - 1}
+        
+        def show_page(page):
+            page = max(0, min(page, spill.page_count - 1))
+            current["page"] = page
+            viewer.config(state="normal")
+            viewer.delete(1.0, tk.END)
+            viewer.insert(tk.END, spill.read_page(page))
+            viewer.config(state="disabled")
+            first_line = page * OutputSpill.PAGE_LINES + 1
+            page_label.config(
+                text=f"{self.tr('page')} {page + 1}/{spill.page_count} "
+                     f"({self.tr('lines')} {first_line}-{first_line + OutputSpill.PAGE_LINES - 1})"
+            )
+        
+        ttk.Button(controls, text="<<", width=4, command=lambda: show_page(0)).pack(side=tk.LEFT)
+        ttk.Button(controls, text="<", width=4, command=lambda: show_page(current["page"] - 1)).pack(side=tk.LEFT)
+        ttk.Button(controls, text=">", width=4, command=lambda: show_page(current["page"] + 1)).pack(side=tk.LEFT)
+        ttk.Button(controls, text=">>", width=4, command=lambda: show_page(spill.page_count - 1)).pack(side=tk.LEFT)
+        page_label.pack(side=tk.LEFT, padx=10)
+        show_page(current["page"])
+    
+    def search_full_output(self):
+        """Ищет регулярное выражение в полном выводе последнего запуска"""
+        if not self.check_output_spill():
+            return
+        query = simpledialog.askstring(self.tr("search_full_output"), self.tr("search_pattern"), parent=self.root)
+        if not query:
+            return
+        try:
+            pattern = re.compile(query)
+        except re.error as e:
+            messagebox.showerror(self.tr("error"), f"{self.tr('invalid_pattern')}:\n{str(e)}")
+            return
+        
+        spill = self.output_spill
+        results = queue.Queue()
+        
+        def search():
+            try:
+                results.put(spill.search(pattern))
+            except OSError as e:
+                results.put(e)
+        
+        def show_results():
+            try:
+                matches = results.get_nowait()
+            except queue.Empty:
+                self.root.after(100, show_results)
+                return
+            self.status_bar.config(text=self.tr("ready"))
+            if isinstance(matches, Exception):
+                messagebox.showerror(self.tr("error"), str(matches))
+                return
+            
+            window = tk.Toplevel(self.root)
+            window.title(f"{self.tr('search_full_output')}: {query} ({len(matches)})")
+            window.geometry("900x400")
+            viewer = scrolledtext.ScrolledText(
+                window,
+                wrap=tk.NONE,
+                font=(self.settings["font_family"], self.settings["font_size"])
+            )
+            viewer.pack(fill=tk.BOTH, expand=True)
+            viewer.insert(tk.END, "\n".join(f"{line_no}: {line}" for line_no, line in matches))
+            if len(matches) >= OutputSpill.SEARCH_LIMIT:
+                viewer.insert(tk.END, f"\n... {self.tr('search_limit_reached')}", "error")
+                viewer.tag_config("error", foreground="red")
+            viewer.config(state="disabled")
+        
+        self.status_bar.config(text=self.tr("searching"))
+        threading.Thread(target=search, daemon=True).start()
+        self.root.after(100, show_results)
+    
+    def save_full_output(self):
+        """Сохраняет полный вывод последнего запуска в файл"""
+        if not self.check_output_spill():
+            return
+        file_path = filedialog.asksaveasfilename(
+            defaultextension=".log",
+            filetypes=[("Log Files", "*.log"), ("Text Files", "*.txt"), ("All Files", "*.*")]
+        )
+        if not file_path:
+            return
+        try:
+            self.output_spill.save_as(file_path)
+            self.status_bar.config(text=f"{self.tr('file_saved')}: {file_path}")
+        except Exception as e:
+            messagebox.showerror(self.tr("error"), f"{self.tr('file_save_error')}:\n{str(e)}")
+    
     def stop_execution(self):
         """Останавливает выполнение кода"""
-        if self.process and self.process.poll() is None:
+        # Ядро не убивается: прерывание сохраняет его переменные
+        if not self.run_in_progress() and self.interrupt_kernel():
+            return
+        if self.run_timeout_job is not None:
+            self.root.after_cancel(self.run_timeout_job)
+            self.run_timeout_job = None
+        if self.run_in_progress():
             try:
-                if platform.system() == "Windows":
-                    self.process.terminate()
-                else:
-                    self.process.kill()
-                self.output_text.config(state="normal")
-                self.output_text.insert(tk.END, f"\n{self.tr('execution_stopped')}\n", "error")
-                self.output_text.see(tk.END)
-                self.output_text.config(state="disabled")
+                # Вместе с процессом завершаются и все запущенные им процессы
+                signal_process_group(self.process)
+                self.append_output([(f"\n{self.tr('execution_stopped')}\n", "error")])
                 self.status_bar.config(text=self.tr("execution_stopped"))
             except Exception as e:
                 messagebox.showerror(self.tr("error"), f"{self.tr('stop_process_error')}:\n{str(e)}")
             finally:
                 self.process = None
+                if self.output_reader:
+                    self.output_reader.stop()
+                if self.output_spill:
+                    self.output_spill.close()
     
     def toggle_dark_mode(self):
         """Переключает темный/светлый режим"""
@@ -1028,10 +6403,32 @@ class PythonCodeEditor:
         self.setup_syntax_highlighting()
     
     def refresh_file_tree(self):
-        """Обновляет дерево файлов"""
-        if self.project_folder:
-            self.build_file_tree(self.project_folder)
-            self.status_bar.config(text=self.tr("file_tree_updated"))
+        """Сверяет все прочитанные папки дерева с диском, не сворачивая дерево"""
+        roots = self.file_tree.get_children()
+        if not self.project_folder or not roots:
+            return
+        
+        # Правила игнорирования могли измениться вместе с .gitignore
+        self.tree_ignore = TreeIgnoreRules(
+            self.project_folder,
+            self.settings["tree_ignore_patterns"],
+            self.settings["tree_use_gitignore"]
+        )
+        folders = []
+        stack = list(roots)
+        while stack:
+            node = stack.pop()
+            if self.is_tree_folder_loaded(node):
+                folders.append(self.file_tree.item(node, "values")[0])
+                stack.extend(self.file_tree.get_children(node))
+        for folder_path in sorted(folders):
+            self.sync_tree_folder(folder_path)
+        self.status_bar.config(text=self.tr("file_tree_updated"))
+        if self.symbol_index is not None:
+            self.symbol_index.index_folder(self.project_folder, self.tree_ignore)
+            self.schedule_symbol_index_poll()
+        if self.search_index is not None:
+            self.search_index.index_folder(self.project_folder, self.tree_ignore)
     
     def create_new_file(self):
         """Создает новый файл в проекте"""
@@ -1052,7 +6449,7 @@ class PythonCodeEditor:
             try:
                 with open(file_path, "w") as f:
                     f.write("")
-                self.refresh_file_tree()
+                self.sync_tree_folder(parent_path)
                 self.open_file(file_path)
             except Exception as e:
                 messagebox.showerror(self.tr("error"), f"{self.tr('file_create_error')}:\n{str(e)}")
@@ -1075,7 +6472,7 @@ class PythonCodeEditor:
             folder_path = os.path.join(parent_path, folder_name)
             try:
                 os.mkdir(folder_path)
-                self.refresh_file_tree()
+                self.sync_tree_folder(parent_path)
             except Exception as e:
                 messagebox.showerror(self.tr("error"), f"{self.tr('folder_create_error')}:\n{str(e)}")
     
@@ -1097,12 +6494,11 @@ class PythonCodeEditor:
                     os.rmdir(item_path)
                 else:
                     os.remove(item_path)
-                self.refresh_file_tree()
+                self.sync_tree_folder(os.path.dirname(item_path))
                 
-                if self.current_file and self.current_file == item_path:
-                    self.text_editor.delete(1.0, tk.END)
-                    self.current_file = None
-                    self.update_title()
+                buffer = self.find_buffer(item_path)
+                if buffer is not None:
+                    self.discard_buffer(buffer)
             except Exception as e:
                 messagebox.showerror(self.tr("error"), f"{self.tr('delete_error')}:\n{str(e)}")
     
@@ -1129,6 +6525,29 @@ GitHub: {self.github_repo}"""
         self.stop_execution()
         
         if messagebox.askokcancel(self.tr("exit"), self.tr("confirm_exit")):
+            for job in self.console_jobs.values():
+                signal_process_group(job["process"])
+            self.highlight_worker.stop()
+            self.tree_watcher.stop()
+            # Несохранённые снимки дописываются до закрытия окна
+            self.file_saver.stop()
+            self.warm_pool.shutdown()
+            for kernel in self.kernels.values():
+                kernel.shutdown()
+            if self.symbol_index is not None:
+                self.symbol_index.stop()
+            self.cancel_file_search()
+            if self.search_index is not None:
+                self.search_index.stop()
+            if self.lint_worker is not None:
+                self.lint_worker.stop()
+            self.cancel_file_load()
+            if self.paged_file is not None:
+                self.paged_file.close()
+            if self.output_spill:
+                self.output_spill.remove()
+            for buffer in self.buffers:
+                buffer.drop_spill()
             self.root.destroy()
 
 if __name__ == "__main__":
@@ -0,0 +1,84 @@
+"""Проверки снимков неактивных буферов редактора.
+
+Журнал правок должен воспроизводить команды виджета в том же порядке,
+а вытесненный снимок с несохранёнными изменениями или историей отмены -
+выгружаться во временный файл и возвращаться из него без потерь.
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pycode11 import EditorBuffer, UndoJournal  # noqa: E402
+
+
+def typed_journal():
+    journal = UndoJournal("def f():\n")
+    for column, char in enumerate("pass"):
+        journal.record(("insert", f"2.{column}", char))
+    journal.record(("edit", "separator"))
+    journal.record(("delete", "2.0", "2.4"))
+    journal.record(("edit", "undo"))
+    journal.record(("edit", "modified", "0"))
+    return journal
+
+
+class UndoJournalTest(unittest.TestCase):
+    def test_adjacent_inserts_are_merged(self):
+        journal = typed_journal()
+        self.assertEqual(journal.entries[0], ("insert", "2.0", "pass"))
+        self.assertEqual(len(journal.entries), 5)
+
+    def test_replay_rebuilds_from_base(self):
+        calls = []
+        typed_journal().replay(lambda *args: calls.append(args[0] if len(args) == 1 else args), ".t")
+        self.assertEqual(calls[:3], [(".t", "delete", "1.0", "end"),
+                                     (".t", "insert", "1.0", "def f():\n"),
+                                     (".t", "edit", "reset")])
+        self.assertEqual(calls[3:], [(".t", "insert", "2.0", "pass"), (".t", "edit", "separator"),
+                                     (".t", "delete", "2.0", "2.4"), (".t", "edit", "undo"),
+                                     (".t", "edit", "modified", "0")])
+
+    def test_json_round_trip(self):
+        journal = typed_journal()
+        restored = UndoJournal.from_json(journal.to_json())
+        self.assertEqual(restored.base, journal.base)
+        self.assertEqual(restored.entries, journal.entries)
+
+
+class EditorBufferTest(unittest.TestCase):
+    def test_modified_buffer_is_spilled(self):
+        buffer = EditorBuffer("/tmp/example.py")
+        buffer.text = "x = 1\n" * 1000
+        buffer.modified = True
+        buffer.evict()
+        self.addCleanup(buffer.drop_spill)
+        self.assertIsNone(buffer.text)
+        self.assertFalse(buffer.evicted)
+        self.assertEqual(buffer.memory_size, 0)
+        path = buffer.spill_path
+        buffer.load_spill()
+        self.assertEqual(buffer.text, "x = 1\n" * 1000)
+        self.assertFalse(os.path.exists(path))
+
+    def test_history_is_spilled(self):
+        buffer = EditorBuffer("/tmp/example.py")
+        buffer.text = None
+        buffer.undo = typed_journal()
+        buffer.evict()
+        self.addCleanup(buffer.drop_spill)
+        self.assertIsNone(buffer.undo)
+        buffer.load_spill()
+        self.assertEqual(buffer.undo.entries, typed_journal().entries)
+
+    def test_clean_buffer_is_dropped(self):
+        buffer = EditorBuffer("/tmp/example.py")
+        buffer.text = "x = 1\n"
+        buffer.evict()
+        self.assertTrue(buffer.evicted)
+        self.assertIsNone(buffer.spill_path)
+
+
+if __name__ == "__main__":
+    unittest.main()
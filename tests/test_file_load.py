@@ -0,0 +1,62 @@
+"""Проверки загрузки больших файлов в редактор частями.
+
+Если кусок после первого не декодируется, частичный текст не должен
+остаться в буфере, связанном с файлом: сохранение затёрло бы файл.
+"""
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pycode11  # noqa: E402
+from pycode11 import FILE_LOAD_CHUNK, MappedFile, PythonCodeEditor  # noqa: E402
+
+
+class BadByteAfterFirstChunkTest(unittest.TestCase):
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix=".txt")
+        line = b"x" * 99 + b"\n"
+        with os.fdopen(fd, "wb") as f:
+            f.write(line * (FILE_LOAD_CHUNK // len(line) + 10))
+            f.write(b"bad \xff byte\n")
+        self.addCleanup(os.remove, self.path)
+
+    def make_editor(self):
+        editor = mock.MagicMock()
+        editor.file_load = {"file": MappedFile(self.path), "position": 0, "job": None}
+        self.addCleanup(editor.file_load["file"].close)
+        return editor
+
+    def test_decode_error_fails_the_load(self):
+        editor = self.make_editor()
+        PythonCodeEditor.load_file_step(editor)
+        self.assertGreater(editor.file_load["position"], 0)
+        editor.fail_file_load.assert_not_called()
+
+        # Следующий кусок содержит недопустимый байт
+        while editor.file_load["position"] < editor.file_load["file"].size and not editor.fail_file_load.called:
+            PythonCodeEditor.load_file_step(editor)
+        editor.fail_file_load.assert_called_once()
+        self.assertIsInstance(editor.fail_file_load.call_args[0][0], UnicodeDecodeError)
+
+    def test_failed_buffer_is_unbound_and_closed(self):
+        editor = mock.MagicMock()
+        buffer = pycode11.EditorBuffer(self.path)
+        editor.active_buffer = buffer
+        editor.current_file = self.path
+        with mock.patch.object(pycode11.messagebox, "showerror") as showerror:
+            PythonCodeEditor.fail_file_load(editor, UnicodeDecodeError("utf-8", b"\xff", 0, 1, "invalid start byte"))
+        showerror.assert_called_once()
+        editor.text_editor.delete.assert_called_with(1.0, pycode11.tk.END)
+        editor.text_editor.edit_modified.assert_called_with(False)
+        self.assertIsNone(buffer.file_path)
+        self.assertIsNone(editor.current_file)
+        editor.discard_buffer.assert_called_once_with(buffer)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+"""Проверки префиксного дерева имён автодополнения.
+
+Дерево обновляется по мере переиндексации файлов, поэтому после любых
+вставок и удалений варианты должны совпадать с перебором множества слов.
+"""
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pycode11 import PrefixTrie  # noqa: E402
+
+
+class PrefixTrieTest(unittest.TestCase):
+    def test_matches_brute_force_after_updates(self):
+        generator = random.Random(1)
+        words = ["".join(generator.choice("abcde_") for _ in range(generator.randint(1, 8)))
+                 for _ in range(3000)]
+        trie = PrefixTrie()
+        expected = set()
+        for step in range(20000):
+            word = generator.choice(words)
+            if generator.random() < 0.5:
+                trie.insert(word)
+                expected.add(word)
+            else:
+                trie.remove(word)
+                expected.discard(word)
+            if step % 1000 == 0:
+                for prefix in ("", "a", "ab", "e_", "dcb"):
+                    with self.subTest(step=step, prefix=prefix):
+                        self.assertEqual(
+                            trie.complete(prefix, 50),
+                            sorted((word for word in expected if word.startswith(prefix)),
+                                   key=PrefixTrie.rank)[:50]
+                        )
+        self.assertEqual(len(trie), len(expected))
+
+
+if __name__ == "__main__":
+    unittest.main()
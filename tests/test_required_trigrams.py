@@ -0,0 +1,64 @@
+"""Проверки обязательных триграмм поиска по файлам.
+
+Любой текст, в котором регулярное выражение находит совпадение, должен
+содержать все триграммы, которые вернула required_trigrams, иначе поиск
+по индексу пропустит файл с совпадением.
+"""
+import os
+import re
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pycode11 import required_trigrams  # noqa: E402
+
+CASES = [
+    ("foo[0-9]+bar", ["foo7bar", "xx foo123bar yy"]),
+    ("x{10,20}yz", ["x" * 12 + "yz"]),
+    ("ab{0,3}cde", ["acde", "abbbcde"]),
+    ("(?P<name>abc)", ["abc", "zabcz"]),
+    ("(?:abc)+def", ["abcabcdef"]),
+    ("(abc)?defg", ["defg", "abcdefg"]),
+    ("(abc)*defg", ["defg"]),
+    ("a[]x]bcd", ["a]bcd", "axbcd"]),
+    ("[^]a]bcd", ["zbcd"]),
+    (r"foo\[1\]", ["foo[1]"]),
+    (r"\d+ items", ["12 items"]),
+    ("ab*cde", ["acde", "abbbcde"]),
+    ("colou?r", ["color", "colour"]),
+    ("foo(?=bar)", ["foobar"]),
+    ("(?<=x)abc", ["xabc"]),
+    ("(?i)Hello", ["hello"]),
+    ("foo|barbaz", ["foo", "barbaz"]),
+    ("(ab)(cd)ef", ["abcdef"]),
+    ("a{b}cde", ["a{b}cde"]),
+]
+
+
+class RequiredTrigramsTest(unittest.TestCase):
+
+    def test_matching_text_contains_all_trigrams(self):
+        for pattern, texts in CASES:
+            trigrams = required_trigrams(pattern, regex=True)
+            for text in texts:
+                with self.subTest(pattern=pattern, text=text):
+                    self.assertIsNotNone(re.search(pattern, text))
+                    lowered = text.lower()
+                    self.assertEqual({t for t in trigrams if t not in lowered}, set())
+
+    def test_literal_runs_are_kept(self):
+        self.assertEqual(required_trigrams("foo[0-9]+bar", regex=True), {"foo", "bar"})
+        self.assertEqual(required_trigrams("(?P<name>abcd)", regex=True), {"abc", "bcd"})
+
+    def test_unsure_parse_requires_nothing(self):
+        for pattern in ("foo(?=bar)", "(?i)hello", "a|bcd", "abc\\", "(abc", "abc)"):
+            with self.subTest(pattern=pattern):
+                self.assertEqual(required_trigrams(pattern, regex=True), set())
+
+    def test_plain_query(self):
+        self.assertEqual(required_trigrams("a[b]c", regex=False), {"a[b", "[b]", "b]c"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+"""Проверки инкрементального обновления индекса триграмм.
+
+Индекс не обходит проект заново при каждом поиске, поэтому изменённые
+и новые файлы должны попадать в него через update_file и сверку папки
+без рекурсии, а номера удалённых файлов — вычищаться из массивов.
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+import types
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pycode11 import TrigramIndex, required_trigrams  # noqa: E402
+
+NO_IGNORE = types.SimpleNamespace(is_ignored=lambda *args: False)
+
+
+class TrigramIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.folder)
+        self.index = TrigramIndex(1 << 20)
+        self.addCleanup(self.index.stop)
+
+    def write(self, name, text):
+        path = os.path.join(self.folder, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(text)
+        return path
+
+    def wait(self):
+        # Задания выполняются по порядку: сверка папки без рекурсии
+        # завершается последней и ничего не меняет в уже сверенном индексе
+        deadline = time.monotonic() + 10
+        self.index.index_folder(self.folder, NO_IGNORE, recursive=False)
+        while self.index.busy:
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.01)
+
+    def found(self, query):
+        return sorted(os.path.relpath(path, self.folder)
+                      for path, _ in self.index.candidates(required_trigrams(query)))
+
+    def test_incremental_updates(self):
+        first = self.write("a/first.txt", "needle\n")
+        self.index.index_folder(self.folder, NO_IGNORE)
+        self.wait()
+        self.assertEqual(self.found("needle"), [os.path.join("a", "first.txt")])
+
+        # Новая папка находится сверкой без рекурсии и попадает в new_folders
+        self.write("b/c/second.txt", "needle two\n")
+        self.index.index_folder(self.folder, NO_IGNORE, recursive=False)
+        self.wait()
+        self.assertEqual(self.found("needle"),
+                         [os.path.join("a", "first.txt"), os.path.join("b", "c", "second.txt")])
+        folders = set()
+        while not self.index.new_folders.empty():
+            folders.add(self.index.new_folders.get())
+        self.assertIn(os.path.join(self.folder, "b", "c"), folders)
+
+        with open(first, "w", encoding="utf-8") as file:
+            file.write("haystack, longer than before\n")
+        self.index.update_file(first)
+        self.wait()
+        self.assertEqual(self.found("needle"), [os.path.join("b", "c", "second.txt")])
+        self.assertEqual(self.found("haystack"), [os.path.join("a", "first.txt")])
+
+    def test_dead_ids_are_compacted(self):
+        path = self.write("file.txt", "needle\n")
+        self.index.index_folder(self.folder, NO_IGNORE)
+        self.wait()
+        for version in range(TrigramIndex.MIN_COMPACT + 10):
+            with self.index.lock:
+                self.index._remove_locked(path)
+            self.index._add_file(path, (version, 1))
+        self.assertLessEqual(self.index.dead, TrigramIndex.MIN_COMPACT)
+        self.assertLessEqual(len(self.index.postings["nee"]), TrigramIndex.MIN_COMPACT + 1)
+        self.assertEqual(self.found("needle"), ["file.txt"])
+
+
+if __name__ == "__main__":
+    unittest.main()